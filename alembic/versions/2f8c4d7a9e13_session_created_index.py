@@ -0,0 +1,30 @@
+"""Session created index
+
+Revision ID: 2f8c4d7a9e13
+Revises: 9b3d6f1e8a42
+Create Date: 2026-10-19 23:48:31.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f8c4d7a9e13'
+down_revision: Union[str, None] = '9b3d6f1e8a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    #The composite index starts with creator_id, the single column index would only cost writes
+    op.create_index('ix_voting_sessions_creator_id_time_created', 'voting_sessions', ['creator_id', 'time_created'], unique=False)
+    op.drop_index('ix_voting_sessions_creator_id', table_name='voting_sessions')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_voting_sessions_creator_id', 'voting_sessions', ['creator_id'], unique=False)
+    op.drop_index('ix_voting_sessions_creator_id_time_created', table_name='voting_sessions')
@@ -0,0 +1,58 @@
+"""Hot path indexes
+
+Revision ID: 3c7a9e2b41d5
+Revises: fd1b88e94ce4
+Create Date: 2026-10-19 15:20:11.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7a9e2b41d5'
+down_revision: Union[str, None] = 'fd1b88e94ce4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+#Tables that get a unique pair index, duplicate rows are removed first keeping the oldest one
+UNIQUE_PAIRS = [
+    ('whitelists', 'ix_whitelists_session_id_user_id', ['session_id', 'user_id']),
+    ('group_whitelists', 'ix_group_whitelists_session_id_group_id', ['session_id', 'group_id']),
+    ('group_memberships', 'ix_group_memberships_group_id_user_id', ['group_id', 'user_id']),
+]
+
+INDEXES = [
+    ('votes', 'ix_votes_candidate_id', ['candidate_id']),
+    ('votes', 'ix_votes_user_id_candidate_id', ['user_id', 'candidate_id']),
+    ('candidates', 'ix_candidates_question_id', ['question_id']),
+    ('questions', 'ix_questions_session_id', ['session_id']),
+    ('answers', 'ix_answers_question_id', ['question_id']),
+    ('session_settings', 'ix_session_settings_session_id', ['session_id']),
+    ('feedback', 'ix_feedback_user_id', ['user_id']),
+    ('voting_sessions', 'ix_voting_sessions_creator_id', ['creator_id']),
+    ('whitelists', 'ix_whitelists_user_id', ['user_id']),
+    ('group_whitelists', 'ix_group_whitelists_group_id', ['group_id']),
+    ('group_memberships', 'ix_group_memberships_user_id', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, name, columns in UNIQUE_PAIRS:
+        group_by = ', '.join(columns)
+        op.execute(sa.text(f'DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {group_by})'))
+        op.create_index(name, table, columns, unique=True)
+    for table, name, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table, name, columns in reversed(UNIQUE_PAIRS):
+        op.drop_index(name, table_name=table)
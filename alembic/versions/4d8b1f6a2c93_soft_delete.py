@@ -0,0 +1,50 @@
+"""Soft delete
+
+Revision ID: 4d8b1f6a2c93
+Revises: e93a4f1d7b26
+Create Date: 2026-10-19 18:12:44.530127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8b1f6a2c93'
+down_revision: Union[str, None] = 'e93a4f1d7b26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('purge_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('step', sa.Integer(), nullable=False),
+    sa.Column('rows_deleted', sa.Integer(), nullable=False),
+    sa.Column('time_created', sa.DateTime(), nullable=True),
+    sa.Column('time_started', sa.DateTime(), nullable=True),
+    sa.Column('time_finished', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_purge_jobs_id'), 'purge_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_purge_jobs_status'), 'purge_jobs', ['status'], unique=False)
+    #Plain ADD COLUMN, nullable columns need no table rebuild on SQLite
+    op.add_column('voting_sessions', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('deleted_at')
+    with op.batch_alter_table('voting_sessions') as batch_op:
+        batch_op.drop_column('deleted_at')
+    op.drop_index(op.f('ix_purge_jobs_status'), table_name='purge_jobs')
+    op.drop_index(op.f('ix_purge_jobs_id'), table_name='purge_jobs')
+    op.drop_table('purge_jobs')
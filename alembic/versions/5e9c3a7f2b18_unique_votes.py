@@ -0,0 +1,50 @@
+"""Unique votes
+
+Revision ID: 5e9c3a7f2b18
+Revises: c4f7b2e8a915
+Create Date: 2026-10-19 21:12:40.553918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9c3a7f2b18'
+down_revision: Union[str, None] = 'c4f7b2e8a915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('votes', sa.Column('single_choice', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.execute(sa.text(
+        "UPDATE votes SET single_choice = TRUE WHERE question_id IN "
+        "(SELECT id FROM questions WHERE type IN ('single_choice', 'true_false'))"
+    ))
+    #Duplicates slipped through the old SELECT-then-INSERT check under concurrency, the first vote is the one that counts
+    op.execute(sa.text(
+        'DELETE FROM votes WHERE id NOT IN (SELECT MIN(id) FROM votes GROUP BY user_id, candidate_id)'
+    ))
+    op.execute(sa.text(
+        'DELETE FROM votes WHERE single_choice AND id NOT IN '
+        '(SELECT MIN(id) FROM votes WHERE single_choice GROUP BY user_id, question_id)'
+    ))
+    op.drop_index('ix_votes_user_id_candidate_id', table_name='votes')
+    op.create_index('ix_votes_user_id_candidate_id', 'votes', ['user_id', 'candidate_id'], unique=True)
+    op.create_index(
+        'ix_votes_user_id_question_id_single_choice', 'votes', ['user_id', 'question_id'], unique=True,
+        sqlite_where=sa.text('single_choice'), postgresql_where=sa.text('single_choice'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_votes_user_id_question_id_single_choice', table_name='votes')
+    op.drop_index('ix_votes_user_id_candidate_id', table_name='votes')
+    op.create_index('ix_votes_user_id_candidate_id', 'votes', ['user_id', 'candidate_id'], unique=False)
+    with op.batch_alter_table('votes') as batch_op:
+        batch_op.drop_column('single_choice')
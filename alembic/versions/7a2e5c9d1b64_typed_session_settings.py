@@ -0,0 +1,38 @@
+"""Typed session settings
+
+Revision ID: 7a2e5c9d1b64
+Revises: 4d8b1f6a2c93
+Create Date: 2026-10-19 19:03:27.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a2e5c9d1b64'
+down_revision: Union[str, None] = '4d8b1f6a2c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('voting_sessions', sa.Column('settings_version', sa.Integer(), server_default='0', nullable=False))
+    #A setting posted twice kept both rows, the newest one is the value that counts
+    op.execute(sa.text(
+        'DELETE FROM session_settings WHERE id NOT IN '
+        '(SELECT MAX(id) FROM session_settings GROUP BY session_id, setting_name)'
+    ))
+    op.drop_index('ix_session_settings_session_id', table_name='session_settings')
+    op.create_index('ix_session_settings_session_id_setting_name', 'session_settings', ['session_id', 'setting_name'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_session_settings_session_id_setting_name', table_name='session_settings')
+    op.create_index('ix_session_settings_session_id', 'session_settings', ['session_id'], unique=False)
+    with op.batch_alter_table('voting_sessions') as batch_op:
+        batch_op.drop_column('settings_version')
@@ -0,0 +1,63 @@
+"""Session search
+
+Revision ID: 9b3d6f1e8a42
+Revises: 5e9c3a7f2b18
+Create Date: 2026-10-19 23:05:12.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3d6f1e8a42'
+down_revision: Union[str, None] = '5e9c3a7f2b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE voting_sessions_search USING fts5("
+    "title, description, content='voting_sessions', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER voting_sessions_search_insert AFTER INSERT ON voting_sessions BEGIN "
+    "INSERT INTO voting_sessions_search(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER voting_sessions_search_delete AFTER DELETE ON voting_sessions BEGIN "
+    "INSERT INTO voting_sessions_search(voting_sessions_search, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER voting_sessions_search_update AFTER UPDATE OF title, description ON voting_sessions BEGIN "
+    "INSERT INTO voting_sessions_search(voting_sessions_search, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO voting_sessions_search(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    #Index the sessions that already exist
+    "INSERT INTO voting_sessions_search(voting_sessions_search) VALUES ('rebuild')",
+)
+
+POSTGRESQL_UPGRADE = (
+    "ALTER TABLE voting_sessions ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX ix_voting_sessions_search_vector ON voting_sessions USING gin (search_vector)",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    statements = SQLITE_UPGRADE if dialect == "sqlite" else POSTGRESQL_UPGRADE if dialect == "postgresql" else ()
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS voting_sessions_search_{trigger}"))
+        op.execute(sa.text("DROP TABLE IF EXISTS voting_sessions_search"))
+    elif dialect == "postgresql":
+        op.execute(sa.text("DROP INDEX IF EXISTS ix_voting_sessions_search_vector"))
+        op.execute(sa.text("ALTER TABLE voting_sessions DROP COLUMN IF EXISTS search_vector"))
@@ -0,0 +1,54 @@
+"""Vote session and question
+
+Revision ID: b52e07f9c3d1
+Revises: 8f41d2c6b0a7
+Create Date: 2026-10-19 16:05:52.918344
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b52e07f9c3d1'
+down_revision: Union[str, None] = '8f41d2c6b0a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('votes') as batch_op:
+        batch_op.add_column(sa.Column('question_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('session_id', sa.Integer(), nullable=True))
+
+    #Copy each vote's question and session from its candidate
+    op.execute(sa.text(
+        'UPDATE votes SET question_id = (SELECT candidates.question_id FROM candidates WHERE candidates.id = votes.candidate_id)'
+    ))
+    op.execute(sa.text(
+        'UPDATE votes SET session_id = (SELECT questions.session_id FROM questions WHERE questions.id = votes.question_id)'
+    ))
+    #Votes left pointing at deleted candidates cannot be placed in a session
+    op.execute(sa.text('DELETE FROM votes WHERE question_id IS NULL OR session_id IS NULL'))
+
+    with op.batch_alter_table('votes') as batch_op:
+        batch_op.alter_column('question_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('session_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_votes_question_id_questions', 'questions', ['question_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_foreign_key('fk_votes_session_id_voting_sessions', 'voting_sessions', ['session_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_index('ix_votes_session_id_question_id_candidate_id', ['session_id', 'question_id', 'candidate_id'], unique=False)
+        batch_op.create_index('ix_votes_question_id_candidate_id', ['question_id', 'candidate_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('votes') as batch_op:
+        batch_op.drop_index('ix_votes_question_id_candidate_id')
+        batch_op.drop_index('ix_votes_session_id_question_id_candidate_id')
+        batch_op.drop_constraint('fk_votes_session_id_voting_sessions', type_='foreignkey')
+        batch_op.drop_constraint('fk_votes_question_id_questions', type_='foreignkey')
+        batch_op.drop_column('session_id')
+        batch_op.drop_column('question_id')
@@ -0,0 +1,75 @@
+"""Session lifecycle
+
+Revision ID: c4f7b2e8a915
+Revises: 7a2e5c9d1b64
+Create Date: 2026-10-19 19:47:52.906214
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f7b2e8a915'
+down_revision: Union[str, None] = '7a2e5c9d1b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+voting_sessions = sa.table('voting_sessions', sa.column('id', sa.Integer()), sa.column('close_at', sa.DateTime()))
+session_settings = sa.table(
+    'session_settings',
+    sa.column('session_id', sa.Integer()), sa.column('setting_name', sa.String()), sa.column('setting_value', sa.String())
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('voting_sessions', sa.Column('open_at', sa.DateTime(), nullable=True))
+    op.add_column('voting_sessions', sa.Column('close_at', sa.DateTime(), nullable=True))
+    op.add_column('voting_sessions', sa.Column('closed_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_voting_sessions_pending_close_at', 'voting_sessions', ['close_at'], unique=False,
+        sqlite_where=sa.text('close_at IS NOT NULL AND closed_at IS NULL'),
+        postgresql_where=sa.text('close_at IS NOT NULL AND closed_at IS NULL'),
+    )
+    op.create_table('session_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('votes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['voting_sessions.id'], name='fk_session_results_session_id_voting_sessions', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_session_results_id'), 'session_results', ['id'], unique=False)
+    op.create_index(op.f('ix_session_results_session_id'), 'session_results', ['session_id'], unique=False)
+
+    #close_at used to be a session setting, the scheduler needs it as an indexed column
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(session_settings.c.session_id, session_settings.c.setting_value)
+        .where(session_settings.c.setting_name == 'close_at')
+    ).all()
+    for session_id, value in rows:
+        try:
+            close_at = datetime.fromisoformat(value)
+        except ValueError:
+            continue
+        connection.execute(voting_sessions.update().where(voting_sessions.c.id == session_id).values(close_at=close_at))
+    op.execute(session_settings.delete().where(session_settings.c.setting_name == 'close_at'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_session_results_session_id'), table_name='session_results')
+    op.drop_index(op.f('ix_session_results_id'), table_name='session_results')
+    op.drop_table('session_results')
+    op.drop_index('ix_voting_sessions_pending_close_at', table_name='voting_sessions')
+    with op.batch_alter_table('voting_sessions') as batch_op:
+        batch_op.drop_column('closed_at')
+        batch_op.drop_column('close_at')
+        batch_op.drop_column('open_at')
@@ -0,0 +1,58 @@
+"""On delete cascade
+
+Revision ID: e93a4f1d7b26
+Revises: b52e07f9c3d1
+Create Date: 2026-10-19 16:31:08.640217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e93a4f1d7b26'
+down_revision: Union[str, None] = 'b52e07f9c3d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+#Names the unnamed foreign keys SQLite reflects so batch mode can drop them
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+#(column, referenced table, ON DELETE action) for every foreign key that changes
+FOREIGN_KEYS = {
+    'administrators': [('id', 'users', 'CASCADE')],
+    'feedback': [('user_id', 'users', 'SET NULL')],
+    'user_groups': [('creator_id', 'users', 'CASCADE')],
+    'voting_sessions': [('creator_id', 'users', 'CASCADE')],
+    'group_memberships': [('group_id', 'user_groups', 'CASCADE'), ('user_id', 'users', 'CASCADE')],
+    'group_whitelists': [('group_id', 'user_groups', 'CASCADE'), ('session_id', 'voting_sessions', 'CASCADE')],
+    'questions': [('session_id', 'voting_sessions', 'CASCADE')],
+    'session_settings': [('session_id', 'voting_sessions', 'CASCADE')],
+    'whitelists': [('user_id', 'users', 'CASCADE'), ('session_id', 'voting_sessions', 'CASCADE')],
+    'answers': [('question_id', 'questions', 'CASCADE')],
+    'candidates': [('question_id', 'questions', 'CASCADE')],
+}
+
+
+def replace_foreign_keys(cascade: bool) -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, keys in FOREIGN_KEYS.items():
+        existing = {tuple(fk['constrained_columns']): fk['name'] for fk in inspector.get_foreign_keys(table)}
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referent, ondelete in keys:
+                name = f'fk_{table}_{column}_{referent}'
+                batch_op.drop_constraint(existing.get((column,)) or name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referent, [column], ['id'], ondelete=ondelete if cascade else None)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    replace_foreign_keys(cascade=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    replace_foreign_keys(cascade=False)
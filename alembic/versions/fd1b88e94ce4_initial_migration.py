@@ -21,35 +21,175 @@ depends_on: Union[str, Sequence[str], None] = None
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index(op.f('ix_user_groups_id'), table_name='user_groups')
-    op.drop_table('user_groups')
-    op.drop_index(op.f('ix_group_memberships_id'), table_name='group_memberships')
-    op.drop_table('group_memberships')
-    # ### end Alembic commands ###
-
-
-def downgrade() -> None:
-    """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.create_table('group_memberships',
-    sa.Column('id', sa.INTEGER(), nullable=False),
-    sa.Column('group_id', sa.INTEGER(), nullable=False),
-    sa.Column('user_id', sa.INTEGER(), nullable=False),
-    sa.Column('time_joined', sa.DATETIME(), nullable=True),
-    sa.ForeignKeyConstraint(['group_id'], ['user_groups.id'], ),
+    op.create_table('api_keys',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('app_name', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key'),
+    sa.UniqueConstraint('app_name')
+    )
+    op.create_index(op.f('ix_api_keys_key'), 'api_keys', ['key'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=False),
+    sa.Column('time_created', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('administrators',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('feedback',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('feedback_date', sa.DateTime(), nullable=True),
     sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
     sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_group_memberships_id'), 'group_memberships', ['id'], unique=False)
+    op.create_index(op.f('ix_feedback_id'), 'feedback', ['id'], unique=False)
+    op.create_index(op.f('ix_feedback_title'), 'feedback', ['title'], unique=False)
     op.create_table('user_groups',
-    sa.Column('id', sa.INTEGER(), nullable=False),
-    sa.Column('name', sa.VARCHAR(), nullable=False),
-    sa.Column('description', sa.VARCHAR(), nullable=True),
-    sa.Column('creator_id', sa.INTEGER(), nullable=False),
-    sa.Column('time_created', sa.DATETIME(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('creator_id', sa.Integer(), nullable=False),
+    sa.Column('time_created', sa.DateTime(), nullable=True),
     sa.ForeignKeyConstraint(['creator_id'], ['users.id'], ),
     sa.PrimaryKeyConstraint('id'),
     sa.UniqueConstraint('name')
     )
     op.create_index(op.f('ix_user_groups_id'), 'user_groups', ['id'], unique=False)
+    op.create_table('voting_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('creator_id', sa.Integer(), nullable=False),
+    sa.Column('time_created', sa.DateTime(), nullable=True),
+    sa.Column('is_published', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['creator_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_voting_sessions_id'), 'voting_sessions', ['id'], unique=False)
+    op.create_table('group_memberships',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('time_joined', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['user_groups.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_group_memberships_id'), 'group_memberships', ['id'], unique=False)
+    op.create_table('group_whitelists',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=True),
+    sa.Column('session_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['user_groups.id'], ),
+    sa.ForeignKeyConstraint(['session_id'], ['voting_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_group_whitelists_id'), 'group_whitelists', ['id'], unique=False)
+    op.create_table('questions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('is_quiz', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['voting_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_questions_id'), 'questions', ['id'], unique=False)
+    op.create_table('session_settings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('setting_name', sa.String(), nullable=False),
+    sa.Column('setting_value', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['voting_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_session_settings_id'), 'session_settings', ['id'], unique=False)
+    op.create_table('whitelists',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('session_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['voting_sessions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_whitelists_id'), 'whitelists', ['id'], unique=False)
+    op.create_table('answers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_answers_id'), 'answers', ['id'], unique=False)
+    op.create_table('candidates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('user_input', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_candidates_id'), 'candidates', ['id'], unique=False)
+    op.create_table('votes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('vote_date', sa.DateTime(), nullable=True),
+    sa.Column('user_input', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_votes_id'), 'votes', ['id'], unique=False)
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index(op.f('ix_votes_id'), table_name='votes')
+    op.drop_table('votes')
+    op.drop_index(op.f('ix_candidates_id'), table_name='candidates')
+    op.drop_table('candidates')
+    op.drop_index(op.f('ix_answers_id'), table_name='answers')
+    op.drop_table('answers')
+    op.drop_index(op.f('ix_whitelists_id'), table_name='whitelists')
+    op.drop_table('whitelists')
+    op.drop_index(op.f('ix_session_settings_id'), table_name='session_settings')
+    op.drop_table('session_settings')
+    op.drop_index(op.f('ix_questions_id'), table_name='questions')
+    op.drop_table('questions')
+    op.drop_index(op.f('ix_group_whitelists_id'), table_name='group_whitelists')
+    op.drop_table('group_whitelists')
+    op.drop_index(op.f('ix_group_memberships_id'), table_name='group_memberships')
+    op.drop_table('group_memberships')
+    op.drop_index(op.f('ix_voting_sessions_id'), table_name='voting_sessions')
+    op.drop_table('voting_sessions')
+    op.drop_index(op.f('ix_user_groups_id'), table_name='user_groups')
+    op.drop_table('user_groups')
+    op.drop_index(op.f('ix_feedback_title'), table_name='feedback')
+    op.drop_index(op.f('ix_feedback_id'), table_name='feedback')
+    op.drop_table('feedback')
+    op.drop_table('administrators')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_api_keys_key'), table_name='api_keys')
+    op.drop_table('api_keys')
     # ### end Alembic commands ###
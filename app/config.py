@@ -1,6 +1,111 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+
+#Shared store used by multi-worker deployments (see app/services/shared_store.py)
+SHARED_STORE_URL = os.getenv("SHARED_STORE_URL", "tcp://127.0.0.1:6400")
+
+#Rate limiting, rules are "name:path prefix:tokens per second:burst" separated by commas
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_RULES = os.getenv(
+    "RATE_LIMIT_RULES",
+    "votes:/api/votes:20:40,votes:/api/async/votes:20:40,"
+    "sessions:/api/voting-sessions:10:30,sessions:/api/async/voting-sessions:10:30,api:/api/:50:100"
+)
+#Seconds an API key found (or not found) in api_keys is remembered by the rate limiter. Only known keys get a bucket
+#of their own, any other caller is limited per client address
+RATE_LIMIT_API_KEY_TTL_SECONDS = float(os.getenv("RATE_LIMIT_API_KEY_TTL_SECONDS", "60"))
+
+#Database connection pool, ignored for in-memory SQLite databases
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+#Server-side statement timeout in milliseconds (PostgreSQL only), 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+#SQLite tuning, "performance" enables WAL, synchronous=NORMAL and the pragmas below, "default" leaves SQLite as is
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+#Negative values are KiB, positive values are pages
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+#Serve GET routes from a separate pool of query-only connections
+SQLITE_READ_POOL = os.getenv("SQLITE_READ_POOL", "false").lower() == "true"
+
+#Async driver URL for the async routes, derived from DATABASE_URL when not set
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+#Async routes do not hold a threadpool slot per request, so their pool can be sized separately
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", str(DB_POOL_SIZE)))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+
+#Optional read replica for GET routes, clients that just wrote are kept on the primary until the replica catches up
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+#How long a replica's write position is trusted before it is read again, in seconds
+REPLICA_POSITION_TTL = float(os.getenv("REPLICA_POSITION_TTL", "0.5"))
+#Seconds between copies of a SQLite primary onto a SQLite replica, a local stand-in for streaming replication (0 disables it)
+SQLITE_REPLICA_SYNC_INTERVAL = float(os.getenv("SQLITE_REPLICA_SYNC_INTERVAL", "1.0"))
+
+#What startup does with the schema: "upgrade" runs pending Alembic migrations, "verify" refuses to start on an
+#out of date schema, "skip" leaves it alone (tests build their own)
+DB_STARTUP_MODE = os.getenv("DB_STARTUP_MODE", "upgrade")
+#File locked while one worker migrates so the others wait instead of migrating at the same time
+DB_MIGRATION_LOCK = os.getenv("DB_MIGRATION_LOCK", os.path.join(tempfile.gettempdir(), "votingsystem-migrations.lock"))
+
+#Background removal of soft-deleted sessions and users: rows deleted per transaction, pause between chunks so
+#other writers get the database in between, and seconds between checks for new jobs (0 disables the purger)
+PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "1000"))
+PURGE_PAUSE_SECONDS = float(os.getenv("PURGE_PAUSE_SECONDS", "0.05"))
+PURGE_POLL_INTERVAL = float(os.getenv("PURGE_POLL_INTERVAL", "5.0"))
+
+#Compiled session settings kept in memory per worker, checked against the session's settings_version on every read
+SESSION_CONFIG_CACHE_SIZE = int(os.getenv("SESSION_CONFIG_CACHE_SIZE", "4096"))
+
+#Sessions are closed and their results frozen this many seconds after close_at, so votes accepted just before the
+#deadline have committed by the time the tally is taken
+SESSION_CLOSE_GRACE_SECONDS = float(os.getenv("SESSION_CLOSE_GRACE_SECONDS", "2.0"))
+#Seconds between reloads of upcoming close times set by other workers (0 disables the scheduler)
+SESSION_SCHEDULER_RELOAD_INTERVAL = float(os.getenv("SESSION_SCHEDULER_RELOAD_INTERVAL", "60"))
+
+#Candidates, questions and sessions cached per worker for the vote and results routes. Writes through this worker
+#invalidate entries at once, changes made through other workers show up once an entry is this many seconds old
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "30"))
+
+#Facet counts of the session searches cached per worker, user and filters. New and changed sessions show up in the
+#counts once an entry is this many seconds old
+FACET_CACHE_TTL_SECONDS = float(os.getenv("FACET_CACHE_TTL_SECONDS", "10"))
+FACET_CACHE_SIZE = int(os.getenv("FACET_CACHE_SIZE", "1024"))
+
+#By-id lookups of sessions, questions, candidates, groups and users cached for the read routes. Every commit through this
+#worker invalidates what it wrote at once, changes made through other workers show up once an entry is this many seconds old
+ENTITY_CACHE_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", "5"))
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+#"shared" adds a second level in the shared store that all workers fill and invalidate, "memory" keeps entries per worker
+ENTITY_CACHE_BACKEND = os.getenv("ENTITY_CACHE_BACKEND", "memory")
+ENTITY_CACHE_SHARED_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_SHARED_TTL_SECONDS", "300"))
+#Cache entries the shared store process keeps before dropping the least recently used
+SHARED_CACHE_SIZE = int(os.getenv("SHARED_CACHE_SIZE", "100000"))
+
+#Encoded JSON of the list routes cached per worker under the versions of the tables they read, which every commit through
+#this worker bumps. Writes through other workers show up once an entry is this many seconds old
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "5"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+#Larger bodies are not cached, smaller ones are not worth a gzip copy
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+RESPONSE_CACHE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_CACHE_GZIP_MIN_BYTES", "1024"))
+
+#Fuzzy user typeahead served from an in-memory trigram index per worker. Users created through other workers are
+#picked up once the index is this many seconds old
+USER_INDEX_REFRESH_SECONDS = float(os.getenv("USER_INDEX_REFRESH_SECONDS", "5"))
+#Build the index in the background at startup instead of on the first lookup
+USER_INDEX_PRELOAD = os.getenv("USER_INDEX_PRELOAD", "true").lower() == "true"
+#Posting list entries a lookup counts before common trigrams only add to the users found so far
+USER_INDEX_MAX_SCANNED = int(os.getenv("USER_INDEX_MAX_SCANNED", "20000"))
+#Share of the query's trigrams a user must have to be returned
+USER_INDEX_MIN_OVERLAP = float(os.getenv("USER_INDEX_MIN_OVERLAP", "0.4"))
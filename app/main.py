@@ -3,16 +3,27 @@ from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
-from app.services.database import Base, engine
-from app.middleware import api_key_middleware
+from contextlib import asynccontextmanager
 
-import subprocess
+from app.services.database import engine, is_sqlite_file, SessionLocal
+from app.services.migrations import prepare_database
+from app.services.purger import Purger
+from app.services import session_lifecycle
+from app.services.user_index import user_index
+from app.middleware import api_key_middleware, RateLimitMiddleware
+from app.services.rate_limiter import create_rate_limiter
+from app.services.replication import CONSISTENCY_HEADER, SQLiteReplicator, configure_replica
+from app.config import (
+    RATE_LIMIT_ENABLED, DATABASE_URL, DATABASE_REPLICA_URL, SQLITE_REPLICA_SYNC_INTERVAL, PURGE_POLL_INTERVAL,
+    SESSION_SCHEDULER_RELOAD_INTERVAL, USER_INDEX_PRELOAD
+)
 
 #database routes
 from app.routes.user_routes import router as user_router
 from app.routes.admin_routes import router as admin_router
 from app.routes.api_key_routes import router as api_key_router
 from app.routes.voting_session_routes import router as voting_session_router
+from app.routes.session_search_routes import router as session_search_router
 from app.routes.session_settings_routes import router as session_settings_router
 from app.routes.question_routes import router as question_router
 from app.routes.answer_routes import router as answer_router
@@ -22,22 +33,62 @@ from app.routes.whitelist_routes import router as whitelist_router
 from app.routes.feedback_routes import router as feedback_router
 from app.routes.user_group_routes import router as user_group_router
 from app.routes.group_whitelist_routes import router as group_whitelist_router
+from app.routes.metrics_routes import router as metrics_router
+from app.routes.async_vote_routes import router as async_vote_router
+from app.routes.async_voting_session_routes import router as async_voting_session_router
 
 #Keycloak SSO router
 from app.routes.auth_routes import router as auth_router
 
-Base.metadata.drop_all(bind=engine)
-Base.metadata.create_all(bind=engine)
-#exit()
+#Serve GET routes from the replica, clients send back X-Consistency-Token to read their own writes
+if DATABASE_REPLICA_URL:
+    configure_replica(DATABASE_REPLICA_URL)
+
+#Runs once per worker before it accepts requests and again when it shuts down
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    #Apply pending migrations (or only check the revision, see DB_STARTUP_MODE) under a cross-process lock
+    prepare_database(engine)
+
+    replicator = None
+    if DATABASE_REPLICA_URL and is_sqlite_file(DATABASE_URL) and is_sqlite_file(DATABASE_REPLICA_URL) and SQLITE_REPLICA_SYNC_INTERVAL > 0:
+        replicator = SQLiteReplicator(DATABASE_URL, DATABASE_REPLICA_URL, SQLITE_REPLICA_SYNC_INTERVAL)
+        replicator.sync()
+        replicator.start()
+
+    #Deletes what soft-deleted sessions and users leave behind, in small chunks so voting elsewhere is never blocked for long
+    purger = None
+    if PURGE_POLL_INTERVAL > 0:
+        purger = Purger(SessionLocal).start()
+
+    #Closes sessions at their close_at and freezes their results, reloading pending close times from the database
+    if SESSION_SCHEDULER_RELOAD_INTERVAL > 0:
+        session_lifecycle.scheduler = session_lifecycle.SessionScheduler(SessionLocal).start()
 
-#Update migrations
-#subprocess.run(["alembic", "upgrade", "head"])
+    #Trigram index behind the user typeahead, a few seconds of work per 100k users
+    if USER_INDEX_PRELOAD:
+        user_index.preload(SessionLocal)
 
-app = FastAPI()
+    yield
+
+    if session_lifecycle.scheduler is not None:
+        session_lifecycle.scheduler.stop()
+        session_lifecycle.scheduler = None
+    if purger is not None:
+        purger.stop()
+    if replicator is not None:
+        replicator.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 #Add SessionMiddleware with a secure secret key
 app.add_middleware(SessionMiddleware, secret_key="your-very-secret-key")
 
+#Throttle clients per known API key, or per client address for everyone else, see RATE_LIMIT_RULES in app/config.py
+#Added before CORS so throttled responses still carry CORS headers
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=create_rate_limiter())
+
 #Add CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +96,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    #Browsers only let scripts read these if they are exposed
+    expose_headers=[CONSISTENCY_HEADER, "Retry-After", "ETag"],
 )
 
 #Uncomment the api keys line if you want to enable authentication!
@@ -61,6 +114,7 @@ app.include_router(user_router, prefix="/api/users", tags=["Users"])
 app.include_router(admin_router, prefix="/api/admin", tags=["Admins"])
 #app.include_router(api_key_router, prefix="/api", tags=["API Keys"])
 app.include_router(voting_session_router, prefix="/api/voting-sessions", tags=["Voting Sessions"])
+app.include_router(session_search_router, prefix="/api/voting-sessions", tags=["Session Search"])
 app.include_router(session_settings_router, prefix="/api/session-settings", tags=["Session Settings"])
 app.include_router(question_router, prefix="/api/questions", tags=["Questions"])
 app.include_router(answer_router, prefix="/api/answers", tags=["Answers"])
@@ -70,5 +124,10 @@ app.include_router(whitelist_router, prefix="/api/whitelist", tags=["Whitelist"]
 app.include_router(feedback_router, prefix="/api/feedback", tags=["Feedback"])
 app.include_router(user_group_router, prefix="/api/user-groups", tags=["UserGroups"])
 app.include_router(group_whitelist_router, prefix="/api/group-whitelist", tags=["GroupWhitelist"])
+app.include_router(metrics_router, prefix="/api/metrics", tags=["Metrics"])
+
+#Async versions of the hottest routes
+app.include_router(async_vote_router, prefix="/api/async/votes", tags=["Votes (async)"])
+app.include_router(async_voting_session_router, prefix="/api/async/voting-sessions", tags=["Voting Sessions (async)"])
 
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
\ No newline at end of file
@@ -1,7 +1,12 @@
 from fastapi import Request, HTTPException
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.models.api_key import APIKey
 from app.services.database import SessionLocal
+from app.services.cache import TTLCache, MISSING
+from app.services.rate_limiter import RateLimiter, retry_after_header
+from app.config import RATE_LIMIT_API_KEY_TTL_SECONDS
 
 #Check if the provided API key exists in the database.
 def verify_api_key(api_key: str):
@@ -21,3 +26,61 @@ async def api_key_middleware(request: Request, call_next):
             raise HTTPException(status_code=403, detail="Missing API Key")
         verify_api_key(api_key)
     return await call_next(request)
+
+#API keys looked up in api_keys, so the limiter does not query the database on every request
+known_api_keys = TTLCache("rate_limit_api_keys", RATE_LIMIT_API_KEY_TTL_SECONDS, 10000)
+
+#True if the API key exists in the database
+def is_known_api_key(api_key: str) -> bool:
+    known = known_api_keys.get(api_key)
+    if known is MISSING:
+        db: Session = SessionLocal()
+        try:
+            known = db.query(APIKey.key).filter(APIKey.key == api_key).first() is not None
+        finally:
+            db.close()
+        known_api_keys.put(api_key, known)
+    return known
+
+#Identify the caller by API key when the key is known, otherwise by client address. User ids sent in headers or the
+#query string are not verified, a client could get a fresh bucket with every request by changing them
+def rate_limit_key(scope, is_known_key=is_known_api_key) -> str:
+    api_key = dict(scope["headers"]).get(b"x-api-key")
+    if api_key and is_known_key(api_key.decode("latin-1")):
+        return "key:" + api_key.decode("latin-1")
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+#ASGI middleware applying token bucket limits per route group
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter, is_known_key=is_known_api_key):
+        self.app = app
+        self.limiter = limiter
+        self.is_known_key = is_known_key
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        rule = self.limiter.match(scope["path"])
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        #Checking an API key may query the database
+        if any(name == b"x-api-key" for name, _ in scope["headers"]):
+            key = await run_in_threadpool(rate_limit_key, scope, self.is_known_key)
+        else:
+            key = rate_limit_key(scope, self.is_known_key)
+        if self.limiter.backend.blocking:
+            decision = await run_in_threadpool(self.limiter.hit, rule, key)
+        else:
+            decision = self.limiter.hit(rule, key)
+
+        if not decision.allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": retry_after_header(decision)},
+            )
+            return await response(scope, receive, send)
+        return await self.app(scope, receive, send)
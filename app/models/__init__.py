@@ -7,4 +7,9 @@ from .session_settings import SessionSettings
 from .vote import Vote
 from .voting_session import VotingSession
 from .feedback import Feedback
-from .whitelist import Whitelist
\ No newline at end of file
+from .whitelist import Whitelist
+from .group_whitelist import GroupWhitelist
+from .user_group import UserGroup, GroupMembership
+from .write_position import WritePosition
+from .purge_job import PurgeJob
+from .session_result import SessionResult
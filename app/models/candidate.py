@@ -6,10 +6,10 @@ class Candidate(Base):
     __tablename__ = "candidates"
 
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     user_input = Column(String, nullable=True)
 
     question = relationship("Question", back_populates="candidates")
-    votes = relationship("Vote", back_populates="candidate", cascade="all, delete-orphan")
+    votes = relationship("Vote", back_populates="candidate", cascade="all, delete-orphan", passive_deletes=True)
@@ -7,7 +7,7 @@ class Feedback(Base):
     __tablename__ = "feedback"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
     title = Column(String, index=True)
     description = Column(Text)
     feedback_date = Column(DateTime, default=datetime.utcnow)
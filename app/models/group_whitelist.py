@@ -1,14 +1,18 @@
 from tokenize import group
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.services.database import Base
 
 class GroupWhitelist(Base):
     __tablename__ = "group_whitelists"
+    #A group is whitelisted for a session at most once, access checks filter on both columns
+    __table_args__ = (
+        Index("ix_group_whitelists_session_id_group_id", "session_id", "group_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    group_id = Column(Integer, ForeignKey("user_groups.id"))
-    session_id = Column(Integer, ForeignKey("voting_sessions.id"))
+    group_id = Column(Integer, ForeignKey("user_groups.id", ondelete="CASCADE"), index=True)
+    session_id = Column(Integer, ForeignKey("voting_sessions.id", ondelete="CASCADE"))
     
     group = relationship("UserGroup", back_populates="group_whitelist")
     session = relationship("VotingSession", back_populates="group_whitelist")
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.services.database import Base
+
+#Removal of a soft-deleted session or user, worked through a few rows at a time by app.services.purger
+class PurgeJob(Base):
+    __tablename__ = "purge_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    #pending, running or done
+    status = Column(String, nullable=False, default="pending", index=True)
+    #Index into the purge plan of the entity, the tables before it are already empty
+    step = Column(Integer, nullable=False, default=0)
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    time_created = Column(DateTime, default=datetime.utcnow)
+    time_started = Column(DateTime, nullable=True)
+    time_finished = Column(DateTime, nullable=True)
@@ -2,16 +2,19 @@ from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from app.services.database import Base
 
+#Question types that take one answer per voter, enforced on votes by ix_votes_user_id_question_id_single_choice
+SINGLE_CHOICE_TYPES = frozenset({"single_choice", "true_false"})
+
 class Question(Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("voting_sessions.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("voting_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     type = Column(String, nullable=False)
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     is_quiz = Column(Boolean, default=False)
 
     voting_session = relationship("VotingSession", back_populates="questions")
-    answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan")
-    candidates = relationship("Candidate", back_populates="question", cascade="all, delete-orphan")
\ No newline at end of file
+    answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan", passive_deletes=True)
+    candidates = relationship("Candidate", back_populates="question", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.orm import relationship
+from app.services.database import Base
+
+#Final vote count of a candidate, written once when the session closes and never updated
+class SessionResult(Base):
+    __tablename__ = "session_results"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("voting_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    question_id = Column(Integer, nullable=False)
+    candidate_id = Column(Integer, nullable=False)
+    votes = Column(Integer, nullable=False)
+
+    session = relationship("VotingSession", back_populates="results")
@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.services.database import Base
 
 class SessionSettings(Base):
     __tablename__ = "session_settings"
+    #One row per setting, the bulk upsert updates it in place and loading a session's settings filters on session_id
+    __table_args__ = (
+        Index("ix_session_settings_session_id_setting_name", "session_id", "setting_name", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("voting_sessions.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("voting_sessions.id", ondelete="CASCADE"), nullable=False)
     setting_name = Column(String, nullable=False)
     setting_value = Column(String, nullable=False)
 
@@ -11,26 +11,27 @@ class User(Base):
     email = Column(String, index=True, unique=True, nullable=False)
     password = Column(String, nullable=False)
     time_created = Column(DateTime(timezone=True), server_default=func.now())
+    #Set when the user is deleted, the purger removes the row and its dependents later
+    deleted_at = Column(DateTime, nullable=True)
 
-    voting_sessions = relationship("VotingSession", back_populates="creator")
-    votes = relationship("Vote", back_populates="user", cascade="all, delete-orphan")
-    feedbacks = relationship("Feedback", back_populates="user")
-    whitelist = relationship("Whitelist", back_populates="user", cascade="all, delete-orphan")
-    membership = relationship("GroupMembership", back_populates="user")
-    user_group = relationship("UserGroup", back_populates="creator")
+    voting_sessions = relationship("VotingSession", back_populates="creator", passive_deletes=True)
+    votes = relationship("Vote", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    feedbacks = relationship("Feedback", back_populates="user", passive_deletes=True)
+    whitelist = relationship("Whitelist", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    membership = relationship("GroupMembership", back_populates="user", passive_deletes=True)
+    user_group = relationship("UserGroup", back_populates="creator", passive_deletes=True)
 
     type = Column(String, nullable=False)
 
     __mapper_args__ = {
         "polymorphic_identity": "user",
         "polymorphic_on": type,
-        "with_polymorphic": "*"
     }
 
 class AdminUser(User):
     __tablename__ = "administrators"
 
-    id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
 
     __mapper_args__ = {
         "polymorphic_identity": "admin",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.services.database import Base
 from datetime import datetime
@@ -9,19 +9,23 @@ class UserGroup(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
     description = Column(String, nullable=True)
-    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    creator_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     time_created = Column(DateTime, default=datetime.utcnow)
 
-    members = relationship("GroupMembership", back_populates="group", cascade="all, delete-orphan")
+    members = relationship("GroupMembership", back_populates="group", cascade="all, delete-orphan", passive_deletes=True)
     creator = relationship("User", back_populates="user_group")
-    group_whitelist = relationship("GroupWhitelist", back_populates="group")
+    group_whitelist = relationship("GroupWhitelist", back_populates="group", passive_deletes=True)
 
 class GroupMembership(Base):
     __tablename__ = "group_memberships"
+    #A user joins a group at most once, membership checks filter on both columns
+    __table_args__ = (
+        Index("ix_group_memberships_group_id_user_id", "group_id", "user_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    group_id = Column(Integer, ForeignKey("user_groups.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    group_id = Column(Integer, ForeignKey("user_groups.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     time_joined = Column(DateTime, default=datetime.utcnow)
 
     group = relationship("UserGroup", back_populates="members")
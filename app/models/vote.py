@@ -1,15 +1,56 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, String, Boolean, Index, event, select, inspect, false, text
 from sqlalchemy.orm import relationship
 from app.services.database import Base
+from app.models.candidate import Candidate
+from app.models.question import Question, SINGLE_CHOICE_TYPES
 
 class Vote(Base):
     __tablename__ = "votes"
+    #One vote per user and candidate, votes by user use the leading column. A single-choice question takes one vote
+    #per user, the partial index leaves the other questions out. Inserts skip rows either index rejects (ON CONFLICT).
+    #Session and question tallies group by candidate inside these indexes without reading the table.
+    __table_args__ = (
+        Index("ix_votes_user_id_candidate_id", "user_id", "candidate_id", unique=True),
+        Index(
+            "ix_votes_user_id_question_id_single_choice", "user_id", "question_id", unique=True,
+            sqlite_where=text("single_choice"), postgresql_where=text("single_choice"),
+        ),
+        Index("ix_votes_session_id_question_id_candidate_id", "session_id", "question_id", "candidate_id"),
+        Index("ix_votes_question_id_candidate_id", "question_id", "candidate_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=False)
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), nullable=False, index=True)
+    #Copied from the candidate when the vote is written so session reads never join through candidates and questions
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    session_id = Column(Integer, ForeignKey("voting_sessions.id", ondelete="CASCADE"), nullable=False)
+    #Copied from the question type so the partial unique index can tell single-choice votes apart
+    single_choice = Column(Boolean, nullable=False, server_default=false())
     vote_date = Column(DateTime, default=func.now())
     user_input = Column(String, nullable=True)
 
     user = relationship("User", back_populates="votes")
     candidate = relationship("Candidate", back_populates="votes")
+
+def _locate_candidate(connection, target):
+    location = connection.execute(
+        select(Candidate.question_id, Question.session_id, Question.type)
+        .join(Question, Question.id == Candidate.question_id)
+        .where(Candidate.id == target.candidate_id)
+    ).first()
+    if location is not None:
+        target.question_id, target.session_id = location.question_id, location.session_id
+        target.single_choice = location.type in SINGLE_CHOICE_TYPES
+
+#Fill question_id, session_id and single_choice for votes created with only a candidate
+@event.listens_for(Vote, "before_insert")
+def set_vote_location(mapper, connection, target):
+    if target.question_id is None or target.session_id is None or target.single_choice is None:
+        _locate_candidate(connection, target)
+
+#Keep them in step when a vote moves to another candidate
+@event.listens_for(Vote, "before_update")
+def update_vote_location(mapper, connection, target):
+    if inspect(target).attrs.candidate_id.history.has_changes():
+        _locate_candidate(connection, target)
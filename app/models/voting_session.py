@@ -1,20 +1,74 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index, text, event, DDL
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.services.database import Base
 
 class VotingSession(Base):
     __tablename__ = "voting_sessions"
+    #Close times the scheduler still has to act on, only sessions that are not closed yet are indexed
+    __table_args__ = (
+        Index(
+            "ix_voting_sessions_pending_close_at", "close_at",
+            sqlite_where=text("close_at IS NOT NULL AND closed_at IS NULL"),
+            postgresql_where=text("close_at IS NOT NULL AND closed_at IS NULL"),
+        ),
+        #A creator's sessions in a range of creation times, in creation order. Also serves lookups by creator_id alone
+        Index("ix_voting_sessions_creator_id_time_created", "creator_id", "time_created"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    creator_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     time_created = Column(DateTime, default=datetime.utcnow)
     is_published = Column(Boolean, default=False)
+    #Votes are accepted from open_at until close_at, either may be left open-ended
+    open_at = Column(DateTime, nullable=True)
+    close_at = Column(DateTime, nullable=True)
+    #Set by the scheduler when it freezes the tally into session_results
+    closed_at = Column(DateTime, nullable=True)
+    #Bumped by every settings change, cached SessionConfig objects of an older version are stale
+    settings_version = Column(Integer, nullable=False, default=0, server_default="0")
+    #Set when the session is deleted, the purger removes the row and its children later
+    deleted_at = Column(DateTime, nullable=True)
 
     creator = relationship("User", back_populates="voting_sessions")
-    settings = relationship("SessionSettings", back_populates="voting_session", cascade="all, delete-orphan")
-    questions = relationship("Question", back_populates="voting_session", cascade="all, delete-orphan")
-    whitelist = relationship("Whitelist", back_populates="session", cascade="all, delete-orphan")
-    group_whitelist = relationship("GroupWhitelist", back_populates="session", cascade="all, delete-orphan")
\ No newline at end of file
+    #Children are removed by ON DELETE CASCADE, passive_deletes stops the ORM loading them just to delete them one by one
+    settings = relationship("SessionSettings", back_populates="voting_session", cascade="all, delete-orphan", passive_deletes=True)
+    questions = relationship("Question", back_populates="voting_session", cascade="all, delete-orphan", passive_deletes=True)
+    whitelist = relationship("Whitelist", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
+    group_whitelist = relationship("GroupWhitelist", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
+    results = relationship("SessionResult", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
+#Full-text index over title and description. On SQLite an FTS5 table reads the text from voting_sessions and triggers keep
+#it in sync, on PostgreSQL a generated tsvector column does. A batch migration that rebuilds voting_sessions on SQLite
+#drops the triggers with the old table and has to create them again
+SEARCH_TABLE = "voting_sessions_search"
+SEARCH_VECTOR = "search_vector"
+SEARCH_VECTOR_INDEX = "ix_voting_sessions_search_vector"
+
+SQLITE_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    f"title, description, content='voting_sessions', content_rowid='id', "
+    f"tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON voting_sessions BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON voting_sessions BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF title, description ON voting_sessions BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+POSTGRESQL_SEARCH_DDL = (
+    f"ALTER TABLE voting_sessions ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR} tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX} ON voting_sessions USING gin ({SEARCH_VECTOR})",
+)
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(VotingSession.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRESQL_SEARCH_DDL:
+    event.listen(VotingSession.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+#The FTS5 table outlives its content table otherwise and breaks the next create_all
+event.listen(VotingSession.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}").execute_if(dialect="sqlite"))
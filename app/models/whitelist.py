@@ -1,13 +1,17 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.services.database import Base
 
 class Whitelist(Base):
     __tablename__ = "whitelists"
+    #A user is whitelisted for a session at most once, access checks filter on both columns
+    __table_args__ = (
+        Index("ix_whitelists_session_id_user_id", "session_id", "user_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    session_id = Column(Integer, ForeignKey("voting_sessions.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    session_id = Column(Integer, ForeignKey("voting_sessions.id", ondelete="CASCADE"))
     
     user = relationship("User", back_populates="whitelist")
     session = relationship("VotingSession", back_populates="whitelist")
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer
+from app.services.database import Base
+
+#Single row counting committed write transactions, replicated with the data so replicas can report how far behind they are
+class WritePosition(Base):
+    __tablename__ = "write_positions"
+
+    id = Column(Integer, primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
@@ -1,16 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from typing import List, Optional
 
-from app.services.database import get_db
-from app.models import AdminUser
+from app.services.database import get_db, get_read_db
+from app.models import AdminUser, PurgeJob
+from app.services.soft_delete import INCLUDE_DELETED, soft_delete_user
+from app.services.catalog import catalog
+from app.services.user_index import user_index
 from app.schemas.user_schema import AdminCreate, AdminOut, AdminBase, LoginRequest
+from app.schemas.purge_job import PurgeJobResponse
+from app.services.purger import PURGE_PLANS
 from passlib.hash import bcrypt
 
 router = APIRouter()
 
 #Get all admins
 @router.get("/", response_model=list[AdminOut])
-def get_admins(db: Session = Depends(get_db)):
+def get_admins(db: Session = Depends(get_read_db)):
     admins = db.query(AdminUser).all()
     return admins
 
@@ -18,13 +24,13 @@ def get_admins(db: Session = Depends(get_db)):
 @router.post("/", response_model=AdminOut)
 def create_admin(admin: AdminCreate, db: Session = Depends(get_db)):
 
-    #Check if admin already exists
-    db_admin = db.query(AdminUser).filter(AdminUser.username == admin.username).first()
+    #Check if admin already exists, deleted admins keep their name until the purger removes them
+    db_admin = db.query(AdminUser).filter(AdminUser.username == admin.username).execution_options(**{INCLUDE_DELETED: True}).first()
     if db_admin:
         raise HTTPException(status_code=400, detail="Admin already registered")
     
     #Check if email already exists
-    db_admin = db.query(AdminUser).filter(AdminUser.email == admin.email).first()
+    db_admin = db.query(AdminUser).filter(AdminUser.email == admin.email).execution_options(**{INCLUDE_DELETED: True}).first()
     if db_admin:
         raise HTTPException(status_code=400, detail="Admin already registered")
 
@@ -36,6 +42,7 @@ def create_admin(admin: AdminCreate, db: Session = Depends(get_db)):
     db.add(new_admin)
     db.commit()
     db.refresh(new_admin)
+    user_index.add(new_admin.id, new_admin.username, new_admin.email)
     return new_admin
 
 #Delete admin
@@ -47,14 +54,16 @@ def delete_user(admin_id: int, db: Session = Depends(get_db)):
     if not admin:
         raise HTTPException(status_code=404, detail="Admin not found")
 
-
-    db.delete(admin)
+    indexed = (admin.username, admin.email)
+    soft_delete_user(db, admin)
     db.commit()
+    catalog.invalidate_creator(admin_id)
+    user_index.remove(admin_id, *indexed)
     return {"message": "Admin deleted successfully"}
 
 #Get admin by username
 @router.get("/username/{admin_name}", response_model=AdminOut)
-def get_user(admin_name: str, db: Session = Depends(get_db)):
+def get_user(admin_name: str, db: Session = Depends(get_read_db)):
 
     #Check if admin exists
     admin = db.query(AdminUser).filter(AdminUser.username == admin_name).first()
@@ -63,7 +72,7 @@ def get_user(admin_name: str, db: Session = Depends(get_db)):
 
 #Get admin by id
 @router.get("/id/{admin_id}", response_model=AdminOut)
-def get_user(admin_id: int, db: Session = Depends(get_db)):
+def get_user(admin_id: int, db: Session = Depends(get_read_db)):
 
     #Check if admin exists
     admin = db.query(AdminUser).filter(AdminUser.id == admin_id).first()
@@ -72,7 +81,7 @@ def get_user(admin_id: int, db: Session = Depends(get_db)):
 
 #Get admin by email
 @router.get("/email/{user_email}", response_model=AdminOut)
-def get_user(user_email: str, db: Session = Depends(get_db)):
+def get_user(user_email: str, db: Session = Depends(get_read_db)):
 
     #Check if admin exists
     admin = db.query(AdminUser).filter(AdminUser.email == user_email).first()
@@ -81,7 +90,7 @@ def get_user(user_email: str, db: Session = Depends(get_db)):
 
 #Check if admin exists
 @router.get("/{admin_name}/exists", response_model=dict)
-def check_user_exists(admin_name: str, db: Session = Depends(get_db)):
+def check_user_exists(admin_name: str, db: Session = Depends(get_read_db)):
 
     admin = db.query(AdminUser).filter(AdminUser.username == admin_name).first()
     return {"exists": admin is not None}
@@ -97,3 +106,36 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
     if not bcrypt.verify(request.password, admin.password):
         raise HTTPException(status_code=404, detail="Invalid email or password")
     return {"username": admin.username, "email": admin.email}
+
+#Job with the number of steps in its plan, so clients can show step / steps
+def purge_job_progress(job: PurgeJob) -> dict:
+    return {
+        "id": job.id,
+        "entity": job.entity,
+        "entity_id": job.entity_id,
+        "status": job.status,
+        "step": job.step,
+        "steps": len(PURGE_PLANS[job.entity]),
+        "rows_deleted": job.rows_deleted,
+        "time_created": job.time_created,
+        "time_started": job.time_started,
+        "time_finished": job.time_finished,
+    }
+
+#Get the progress of background purges, newest first
+@router.get("/purge-jobs", response_model=List[PurgeJobResponse])
+def get_purge_jobs(status: Optional[str] = None, limit: int = 100, db: Session = Depends(get_read_db)):
+    query = db.query(PurgeJob)
+    if status is not None:
+        query = query.filter(PurgeJob.status == status)
+    jobs = query.order_by(PurgeJob.id.desc()).limit(limit).all()
+    return [purge_job_progress(job) for job in jobs]
+
+#Get the progress of one background purge
+@router.get("/purge-jobs/{job_id}", response_model=PurgeJobResponse)
+def get_purge_job(job_id: int, db: Session = Depends(get_read_db)):
+    job = db.query(PurgeJob).filter(PurgeJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return purge_job_progress(job)
+
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
 from app.models.answer import Answer
 from app.models.question import Question
 from app.schemas.answer import (
@@ -40,7 +40,7 @@ def create_answer(
 
 #Get all answers for a question
 @router.get("/{question_id}/answers/", response_model=List[AnswerResponse])
-def get_answers(question_id: int, db: Session = Depends(get_db)):
+def get_answers(question_id: int, db: Session = Depends(get_read_db)):
 
     #Check if the question exists
     question = db.query(Question).filter(Question.id == question_id).first()
@@ -52,7 +52,7 @@ def get_answers(question_id: int, db: Session = Depends(get_db)):
 
 #Get a specific answer
 @router.get("/answers/{answer_id}", response_model=AnswerResponse)
-def get_answer(answer_id: int, db: Session = Depends(get_db)):
+def get_answer(answer_id: int, db: Session = Depends(get_read_db)):
 
     #Check if the answer exists
     answer = db.query(Answer).filter(Answer.id == answer_id).first()
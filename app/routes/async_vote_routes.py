@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from datetime import datetime
+from app.services.database import get_async_db
+from app.services import queries
+from app.services.session_config import load_session_config_async
+from app.services.catalog import lookup_candidate_async, lookup_session_async
+from app.services.single_flight import coalesce
+from app.services.vote_eligibility import REFUSED_VOTE, selection_rejection, vote_rejection
+from app.models.question import SINGLE_CHOICE_TYPES
+from app.schemas.vote import VoteCreate, VoteResponse
+
+#Async versions of the busiest vote routes, served on the event loop instead of the threadpool
+router = APIRouter()
+
+#Cast a vote
+@router.post("/", response_model=VoteResponse)
+async def cast_vote(vote_data: VoteCreate, db: AsyncSession = Depends(get_async_db)):
+    #Find the candidate's question and session in the catalog, then check the voter in one statement
+    location = await lookup_candidate_async(db, vote_data.candidate_id)
+    if not location:
+        #Report a missing user ahead of a missing candidate
+        if not (await db.execute(queries.user_exists(vote_data.user_id))).scalar():
+            raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    checks = (await db.execute(queries.vote_eligibility(vote_data.user_id, vote_data.candidate_id, location.question_id, location.session_id))).one()
+
+    #Check the session accepts votes right now and that the user has selections left
+    config = await load_session_config_async(db, location.session_id, checks.settings_version)
+    rejection = vote_rejection(vote_data.user_id, location, checks, config, datetime.utcnow())
+    if rejection:
+        raise HTTPException(status_code=rejection[0], detail=rejection[1])
+
+    #The unique indexes on votes reject a duplicate or a second answer to a single-choice question and the insert's
+    #WHERE rejects votes over the limits. The voter's lock makes a concurrent request count the votes after this one
+    #commits, so of two requests only the first is written
+    lock = queries.lock_voter(db.get_bind().dialect.name, vote_data.user_id, location.session_id)
+    if lock is not None:
+        await db.execute(lock)
+    new_vote = (await db.execute(queries.insert_vote(
+        db.get_bind().dialect.name,
+        vote_data.user_id,
+        vote_data.candidate_id,
+        location.question_id,
+        location.session_id,
+        vote_data.user_input,
+        single_choice=location.question_type in SINGLE_CHOICE_TYPES,
+        question_limit=config.max_selections,
+        session_limit=config.max_votes
+    ))).first()
+    if new_vote is None:
+        await db.rollback()
+        #Count the user's votes again to tell which index or limit refused the insert
+        checks = (await db.execute(queries.vote_eligibility(vote_data.user_id, vote_data.candidate_id, location.question_id, location.session_id))).one()
+        rejection = selection_rejection(location, checks, config) or REFUSED_VOTE
+        raise HTTPException(status_code=rejection[0], detail=rejection[1])
+    await db.commit()
+
+    return new_vote
+
+#Get total votes per candidate in a session, requests arriving while the votes are read share that read
+@router.get("/session/{session_id}/results", response_model=List[VoteResponse])
+@coalesce("async_vote_results", "session_id", model=List[VoteResponse])
+async def get_session_results(session_id: int, db: AsyncSession = Depends(get_async_db)):
+
+    #Get all votes in the session, a deleted session has none left to show
+    votes = []
+    if await lookup_session_async(db, session_id):
+        votes = (await db.execute(queries.votes_for_session(session_id))).scalars().all()
+
+    #Without votes, tell a session missing questions or candidates apart from one nobody has voted in yet
+    if not votes:
+        if not (await db.execute(queries.session_has_questions(session_id))).scalar():
+            raise HTTPException(status_code=404, detail="No questions found for this session")
+        if not (await db.execute(queries.session_has_candidates(session_id))).scalar():
+            raise HTTPException(status_code=404, detail="No candidates found for this session")
+
+    return votes
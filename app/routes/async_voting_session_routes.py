@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.services.database import get_async_db
+from app.services import queries
+from app.schemas.voting_session import VotingSessionResponse, SessionAccessResponse
+
+#Async versions of the busiest voting session routes, served on the event loop instead of the threadpool
+router = APIRouter()
+
+#Get all voting sessions
+@router.get("/", response_model=List[VotingSessionResponse])
+async def get_voting_sessions(db: AsyncSession = Depends(get_async_db)):
+    sessions = (await db.execute(queries.all_voting_sessions())).scalars().all()
+
+    return sessions
+
+#Check if a user may vote in a session
+@router.get("/{session_id}/access/{user_id}", response_model=SessionAccessResponse)
+async def check_session_access(session_id: int, user_id: int, db: AsyncSession = Depends(get_async_db)):
+    has_access = (await db.execute(queries.has_session_access(session_id, user_id))).scalar()
+
+    return {"has_access": bool(has_access)}
@@ -13,6 +13,7 @@ from pathlib import Path
 from app.models import User
 
 from app.services.database import get_db
+from app.services.user_index import user_index
 
 #Create router and authentification
 router = APIRouter()
@@ -79,6 +80,7 @@ async def auth(request: Request, db: Session = Depends(get_db)):
             db.add(user)
             db.commit()
             db.refresh(user)
+            user_index.add(user.id, user.username, user.email)
         
         #Redirect to frontend with just username and user ID
         frontend_url = f"http://{FRONTEND_URL}/auth/callback"
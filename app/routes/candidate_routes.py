@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
+from app.services.catalog import catalog
+from app.services.entity_cache import entity_cache
+from app.services.response_cache import cache_response
+from app.services import queries
 from app.models.candidate import Candidate
 from app.models.question import Question
 from app.schemas.candidate import (
@@ -39,9 +43,10 @@ def create_candidate(
 
 #Get all candidates for a question
 @router.get("/{question_id}/candidates/", response_model=List[CandidateResponse])
-def get_candidates(question_id: int, db: Session = Depends(get_db)):
+@cache_response("question_candidates", "question_id", models=(Question, Candidate), model=List[CandidateResponse])
+def get_candidates(question_id: int, db: Session = Depends(get_read_db)):
     #Check if question exists
-    question = db.query(Question).filter(Question.id == question_id).first()
+    question = entity_cache.get(db, Question, question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
@@ -50,9 +55,11 @@ def get_candidates(question_id: int, db: Session = Depends(get_db)):
 
 #Get a specific candidate
 @router.get("/candidates/{candidate_id}", response_model=CandidateResponse)
-def get_candidate(candidate_id: int, db: Session = Depends(get_db)):
+def get_candidate(candidate_id: int, db: Session = Depends(get_read_db)):
     #Check if candidate exists
-    candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
+    candidate = entity_cache.get(db, Candidate, candidate_id)
+    if not candidate:
+        raise HTTPException(status_code=404, detail="Candidate not found")
 
     return candidate
 
@@ -87,21 +94,19 @@ def delete_candidate(candidate_id: int, db: Session = Depends(get_db)):
 
     db.delete(candidate)
     db.commit()
+    catalog.invalidate_candidate(candidate_id)
     return {"detail": "Candidate deleted successfully"}
 
 #Get all candidates per voting session
 @router.get("/session/{session_id}", response_model=List[CandidateResponse])
-def get_candidates_by_session(session_id: int, db: Session = Depends(get_db)):
-    
-    #Check voting session exists and queary all question for it
-    questions = db.query(Question).filter(Question.session_id == session_id).all()
-    if not questions:
-        raise HTTPException(status_code=404, detail="No questions found for this voting session.")
+@cache_response("session_candidates", "session_id", models=(Question, Candidate), model=List[CandidateResponse])
+def get_candidates_by_session(session_id: int, db: Session = Depends(get_read_db)):
 
-    #Extract all question IDs
-    question_ids = [q.id for q in questions]
+    #Get all candidates of the session's questions in one query
+    candidates = db.execute(queries.candidates_for_session(session_id)).scalars().all()
 
-    #Get all candidates related to those questions
-    candidates = db.query(Candidate).filter(Candidate.question_id.in_(question_ids)).all()
+    #Check voting session has questions
+    if not candidates and not db.execute(queries.session_has_questions(session_id)).scalar():
+        raise HTTPException(status_code=404, detail="No questions found for this voting session.")
 
-    return candidates
\ No newline at end of file
+    return candidates
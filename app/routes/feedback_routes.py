@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
 from app.models.user import User
 from app.models.feedback import Feedback
 from app.schemas.feedback import FeedbackCreate, FeedbackResponse
@@ -26,14 +26,14 @@ def create_feedback(feedback: FeedbackCreate, db: Session = Depends(get_db)):
 
 # Get all feedback from users
 @router.get("/", response_model=list[FeedbackResponse])
-def get_all_feedback(db: Session = Depends(get_db)):
+def get_all_feedback(db: Session = Depends(get_read_db)):
 
     feedbacks = db.query(Feedback).all()
     return feedbacks
 
 # Get feedback by user
 @router.get("/user/{user_id}", response_model=list[FeedbackResponse])
-def get_feedback_by_user(user_id: int, db: Session = Depends(get_db)):
+def get_feedback_by_user(user_id: int, db: Session = Depends(get_read_db)):
 
     #Check if any feedback exists
     feedbacks = db.query(Feedback).filter(Feedback.user_id == user_id).all()
@@ -42,7 +42,7 @@ def get_feedback_by_user(user_id: int, db: Session = Depends(get_db)):
 
 # Get feedback by ID
 @router.get("/{feedback_id}", response_model=FeedbackResponse)
-def get_feedback_by_id(feedback_id: int, db: Session = Depends(get_db)):
+def get_feedback_by_id(feedback_id: int, db: Session = Depends(get_read_db)):
 
     #Check if feedback exists
     feedback = db.query(Feedback).filter(Feedback.id == feedback_id).first()
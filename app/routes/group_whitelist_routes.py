@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
+from app.services import queries
 from app.schemas.group_whitelist import (
     WhitelistCreate, WhitelistResponse, WhitelistBySessionRequest, 
     WhitelistByUserRequest, WhitelistByID
@@ -24,6 +25,14 @@ def add_to_whitelist(whitelist_entry: WhitelistCreate, db: Session = Depends(get
     session = db.query(VotingSession).filter(VotingSession.id == whitelist_entry.session_id).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+
+    #Check if the group is already whitelisted
+    existing_entry = db.query(GroupWhitelist.id).filter(
+        GroupWhitelist.session_id == whitelist_entry.session_id,
+        GroupWhitelist.group_id == whitelist_entry.group_id
+    ).first()
+    if existing_entry:
+        raise HTTPException(status_code=400, detail="Group is already whitelisted for this session")
     
     #Create a new whitelist entry
     new_entry = GroupWhitelist(**whitelist_entry.dict())
@@ -36,10 +45,10 @@ def add_to_whitelist(whitelist_entry: WhitelistCreate, db: Session = Depends(get
 
 #Get all whitelist entries (groups and their sessions)
 @router.get("/", response_model=list[WhitelistResponse])
-def get_whitelist(db: Session = Depends(get_db)):
+def get_whitelist(db: Session = Depends(get_read_db)):
 
     #Check if any whitelists entries exist
-    whitelists = db.query(GroupWhitelist).all()
+    whitelists = db.execute(queries.response_rows(GroupWhitelist, WhitelistResponse)).all()
 
     return whitelists
 
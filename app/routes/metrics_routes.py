@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from app.services.metrics import registry
+
+router = APIRouter()
+
+#Get a snapshot of all in-process metrics
+@router.get("/")
+def get_metrics():
+    return registry.snapshot()
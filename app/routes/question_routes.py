@@ -1,8 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
-from app.services.database import get_db
-from app.models.question import Question
+from app.services.database import get_db, get_read_db
+from app.services.catalog import catalog
+from app.services.entity_cache import entity_cache
+from app.services.response_cache import cache_response
+from app.models.question import Question, SINGLE_CHOICE_TYPES
+from app.models.vote import Vote
 from app.models.voting_session import VotingSession
 from app.schemas.question import (
     QuestionCreate,
@@ -40,10 +46,11 @@ def create_question(
 
 #Get all questions for a voting session
 @router.get("/{session_id}/questions/", response_model=List[QuestionResponse])
-def get_questions(session_id: int, db: Session = Depends(get_db)):
+@cache_response("session_questions", "session_id", models=(VotingSession, Question), model=List[QuestionResponse])
+def get_questions(session_id: int, db: Session = Depends(get_read_db)):
 
     #Check if the voting session exists
-    session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
+    session = entity_cache.get(db, VotingSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Voting session not found")
 
@@ -54,10 +61,12 @@ def get_questions(session_id: int, db: Session = Depends(get_db)):
 
 #Get a specific question
 @router.get("/questions/{question_id}", response_model=QuestionResponse)
-def get_question(question_id: int, db: Session = Depends(get_db)):
+def get_question(question_id: int, db: Session = Depends(get_read_db)):
     
     #Check if question exists 
-    question = db.query(Question).filter(Question.id == question_id).first()
+    question = entity_cache.get(db, Question, question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
 
     return question
 
@@ -74,12 +83,27 @@ def update_question(
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
+    #Votes carry the single-choice flag of their question for the unique index, a user with several votes on the
+    #question makes the switch to single-choice fail
+    single_choice = question_data.type in SINGLE_CHOICE_TYPES
+    type_changed = single_choice != (question.type in SINGLE_CHOICE_TYPES)
+
     question.type = question_data.type
     question.title = question_data.title
     question.description = question_data.description
     question.is_quiz = question_data.is_quiz
 
-    db.commit()
+    try:
+        if type_changed:
+            db.execute(
+                update(Vote).where(Vote.question_id == question_id).values(single_choice=single_choice)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Users have already voted for several candidates of this question")
+    catalog.invalidate_question(question_id)
     db.refresh(question)
     return question
 
@@ -94,4 +118,5 @@ def delete_question(question_id: int, db: Session = Depends(get_db)):
 
     db.delete(question)
     db.commit()
+    catalog.invalidate_question(question_id)
     return {"detail": "Question deleted successfully"}
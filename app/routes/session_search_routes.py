@@ -1,98 +1,113 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, or_
-from app.services.database import get_db
+from sqlalchemy import null
+from app.services.database import get_read_db
+from app.services import queries
+from app.services.search import (
+    search_terms, apply_session_search, render_snippet, created_range, keyset_page, encode_cursor, decode_cursor,
+    facet_counts, SORT_KEYS, RELEVANCE
+)
+from app.services.cache import facet_cache, MISSING
 from app.models.voting_session import VotingSession
 from app.models.user import User
-from app.models.whitelist import Whitelist
-from app.schemas.voting_session import VotingSessionResponse
-from app.schemas.session_search import VotingSessionSearchParams, WhitelistSearchParams
-from typing import List
+from app.schemas.session_search import (
+    VotingSessionSearchParams, WhitelistSearchParams, SessionSearchResult, SessionSearchPage, SessionFacets, FacetCount
+)
 
 router = APIRouter()
 
-# Search for user's own polls
-@router.get("/search/my-polls", response_model=List[VotingSessionResponse])
-def search_my_polls(
-    user_id: int,
-    params: VotingSessionSearchParams = Depends(),
-    db: Session = Depends(get_db)
-):
-    query = db.query(VotingSession).filter(VotingSession.creator_id == user_id)
+#Parameters that only pick a page or its order, the facet counts are the same for every page
+PAGE_PARAMS = {"order_by", "order_direction", "limit", "cursor", "facets"}
+
+#Counts per facet of everything the filtered query finds, cached per search, user and filters for a short ttl
+def _facets(query, search: str, user_id: int, params, db: Session) -> SessionFacets:
+    key = (search, user_id, tuple(sorted(params.model_dump(exclude=PAGE_PARAMS).items())))
+    facets = facet_cache.get(key)
+    if facets is MISSING:
+        counts = {}
+        for row in db.execute(facet_counts(query, db.get_bind().dialect.name)):
+            counts.setdefault(row.facet, []).append(FacetCount(value=row.value, label=row.label, count=row.count))
+        facets = SessionFacets(**{
+            facet: sorted(values, key=lambda value: (-value.count, value.value)) for facet, values in counts.items()
+        })
+        facet_cache.put(key, facets)
+    return facets
+
+#Filters shared by both searches, then one page in the requested order
+def _search_page(query, params, db: Session, search: str, user_id: int) -> SessionSearchPage:
+    try:
+        start, end = created_range(params.year, params.month, params.day, params.exact_date, params.start_date, params.end_date)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    match = None
+    if params.q is not None:
+        terms = search_terms(params.q)
+        if not terms:
+            raise HTTPException(status_code=400, detail="Search query has no words")
+        query, match = apply_session_search(query, db.get_bind().dialect.name, terms)
 
     #Apply specified query paremeters
-    if params.day:
-        query = query.filter(extract("day", VotingSession.time_created) == params.day)
-    if params.year:
-        query = query.filter(extract("year", VotingSession.time_created) == params.year)
-    if params.month:
-        query = query.filter(extract("month", VotingSession.time_created) == params.month)
-    if params.start_date:
-        query = query.filter(VotingSession.time_created >= params.start_date)
-    if params.end_date:
-        query = query.filter(VotingSession.time_created <= params.end_date)
-    if params.exact_date:
-        query = query.filter(VotingSession.time_created == params.exact_date)
+    if start is not None:
+        query = query.filter(VotingSession.time_created >= start)
+    if end is not None:
+        query = query.filter(VotingSession.time_created < end)
     if params.title:
         query = query.filter(VotingSession.title.ilike(f"%{params.title}%"))
-    if params.is_published is not None:
-        query = query.filter(VotingSession.is_published == params.is_published)
     if params.description:
         query = query.filter(VotingSession.description.ilike(f"%{params.description}%"))
 
-    #Order by specified column
-    if params.order_by:
-        order_column = getattr(VotingSession, params.order_by, None)
-        if order_column:
-            query = query.order_by(order_column.desc() if params.order_direction == "desc" else order_column.asc())
+    #Order by specified column, best match first is the only order for relevance
+    sort = params.order_by or (RELEVANCE if match is not None else "time_created")
+    if sort == RELEVANCE and match is not None:
+        key, descending = match.rank, False
+    elif sort in SORT_KEYS:
+        key, descending = SORT_KEYS[sort], params.order_direction == "desc"
+    else:
+        raise HTTPException(status_code=400, detail=f"Cannot order by {sort}")
+    try:
+        after = decode_cursor(params.cursor, sort, descending) if params.cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    return query.all()
+    facets = _facets(query, search, user_id, params, db) if params.facets else None
+    query = query.add_columns(match.snippet if match is not None else null())
+    rows = keyset_page(query, key, descending, after, params.limit).all()
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        next_cursor = encode_cursor(sort, descending, rows[-1].sort_key, rows[-1][0].id)
+    items = [
+        SessionSearchResult.model_validate(session).model_copy(update={"snippet": render_snippet(snippet)})
+        for session, snippet, _ in rows
+    ]
+    return SessionSearchPage(items=items, next_cursor=next_cursor, facets=facets)
+
+# Search for user's own polls
+@router.get("/search/my-polls", response_model=SessionSearchPage)
+def search_my_polls(
+    user_id: int,
+    params: VotingSessionSearchParams = Depends(),
+    db: Session = Depends(get_read_db)
+):
+    #Served by the (creator_id, time_created) index, date ranges and keyset pages by creation time included
+    query = db.query(VotingSession).filter(VotingSession.creator_id == user_id)
+    if params.is_published is not None:
+        query = query.filter(VotingSession.is_published == params.is_published)
+    return _search_page(query, params, db, "my-polls", user_id)
 
 
-#Search for polls user is whitelisted in (or polls without a whitelist)
-@router.get("/search/whitelisted", response_model=List[VotingSessionResponse])
+#Search for published polls the user is whitelisted in, directly or through one of their groups
+@router.get("/search/whitelisted", response_model=SessionSearchPage)
 def search_whitelisted_polls(
     user_id: int,
     params: WhitelistSearchParams = Depends(),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-
-    #Get IDs of sessions where the user is whitelisted
-    whitelisted_session_ids = db.query(Whitelist.session_id).filter(Whitelist.user_id == user_id).subquery()
-
-    #Query sessions that are either whitelisted for the user or don't require a whitelist
     query = db.query(VotingSession).filter(
-        or_(
-            VotingSession.id.in_(whitelisted_session_ids),
-            VotingSession.whitelist == False
-        )
+        VotingSession.is_published == True,
+        queries.session_access(VotingSession.id, user_id)
     )
-
-    #Apply specified query paremeters
     if params.creator_name:
-        query = query.join(User, VotingSession.creator_id == User.id).filter(User.name.ilike(f"%{params.creator_name}%"))
-    if params.day:
-        query = query.filter(extract("day", VotingSession.time_created) == params.day)
-    if params.year:
-        query = query.filter(extract("year", VotingSession.time_created) == params.year)
-    if params.month:
-        query = query.filter(extract("month", VotingSession.time_created) == params.month)
-    if params.start_date:
-        query = query.filter(VotingSession.time_created >= params.start_date)
-    if params.end_date:
-        query = query.filter(VotingSession.time_created <= params.end_date)
-    if params.exact_date:
-        query = query.filter(VotingSession.time_created == params.exact_date)
-    if params.title:
-        query = query.filter(VotingSession.title.ilike(f"%{params.title}%"))
-    if params.description:
-        query = query.filter(VotingSession.description.ilike(f"%{params.description}%"))
-
-    #Order by specified column
-    if params.order_by:
-        order_column = getattr(VotingSession, params.order_by, None)
-        if order_column:
-            query = query.order_by(order_column.desc() if params.order_direction == "desc" else order_column.asc())
-
-    return query.all()
-
+        query = query.join(User, VotingSession.creator_id == User.id).filter(User.username.ilike(f"%{params.creator_name}%"))
+    return _search_page(query, params, db, "whitelisted", user_id)
@@ -1,19 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
+from app.services.session_config import bump_settings_version, load_session_config, setting_error, setting_value
 from app.models.session_settings import SessionSettings
 from app.models.voting_session import VotingSession
 from app.schemas.session_settings import (
     SessionSettingsCreate,
     SessionSettingsUpdate,
-    SessionSettingsResponse
+    SessionSettingsResponse,
+    SessionConfigUpdate,
+    SessionConfigResponse
 )
 
 router = APIRouter()
 
-#Create a new session setting
-@router.post("/{session_id}/settings/", response_model=SessionSettingsResponse)
+def _check_setting(setting_data: SessionSettingsCreate):
+    error = setting_error(setting_data.setting_name, setting_data.setting_value)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+#Create a new session setting, superseded by the bulk upsert below
+@router.post("/{session_id}/settings/", response_model=SessionSettingsResponse, deprecated=True)
 def create_session_setting(
     session_id: int,
     setting_data: SessionSettingsCreate,
@@ -23,7 +32,15 @@ def create_session_setting(
     session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
     if not session:
         raise HTTPException(status_code=404, detail="Voting session not found")
+    _check_setting(setting_data)
 
+    #Check if the setting is already set
+    existing = db.query(SessionSettings).filter(
+        SessionSettings.session_id == session_id,
+        SessionSettings.setting_name == setting_data.setting_name
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Setting already exists for this session")
 
     #Create a new settings entry
     new_setting = SessionSettings(
@@ -32,14 +49,65 @@ def create_session_setting(
         setting_value=setting_data.setting_value
     )
     db.add(new_setting)
+    bump_settings_version(db, session_id)
     db.commit()
     db.refresh(new_setting)
     
     return new_setting
 
+#Set several settings of a session in one transaction, settings set to null are removed
+@router.put("/{session_id}/settings/", response_model=SessionConfigResponse)
+def upsert_session_settings(
+    session_id: int,
+    settings_data: SessionConfigUpdate,
+    db: Session = Depends(get_db)
+):
+    #Check if the voting session exists, locking it on PostgreSQL so concurrent upserts of one session queue up
+    session = db.query(VotingSession).filter(VotingSession.id == session_id).with_for_update().first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Voting session not found")
+
+    existing = {
+        setting.setting_name: setting
+        for setting in db.query(SessionSettings).filter(SessionSettings.session_id == session_id)
+    }
+    for name in settings_data.model_fields_set:
+        value = getattr(settings_data, name)
+        setting = existing.get(name)
+        if value is None:
+            if setting is not None:
+                db.delete(setting)
+        elif setting is not None:
+            setting.setting_value = setting_value(value)
+        else:
+            db.add(SessionSettings(session_id=session_id, setting_name=name, setting_value=setting_value(value)))
+
+    bump_settings_version(db, session_id)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Settings were changed by another request, try again")
+
+    db.refresh(session)
+    config = load_session_config(db, session_id, session.settings_version)
+    return {**config.model_dump(), "session_id": session_id, "settings_version": session.settings_version}
+
+#Get the typed settings of a voting session
+@router.get("/{session_id}/config", response_model=SessionConfigResponse)
+def get_session_config(session_id: int, db: Session = Depends(get_read_db)):
+
+    #Check if the voting session exists
+    version = db.query(VotingSession.settings_version).filter(VotingSession.id == session_id).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Voting session not found")
+
+    config = load_session_config(db, session_id, version)
+    return {**config.model_dump(), "session_id": session_id, "settings_version": version}
+
 #Get all settings for a voting session
 @router.get("/{session_id}/settings/", response_model=List[SessionSettingsResponse])
-def get_session_settings(session_id: int, db: Session = Depends(get_db)):
+def get_session_settings(session_id: int, db: Session = Depends(get_read_db)):
     
     #Check if the voting session exists
     session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
@@ -63,11 +131,17 @@ def update_session_setting(
     setting = db.query(SessionSettings).filter(SessionSettings.id == setting_id).first()
     if not setting:
         raise HTTPException(status_code=404, detail="Session setting not found")
+    _check_setting(setting_data)
 
     setting.setting_name = setting_data.setting_name
     setting.setting_value = setting_data.setting_value
+    bump_settings_version(db, setting.session_id)
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Setting already exists for this session")
     db.refresh(setting)
     return setting
 
@@ -79,6 +153,7 @@ def delete_session_setting(setting_id: int, db: Session = Depends(get_db)):
     if not setting:
         raise HTTPException(status_code=404, detail="Session setting not found")
 
+    bump_settings_version(db, setting.session_id)
     db.delete(setting)
     db.commit()
     return {"detail": "Session setting deleted successfully"}
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
+from app.services import queries
+from app.services.entity_cache import entity_cache
+from app.services.response_cache import cache_response
 
 from app.models.user_group import UserGroup, GroupMembership
 from app.schemas.user_group import (
@@ -48,6 +51,14 @@ def add_members(group_id: int, request: GroupMembershipCreate, db: Session = Dep
     if not user:
        raise HTTPException(status_code=404, detail="User not found")
 
+    #Check if the user is already a member
+    existing_membership = db.query(GroupMembership.id).filter(
+        GroupMembership.group_id == group_id,
+        GroupMembership.user_id == request.user_id
+    ).first()
+    if existing_membership:
+        raise HTTPException(status_code=400, detail="User is already a member of this group")
+
     #Create a new membership
     membership = GroupMembership(user_id = request.user_id, group_id = group_id)
     db.add(membership)
@@ -98,10 +109,11 @@ def delete_group(group_id: int, db: Session = Depends(get_db)):
 
 #Get all groups
 @router.get("/", response_model=list[UserGroupResponse])
-def get_whitelist(db: Session = Depends(get_db)):
+@cache_response("user_groups", models=(UserGroup,), model=list[UserGroupResponse])
+def get_whitelist(db: Session = Depends(get_read_db)):
 
     #Check if any group exists
-    groups = db.query(UserGroup).all()
+    groups = db.execute(queries.response_rows(UserGroup, UserGroupResponse)).all()
 
     return groups
 
@@ -110,7 +122,7 @@ def get_whitelist(db: Session = Depends(get_db)):
 def get_group_by_id(request: GroupByIdRequest, db: Session = Depends(get_db)):
 
     #Check if group exists
-    group = db.query(UserGroup).filter(UserGroup.id == request.group_id).first()
+    group = entity_cache.get(db, UserGroup, request.group_id)
 
     return group
 
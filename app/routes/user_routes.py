@@ -1,24 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
+from app.services import queries
 from app.models import User
+from app.services.soft_delete import INCLUDE_DELETED, soft_delete_user
+from app.services.catalog import catalog
+from app.services.user_index import user_index
+from app.services.entity_cache import entity_cache
+from app.services.response_cache import cache_response
 from app.schemas.user_schema import *
 from passlib.hash import bcrypt
 
 router = APIRouter()
 
-#Get all users
+#Get all users, encoded once per change to the users
 @router.get("/", response_model=list[UserOut])
-def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+@cache_response("users", models=(User,), model=list[UserOut])
+def get_users(db: Session = Depends(get_read_db)):
+    users = db.execute(queries.response_rows(User, UserOut)).all()
     return users
 
 #Register a new user
 @router.post("/", response_model=UserOut)
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    #Check if email already exists
-    db_user = db.query(User).filter(User.username == user.username).first()
+    #Check if email already exists, deleted users keep their name until the purger removes them
+    db_user = db.query(User).filter(User.username == user.username).execution_options(**{INCLUDE_DELETED: True}).first()
     if db_user:
         raise HTTPException(status_code=400, detail="User already registered")
     
@@ -30,6 +37,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    user_index.add(new_user.id, new_user.username, new_user.email)
     return new_user
 
 #Delete user
@@ -41,13 +49,29 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.delete(user)
+    #Hide the user and their sessions right away, the purger removes their votes and memberships in the background
+    indexed = (user.username, user.email)
+    soft_delete_user(db, user)
     db.commit()
+    catalog.invalidate_creator(user_id)
+    user_index.remove(user_id, *indexed)
     return {"message": "User deleted successfully"}
 
+#Fuzzy typeahead over usernames and emails for whitelist and group management, best matches first
+@router.get("/search", response_model=list[UserOut])
+def search_users(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db)
+):
+    #A few spare ids make up for users deleted through another worker, which this worker's index still holds
+    ids = user_index.search(db, q, limit + 5)
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(ids))} if ids else {}
+    return [users[user_id] for user_id in ids if user_id in users][:limit]
+
 #Get user by username
 @router.get("/username/{user_name}", response_model=UserOut)
-def get_user(user_name: str, db: Session = Depends(get_db)):
+def get_user(user_name: str, db: Session = Depends(get_read_db)):
 
     #Check if user exists
     user = db.query(User).filter(User.username == user_name).first()
@@ -56,16 +80,16 @@ def get_user(user_name: str, db: Session = Depends(get_db)):
 
 #Get user by id
 @router.get("/id/{user_id}", response_model=UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, db: Session = Depends(get_read_db)):
 
     #Check if user exists
-    user = db.query(User).filter(User.id == user_id).first()
+    user = entity_cache.get(db, User, user_id)
 
     return user
 
 #Get user by email
 @router.get("/email/{user_email}", response_model=UserOut)
-def get_user(user_email: str, db: Session = Depends(get_db)):
+def get_user(user_email: str, db: Session = Depends(get_read_db)):
 
     #Check if user exists
     user = db.query(User).filter(User.email == user_email).first()
@@ -74,7 +98,7 @@ def get_user(user_email: str, db: Session = Depends(get_db)):
 
 #Check if user exists
 @router.get("/{user_name}/exists", response_model=dict)
-def check_user_exists(user_name: str, db: Session = Depends(get_db)):
+def check_user_exists(user_name: str, db: Session = Depends(get_read_db)):
     user = db.query(User).filter(User.username == user_name).first()
     return {"exists": user is not None}
 
@@ -1,110 +1,199 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, func
 from sqlalchemy.orm import Session
 from typing import List
-from app.services.database import get_db
+from datetime import datetime
+from app.services.database import get_db, get_read_db
+from app.services import queries
+from app.services.session_config import load_session_config
+from app.services.catalog import lookup_candidate, lookup_session
+from app.services.single_flight import coalesce
+from app.services.vote_eligibility import REFUSED_VOTE, ballot_rejection, selection_rejection, session_rejection, vote_rejection
+from app.models.question import SINGLE_CHOICE_TYPES
 from app.models.vote import Vote
 from app.models.user import User
 from app.models.candidate import Candidate
-from app.models.question import Question
-from app.schemas.vote import VoteCreate, VoteResponse
+from app.models.voting_session import VotingSession
+from app.schemas.vote import VoteCreate, VoteResponse, VoteCount, BallotUpdate, BallotResponse
 
 router = APIRouter()
 
 #Cast a vote
 @router.post("/", response_model=VoteResponse)
 def cast_vote(vote_data: VoteCreate, db: Session = Depends(get_db)):
-    #Check if the user and candidate exist
-    user = db.query(User).filter(User.id == vote_data.user_id).first()
-    candidate = db.query(Candidate).filter(Candidate.id == vote_data.candidate_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if not candidate:
+    #Find the candidate's question and session in the catalog, then check the voter in one statement
+    location = lookup_candidate(db, vote_data.candidate_id)
+    if not location:
+        #Report a missing user ahead of a missing candidate
+        if not db.execute(queries.user_exists(vote_data.user_id)).scalar():
+            raise HTTPException(status_code=404, detail="User not found")
         raise HTTPException(status_code=404, detail="Candidate not found")
-
-    #Check if vote already cast
-    existing_vote = db.query(Vote).filter(
-        Vote.user_id == vote_data.user_id,
-        Vote.candidate_id == vote_data.candidate_id
-    ).first()
-    if existing_vote:
-        raise HTTPException(status_code=400, detail="User has already voted for this candidate")
-
-    #Create a new vote entry
-    new_vote = Vote(
-        user_id=vote_data.user_id,
-        candidate_id=vote_data.candidate_id,
-        user_input=vote_data.user_input
-    )
-    db.add(new_vote)
+    checks = db.execute(queries.vote_eligibility(vote_data.user_id, vote_data.candidate_id, location.question_id, location.session_id)).one()
+
+    #Check the session accepts votes right now and that the user has selections left
+    config = load_session_config(db, location.session_id, checks.settings_version)
+    rejection = vote_rejection(vote_data.user_id, location, checks, config, datetime.utcnow())
+    if rejection:
+        raise HTTPException(status_code=rejection[0], detail=rejection[1])
+
+    #The unique indexes on votes reject a duplicate or a second answer to a single-choice question and the insert's
+    #WHERE rejects votes over the limits. The voter's lock makes a concurrent request count the votes after this one
+    #commits, so of two requests only the first is written
+    lock = queries.lock_voter(db.get_bind().dialect.name, vote_data.user_id, location.session_id)
+    if lock is not None:
+        db.execute(lock)
+    new_vote = db.execute(queries.insert_vote(
+        db.get_bind().dialect.name,
+        vote_data.user_id,
+        vote_data.candidate_id,
+        location.question_id,
+        location.session_id,
+        vote_data.user_input,
+        single_choice=location.question_type in SINGLE_CHOICE_TYPES,
+        question_limit=config.max_selections,
+        session_limit=config.max_votes
+    )).first()
+    if new_vote is None:
+        db.rollback()
+        #Count the user's votes again to tell which index or limit refused the insert
+        checks = db.execute(queries.vote_eligibility(vote_data.user_id, vote_data.candidate_id, location.question_id, location.session_id)).one()
+        rejection = selection_rejection(location, checks, config) or REFUSED_VOTE
+        raise HTTPException(status_code=rejection[0], detail=rejection[1])
     db.commit()
-    db.refresh(new_vote)
 
     return new_vote
 
+#Replace a user's votes in a session, or in one of its questions, in one transaction
+@router.put("/ballot/{session_id}", response_model=BallotResponse)
+def update_ballot(session_id: int, ballot: BallotUpdate, db: Session = Depends(get_db)):
+    #Check the session accepts votes from this user right now
+    session = lookup_session(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Voting session not found")
+    checks = db.execute(queries.voter_eligibility(ballot.user_id, session_id)).one()
+    if not checks.user_exists:
+        raise HTTPException(status_code=404, detail="User not found")
+    rejection = session_rejection(ballot.user_id, session, checks, datetime.utcnow())
+    if rejection:
+        raise HTTPException(status_code=rejection[0], detail=rejection[1])
+
+    #Check every selected candidate belongs to the session, and to the question when the ballot is for one
+    candidate_ids = set(ballot.candidate_ids)
+    selections = db.execute(queries.ballot_candidates(session_id, candidate_ids)).all() if candidate_ids else []
+    if len(selections) < len(candidate_ids) or (
+        ballot.question_id is not None and any(selection.question_id != ballot.question_id for selection in selections)
+    ):
+        raise HTTPException(status_code=400, detail="Candidate is not part of this ballot")
+
+    #Check the new selections fit the limits, counting the votes in other questions when only one is replaced. The
+    #voter's lock keeps a concurrent vote or ballot from changing those votes until this one commits
+    lock = queries.lock_voter(db.get_bind().dialect.name, ballot.user_id, session_id)
+    if lock is not None:
+        db.execute(lock)
+    config = load_session_config(db, session_id, checks.settings_version)
+    other_votes = 0
+    if ballot.question_id is not None and config.max_votes is not None:
+        other_votes = db.query(func.count(Vote.id)).filter(
+            Vote.user_id == ballot.user_id,
+            Vote.session_id == session_id,
+            Vote.question_id != ballot.question_id
+        ).scalar()
+    rejection = ballot_rejection(selections, config, other_votes)
+    if rejection:
+        raise HTTPException(status_code=rejection[0], detail=rejection[1])
+
+    #Only changed rows are written: votes no longer selected are deleted, then new selections inserted while the
+    #ones the user already holds are skipped by the unique index. The user is never left without their votes
+    scope = [Vote.user_id == ballot.user_id, Vote.session_id == session_id]
+    if ballot.question_id is not None:
+        scope.append(Vote.question_id == ballot.question_id)
+    removed = db.execute(
+        delete(Vote).where(*scope, Vote.candidate_id.not_in(candidate_ids)).execution_options(synchronize_session=False)
+    ).rowcount
+    added = 0
+    if selections:
+        added = len(db.execute(queries.insert_ballot(db.get_bind().dialect.name, ballot.user_id, session_id, selections)).all())
+    db.commit()
+
+    votes = db.execute(queries.ballot_votes(ballot.user_id, session_id, ballot.question_id)).scalars().all()
+    return {"session_id": session_id, "user_id": ballot.user_id, "added": added, "removed": removed, "votes": votes}
+
 #Get all votes for a candidate
 @router.get("/candidate/{candidate_id}", response_model=List[VoteResponse])
-def get_votes_by_candidate(candidate_id: int, db: Session = Depends(get_db)):
+def get_votes_by_candidate(candidate_id: int, db: Session = Depends(get_read_db)):
 
     #Check if the candidate exists
     candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
-    votes = db.query(Vote).filter(Vote.candidate_id == candidate_id).all()
+    votes = db.execute(queries.response_rows(Vote, VoteResponse).where(Vote.candidate_id == candidate_id)).all()
 
     return votes
 
 #Get all votes cast by a user
 @router.get("/user/{user_id}", response_model=List[VoteResponse])
-def get_user_votes(user_id: int, db: Session = Depends(get_db)):
+def get_user_votes(user_id: int, db: Session = Depends(get_read_db)):
 
     #Check if the user exists
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    #Get all the votes for the user
-    votes = db.query(Vote).filter(Vote.user_id == user_id).all()
+    #Get all the votes for the user, the join leaves out the votes of deleted sessions
+    votes = db.execute(
+        queries.response_rows(Vote, VoteResponse)
+        .join(VotingSession, VotingSession.id == Vote.session_id)
+        .where(Vote.user_id == user_id)
+    ).all()
 
     return votes
 
 #Get all votes in a voting session
 @router.get("/session/{session_id}", response_model=List[VoteResponse])
-def get_votes_by_session(session_id: int, db: Session = Depends(get_db)):
-    
-    votes = (
-        db.query(Vote)
-        .join(Candidate)
-        .filter(Candidate.question_id == session_id)
-        .all()
-    )
+def get_votes_by_session(session_id: int, db: Session = Depends(get_read_db)):
+
+    #A deleted session has no votes left to show, like a missing one
+    if lookup_session(db, session_id) is None:
+        return []
+    votes = db.execute(queries.response_rows(Vote, VoteResponse).where(Vote.session_id == session_id)).all()
 
     return votes
 
-#Get total votes per candidate in a session
-@router.get("/session/{session_id}/results")
-def get_session_results(session_id: int, db: Session = Depends(get_db)):
-    
-    #Get all questions for the session
-    questions = db.query(Question).filter(Question.session_id == session_id).all()
+#Get total votes per candidate in a session, requests arriving while the votes are read share that read
+@router.get("/session/{session_id}/results", response_model=List[VoteResponse])
+@coalesce("vote_results", "session_id", model=List[VoteResponse])
+def get_session_results(session_id: int, db: Session = Depends(get_read_db)):
+
+    #Get all votes in the session, a deleted session has none left to show
+    votes = db.query(Vote).filter(Vote.session_id == session_id).all() if lookup_session(db, session_id) else []
+
+    #Without votes, tell a session missing questions or candidates apart from one nobody has voted in yet
+    if not votes:
+        if not db.execute(queries.session_has_questions(session_id)).scalar():
+            raise HTTPException(status_code=404, detail="No questions found for this session")
+        if not db.execute(queries.session_has_candidates(session_id)).scalar():
+            raise HTTPException(status_code=404, detail="No candidates found for this session")
+
+    return votes
+
+#Get the number of votes for each candidate in a session
+@router.get("/session/{session_id}/tally", response_model=List[VoteCount])
+@coalesce("vote_tally", "session_id", model=List[VoteCount])
+def get_session_tally(session_id: int, db: Session = Depends(get_read_db)):
 
     #Check if there are any question in the session
-    if not questions:
+    if not db.execute(queries.session_has_questions(session_id)).scalar():
         raise HTTPException(status_code=404, detail="No questions found for this session")
 
-    #Get all candidates for those questions
-    question_ids = [q.id for q in questions]
-    candidates = db.query(Candidate).filter(Candidate.question_id.in_(question_ids)).all()
-
-    #Check if there are any candidates
-    if not candidates:
-        raise HTTPException(status_code=404, detail="No candidates found for this session")
+    #A closed session's tally was frozen by the scheduler, its votes are not read again
+    session = lookup_session(db, session_id)
+    if session is not None and session.closed_at is not None:
+        return db.execute(queries.results_for_session(session_id)).all()
 
-    #Get all votes for those candidates
-    candidate_ids = [c.id for c in candidates]
-    votes = db.query(Vote).filter(Vote.candidate_id.in_(candidate_ids)).all()
+    counts = db.execute(queries.vote_counts_for_session(session_id)).all()
 
-    return votes
+    return counts
 
 #Delete a vote
 @router.delete("/{vote_id}")
@@ -115,6 +204,11 @@ def delete_vote(vote_id: int, db: Session = Depends(get_db)):
     if not vote:
         raise HTTPException(status_code=404, detail="Vote not found")
 
+    #Votes of a closed session are part of its frozen results
+    session = lookup_session(db, vote.session_id)
+    if session is not None and session.closed_at is not None:
+        raise HTTPException(status_code=403, detail="Voting session is closed")
+
     db.delete(vote)
     db.commit()
     return {"detail": "Vote deleted successfully"}
\ No newline at end of file
@@ -1,14 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
 from app.models.voting_session import VotingSession
 from app.models.whitelist import Whitelist
 from app.models.user import User
-from app.schemas.voting_session import VotingSessionCreate, VotingSessionResponse, VotingSessionUpdate, UserIDRequest
+from app.services import queries
+from app.services.soft_delete import soft_delete_voting_session
+from app.services.catalog import catalog
+from app.services.entity_cache import entity_cache
+from app.services.response_cache import cache_response
+from app.services.session_lifecycle import schedule_close
+from app.schemas.voting_session import VotingSessionCreate, VotingSessionResponse, VotingSessionUpdate, UserIDRequest, SessionAccessResponse
 
 router = APIRouter()
 
+def _check_window(open_at, close_at):
+    if open_at is not None and close_at is not None and close_at <= open_at:
+        raise HTTPException(status_code=400, detail="close_at must be after open_at")
+
 #Create a new voting session
 @router.post("/", response_model=VotingSessionResponse)
 def create_voting_session(
@@ -20,16 +30,20 @@ def create_voting_session(
     creator = db.query(User).filter(User.id == session_data.creator_id).first()
     if not creator:
         raise HTTPException(status_code=404, detail="User not found")
+    _check_window(session_data.open_at, session_data.close_at)
 
     #Create a new voting session entry
     new_session = VotingSession(
         title=session_data.title,
         description=session_data.description,
         creator_id=session_data.creator_id,
+        open_at=session_data.open_at,
+        close_at=session_data.close_at,
     )
     db.add(new_session)
     db.commit()
     db.refresh(new_session)
+    schedule_close(new_session.id, new_session.close_at)
 
     #Add creator to the whitelist
     whitelist_entry = Whitelist(
@@ -42,9 +56,10 @@ def create_voting_session(
     
     return new_session
 
-#Get all voting sessions
+#Get all voting sessions, encoded once per change to the sessions
 @router.get("/", response_model=List[VotingSessionResponse])
-def get_voting_sessions(db: Session = Depends(get_db)):
+@cache_response("voting_sessions", models=(VotingSession,), model=List[VotingSessionResponse])
+def get_voting_sessions(db: Session = Depends(get_read_db)):
 
     #Check if any sessions exists
     sessions = db.query(VotingSession).all()
@@ -53,13 +68,22 @@ def get_voting_sessions(db: Session = Depends(get_db)):
 
 #Get a voting session by ID
 @router.get("/{session_id}", response_model=VotingSessionResponse)
-def get_voting_session(session_id: int, db: Session = Depends(get_db)):
+def get_voting_session(session_id: int, db: Session = Depends(get_read_db)):
 
     #Check if session exists
-    session = db.query(VotingSession).filter(VotingSession.id == session_id).first()
+    session = entity_cache.get(db, VotingSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Voting session not found")
 
     return session
 
+#Check if a user may vote in a session, directly or through a whitelisted group
+@router.get("/{session_id}/access/{user_id}", response_model=SessionAccessResponse)
+def check_session_access(session_id: int, user_id: int, db: Session = Depends(get_read_db)):
+    has_access = db.execute(queries.has_session_access(session_id, user_id)).scalar()
+
+    return {"has_access": bool(has_access)}
+
 #Delete a voting session
 @router.delete("/{session_id}")
 def delete_voting_session(session_id: int, db: Session = Depends(get_db)):
@@ -69,9 +93,10 @@ def delete_voting_session(session_id: int, db: Session = Depends(get_db)):
     if not session:
         raise HTTPException(status_code=404, detail="Voting session not found")
     
-    #Delete
-    db.delete(session)
+    #Hide it right away, the purger removes its questions, candidates and votes in the background
+    soft_delete_voting_session(db, session)
     db.commit()
+    catalog.invalidate_session(session_id)
     return {"detail": "Voting session deleted successfully"}
 
 #Publish a voting session
@@ -86,6 +111,7 @@ def publish_voting_session(session_id: int, db: Session = Depends(get_db)):
     #Mark a voting session as published.
     session.is_published = True
     db.commit()
+    catalog.invalidate_session(session_id)
 
     return {"detail": "Voting session published successfully"}
 
@@ -125,6 +151,16 @@ def update_voting_session(
     if not db_voting_session:
         raise HTTPException(status_code=404, detail="Voting session not found")
     
+    #Check the voting window before changing anything
+    if voting_session.open_at is not None or voting_session.close_at is not None:
+        #The results of a closed session are frozen, it cannot be reopened
+        if db_voting_session.closed_at is not None:
+            raise HTTPException(status_code=400, detail="Voting session is closed")
+        open_at = voting_session.open_at if voting_session.open_at is not None else db_voting_session.open_at
+        close_at = voting_session.close_at if voting_session.close_at is not None else db_voting_session.close_at
+        _check_window(open_at, close_at)
+        db_voting_session.open_at, db_voting_session.close_at = open_at, close_at
+
     # Update the fields if provided
     if voting_session.title is not None:
         db_voting_session.title = voting_session.title
@@ -135,7 +171,9 @@ def update_voting_session(
     
     #Commit the changes
     db.commit()
+    catalog.invalidate_session(session_id)
     db.refresh(db_voting_session)
+    schedule_close(db_voting_session.id, db_voting_session.close_at)
     
     return db_voting_session
 
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from app.services.database import get_db
+from app.services.database import get_db, get_read_db
+from app.services import queries
 from app.schemas.whitelist import (
     WhitelistCreate, WhitelistResponse, WhitelistBySessionRequest, 
     WhitelistByUserRequest, WhitelistGroupUsersRequest, WhitelistByID
@@ -25,6 +26,14 @@ def add_to_whitelist(whitelist_entry: WhitelistCreate, db: Session = Depends(get
     session = db.query(VotingSession).filter(VotingSession.id == whitelist_entry.session_id).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+
+    #Check if the user is already whitelisted
+    existing_entry = db.query(Whitelist.id).filter(
+        Whitelist.session_id == whitelist_entry.session_id,
+        Whitelist.user_id == whitelist_entry.user_id
+    ).first()
+    if existing_entry:
+        raise HTTPException(status_code=400, detail="User is already whitelisted for this session")
     
     #Create a new whitelist entry
     new_entry = Whitelist(**whitelist_entry.dict())
@@ -37,10 +46,10 @@ def add_to_whitelist(whitelist_entry: WhitelistCreate, db: Session = Depends(get
 
 #Get all whitelist entries (users and their sessions)
 @router.get("/", response_model=list[WhitelistResponse])
-def get_whitelist(db: Session = Depends(get_db)):
+def get_whitelist(db: Session = Depends(get_read_db)):
 
     #Check if any whitelists entries exist
-    whitelists = db.query(Whitelist).all()
+    whitelists = db.execute(queries.response_rows(Whitelist, WhitelistResponse)).all()
 
     return whitelists
 
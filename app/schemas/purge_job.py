@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class PurgeJobResponse(BaseModel):
+    id: int
+    entity: str
+    entity_id: int
+    status: str
+    step: int
+    steps: int
+    rows_deleted: int
+    time_created: datetime
+    time_started: Optional[datetime] = None
+    time_finished: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
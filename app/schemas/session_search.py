@@ -1,30 +1,56 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
+from app.schemas.voting_session import VotingSessionResponse, _naive_utc
+
+#Largest page a search returns, pages are fetched with the next_cursor of the previous one
+MAX_SEARCH_PAGE = 200
 
 #Schemas for search query parameters
-class VotingSessionSearchParams(BaseModel):
-    day: Optional[int] = None
+class SessionSearchParamsBase(BaseModel):
+    q: Optional[str] = Field(None, description="Full-text search over title and description, results are ranked by relevance")
+    day: Optional[int] = Field(None, description="Day of the month the session was created, needs month and year")
     year: Optional[int] = None
-    month: Optional[int] = None
-    start_date: Optional[datetime] = None
-    end_date: Optional[datetime] = None
-    exact_date: Optional[datetime] = None
+    month: Optional[int] = Field(None, description="Month the session was created, needs year")
+    start_date: Optional[datetime] = Field(None, description="Created at or after this time")
+    end_date: Optional[datetime] = Field(None, description="Created before this time")
+    exact_date: Optional[datetime] = Field(None, description="Created on the same UTC calendar day")
     title: Optional[str] = None
-    is_published: Optional[bool] = None
     description: Optional[str] = None
-    order_by: Optional[str] = Field(None, description="Order by field name (e.g., 'time_created', 'title')")
+    order_by: Optional[str] = Field(None, description="Order by field name ('time_created', 'title' or 'relevance'), relevance by default when q is given")
     order_direction: Optional[str] = Field("asc", description="Sort direction ('asc' or 'desc')")
-    
-class WhitelistSearchParams(BaseModel):
+    limit: int = Field(50, ge=1, le=MAX_SEARCH_PAGE)
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous page")
+    facets: bool = Field(False, description="Also count all matching sessions per published state, creator, month and group")
+
+    _normalize_times = field_validator("start_date", "end_date", "exact_date")(_naive_utc)
+
+class VotingSessionSearchParams(SessionSearchParamsBase):
+    is_published: Optional[bool] = None
+
+class WhitelistSearchParams(SessionSearchParamsBase):
     creator_name: Optional[str] = None
-    day: Optional[int] = None
-    year: Optional[int] = None
-    month: Optional[int] = None
-    start_date: Optional[datetime] = None
-    end_date: Optional[datetime] = None
-    exact_date: Optional[datetime] = None
-    title: Optional[str] = None
-    description: Optional[str] = None
-    order_by: Optional[str] = Field(None, description="Order by field name (e.g., 'time_created', 'title')")
-    order_direction: Optional[str] = Field("asc", description="Sort direction ('asc' or 'desc')")
+
+#A session found by a search, snippet is HTML marking the matched words when the search had a q
+class SessionSearchResult(VotingSessionResponse):
+    snippet: Optional[str] = None
+
+#Number of matching sessions with one value of a facet, label is the creator's username or the group's name
+class FacetCount(BaseModel):
+    value: str
+    label: Optional[str] = None
+    count: int
+
+#Counts over every session matching the filters, not only the current page. Most frequent values first
+class SessionFacets(BaseModel):
+    is_published: List[FacetCount] = []
+    creator: List[FacetCount] = []
+    month: List[FacetCount] = []
+    group: List[FacetCount] = []
+
+#One page of search results, next_cursor is None on the last page, facets is only filled when asked for
+class SessionSearchPage(BaseModel):
+    items: List[SessionSearchResult]
+    next_cursor: Optional[str] = None
+    facets: Optional[SessionFacets] = None
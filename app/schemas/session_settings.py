@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 
 class SessionSettingsBase(BaseModel):
     setting_name: str
@@ -17,3 +17,26 @@ class SessionSettingsResponse(SessionSettingsBase):
 
     class Config:
         from_attributes = True
+
+#Typed view of a session's settings rows, one field per known setting_name. Frozen so a cached
+#instance can be shared by every request
+class SessionConfig(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    max_votes: Optional[int] = Field(default=None, ge=1)
+    max_selections: Optional[int] = Field(default=None, ge=1)
+    anonymous: bool = False
+    results_visible: bool = True
+
+#Settings written by the bulk upsert, fields left out are kept and fields set to null are removed
+class SessionConfigUpdate(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    max_votes: Optional[int] = Field(default=None, ge=1)
+    max_selections: Optional[int] = Field(default=None, ge=1)
+    anonymous: Optional[bool] = None
+    results_visible: Optional[bool] = None
+
+class SessionConfigResponse(SessionConfig):
+    session_id: int
+    settings_version: int
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class VoteBase(BaseModel):
     user_id: int
@@ -16,3 +16,24 @@ class VoteResponse(VoteBase):
 
     class Config:
         from_attributes = True
+
+class VoteCount(BaseModel):
+    question_id: int
+    candidate_id: int
+    votes: int
+
+    class Config:
+        from_attributes = True
+
+#Candidates replacing the user's votes in a session, or only their votes in question_id when it is set
+class BallotUpdate(BaseModel):
+    user_id: int
+    candidate_ids: List[int]
+    question_id: Optional[int] = None
+
+class BallotResponse(BaseModel):
+    session_id: int
+    user_id: int
+    added: int
+    removed: int
+    votes: List[VoteResponse]
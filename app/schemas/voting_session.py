@@ -1,10 +1,20 @@
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, field_validator
+from datetime import datetime, timezone
 from typing import Optional
 
+#Times are stored as naive UTC like time_created, clients may send any offset
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 class VotingSessionBase(BaseModel):
     title: str
     description: Optional[str] = None
+    open_at: Optional[datetime] = None
+    close_at: Optional[datetime] = None
+
+    _normalize_times = field_validator("open_at", "close_at")(_naive_utc)
     
 class VotingSessionCreate(VotingSessionBase):
     creator_id: int
@@ -14,15 +24,23 @@ class VotingSessionUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     is_published: Optional[bool] = None
+    open_at: Optional[datetime] = None
+    close_at: Optional[datetime] = None
+
+    _normalize_times = field_validator("open_at", "close_at")(_naive_utc)
 
 class VotingSessionResponse(VotingSessionBase):
     id: int
     creator_id: int
     time_created: datetime
     is_published: bool
+    closed_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 class UserIDRequest(BaseModel):
-    user_id: int
\ No newline at end of file
+    user_id: int
+
+class SessionAccessResponse(BaseModel):
+    has_access: bool
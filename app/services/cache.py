@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import FACET_CACHE_TTL_SECONDS, FACET_CACHE_SIZE
+from app.services.metrics import registry
+
+#Sentinel returned by TTLCache.get on a miss, a cached value may itself be None
+MISSING = object()
+
+#Small per-worker cache whose entries expire ttl seconds after they were stored, the least recently used entry is
+#dropped once it holds max_entries. For results that may be slightly stale but are costly to compute
+class TTLCache:
+    def __init__(self, name: str, ttl: float, max_entries: int, clock=time.monotonic):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        registry.counter("ttl_cache_total", cache=self.name, result="miss" if entry is None else "hit").inc()
+        return MISSING if entry is None else entry[1]
+
+    #ttl overrides the cache's ttl for this entry
+    def put(self, key, value, ttl: float = None):
+        with self._lock:
+            self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    #Drop every entry whose key matches, a scan of the whole cache for rare writes that touch many keys
+    def delete_matching(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+#Facet counts of the session searches, keyed by route, user and filters
+facet_cache = TTLCache("facets", FACET_CACHE_TTL_SECONDS, FACET_CACHE_SIZE)
@@ -0,0 +1,141 @@
+import time
+from collections import namedtuple
+from typing import Optional
+
+from app.config import CATALOG_TTL_SECONDS
+from app.services import queries
+from app.services.metrics import registry
+
+#State of a session needed to accept a vote, expires is the clock value after which it is reloaded
+SessionState = namedtuple("SessionState", "creator_id is_published open_at close_at closed_at expires")
+QuestionEntry = namedtuple("QuestionEntry", "session_id type expires")
+CandidateLocation = namedtuple("CandidateLocation", "question_id session_id question_type session")
+
+#Read-mostly copy of the candidate -> question -> session structure, filled lazily by the lookups below.
+#A candidate never moves to another question and a question never moves to another session, so candidates only
+#map to their question id and deleted candidates are caught by the vote statement. Question types and session state
+#can change and expire after ttl seconds. Plain dict reads and writes are atomic, so hits take no lock
+class Catalog:
+    def __init__(self, ttl: float = CATALOG_TTL_SECONDS, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._candidates = {}
+        self._questions = {}
+        self._sessions = {}
+        #Bumped by every invalidation, a row read before it is not stored so a slow reader cannot undo it
+        self.generation = 0
+
+    def _fresh(self, entry, now):
+        return entry is not None and entry.expires > now
+
+    def candidate(self, candidate_id: int) -> Optional[CandidateLocation]:
+        now = self.clock()
+        question_id = self._candidates.get(candidate_id)
+        question = self._questions.get(question_id) if question_id is not None else None
+        session = self._sessions.get(question.session_id) if question is not None else None
+        if not (self._fresh(question, now) and self._fresh(session, now)):
+            registry.counter("catalog_lookups_total", kind="candidate", result="miss").inc()
+            return None
+        registry.counter("catalog_lookups_total", kind="candidate", result="hit").inc()
+        return CandidateLocation(question_id, question.session_id, question.type, session)
+
+    def session(self, session_id: int) -> Optional[SessionState]:
+        session = self._sessions.get(session_id)
+        if not self._fresh(session, self.clock()):
+            registry.counter("catalog_lookups_total", kind="session", result="miss").inc()
+            return None
+        registry.counter("catalog_lookups_total", kind="session", result="hit").inc()
+        return session
+
+    def _session_state(self, row, expires) -> SessionState:
+        return SessionState(row.creator_id, row.is_published, row.open_at, row.close_at, row.closed_at, expires)
+
+    #Cache a queries.candidate_location row read while self.generation was generation
+    def store_candidate(self, candidate_id: int, row, generation: int) -> CandidateLocation:
+        expires = self.clock() + self.ttl
+        session = self._session_state(row, expires)
+        if generation == self.generation:
+            self._sessions[row.session_id] = session
+            self._questions[row.question_id] = QuestionEntry(row.session_id, row.question_type, expires)
+            self._candidates[candidate_id] = row.question_id
+        return CandidateLocation(row.question_id, row.session_id, row.question_type, session)
+
+    #Cache a queries.session_state row read while self.generation was generation
+    def store_session(self, session_id: int, row, generation: int) -> SessionState:
+        session = self._session_state(row, self.clock() + self.ttl)
+        if generation == self.generation:
+            self._sessions[session_id] = session
+        return session
+
+    #Call after the write commits, entries are read back lazily on the next lookup
+    def invalidate_candidate(self, candidate_id: int):
+        self.generation += 1
+        self._candidates.pop(candidate_id, None)
+
+    def invalidate_question(self, question_id: int):
+        self.generation += 1
+        self._questions.pop(question_id, None)
+
+    def invalidate_session(self, session_id: int):
+        self.generation += 1
+        self._sessions.pop(session_id, None)
+
+    #Sessions of a deleted user, a scan of the session entries on a rare write
+    def invalidate_creator(self, user_id: int):
+        self.generation += 1
+        for session_id, session in list(self._sessions.items()):
+            if session.creator_id == user_id:
+                self._sessions.pop(session_id, None)
+
+    def clear(self):
+        self.generation += 1
+        self._candidates.clear()
+        self._questions.clear()
+        self._sessions.clear()
+
+    def sizes(self) -> dict:
+        return {"candidates": len(self._candidates), "questions": len(self._questions), "sessions": len(self._sessions)}
+
+catalog = Catalog()
+
+#Location of a candidate and the state of its session, None if the candidate does not exist or its session is deleted
+def lookup_candidate(db, candidate_id: int) -> Optional[CandidateLocation]:
+    location = catalog.candidate(candidate_id)
+    if location is None:
+        generation = catalog.generation
+        row = db.execute(queries.candidate_location(candidate_id)).first()
+        if row is None:
+            return None
+        location = catalog.store_candidate(candidate_id, row, generation)
+    return location
+
+async def lookup_candidate_async(db, candidate_id: int) -> Optional[CandidateLocation]:
+    location = catalog.candidate(candidate_id)
+    if location is None:
+        generation = catalog.generation
+        row = (await db.execute(queries.candidate_location(candidate_id))).first()
+        if row is None:
+            return None
+        location = catalog.store_candidate(candidate_id, row, generation)
+    return location
+
+#State of a session, None if it does not exist or is deleted
+def lookup_session(db, session_id: int) -> Optional[SessionState]:
+    session = catalog.session(session_id)
+    if session is None:
+        generation = catalog.generation
+        row = db.execute(queries.session_state(session_id)).first()
+        if row is None:
+            return None
+        session = catalog.store_session(session_id, row, generation)
+    return session
+
+async def lookup_session_async(db, session_id: int) -> Optional[SessionState]:
+    session = catalog.session(session_id)
+    if session is None:
+        generation = catalog.generation
+        row = (await db.execute(queries.session_state(session_id))).first()
+        if row is None:
+            return None
+        session = catalog.store_session(session_id, row, generation)
+    return session
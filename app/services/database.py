@@ -1,16 +1,202 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
 
-from app.config import DATABASE_URL
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, StaticPool
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from app.config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, ASYNC_DB_POOL_SIZE, ASYNC_DB_MAX_OVERFLOW, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS,
+    SQLITE_PROFILE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_READ_POOL
+)
+from app.services.metrics import registry
+
+#Queue pool reporting checkout wait time and saturation
+class InstrumentedQueuePool(QueuePool):
+    pool_name = "primary"
+
+    def _record_saturation(self):
+        capacity = self.size() + max(self._max_overflow, 0)
+        registry.gauge("db_pool_checked_out", pool=self.pool_name).set(self.checkedout())
+        registry.gauge("db_pool_saturation", pool=self.pool_name).set(self.checkedout() / capacity if capacity else 0.0)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            registry.counter("db_pool_timeouts_total", pool=self.pool_name).inc()
+            raise
+        finally:
+            registry.histogram("db_pool_checkout_wait_seconds", pool=self.pool_name).observe(time.perf_counter() - start)
+            self._record_saturation()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._record_saturation()
+
+#Same instrumentation for the pool used by async engines
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+#Pool class labelled with the given name in the metrics, dispose() recreates pools of the same class
+def instrumented_pool_class(pool_name: str, is_async: bool = False):
+    base = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+    if pool_name == base.pool_name:
+        return base
+    return type(f"{base.__name__}_{pool_name}", (base,), {"pool_name": pool_name})
+
+def is_sqlite_memory(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and (url.database in (None, "", ":memory:") or "mode=memory" in str(url))
+
+#True when the URL points at a SQLite file rather than an in-memory database
+def is_sqlite_file(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite" and not is_sqlite_memory(url)
+
+#Keyword arguments for create_engine that suit the driver in the URL
+def engine_options(url, pool_name: str = "primary") -> dict:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    is_async = url.get_driver_name() in ("aiosqlite", "asyncpg")
+    pool_options = {
+        "poolclass": instrumented_pool_class(pool_name, is_async),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+    if backend == "sqlite":
+        connect_args = {"check_same_thread": False}
+        #An in-memory database only exists inside its one connection
+        if is_sqlite_memory(url):
+            return {"connect_args": connect_args, "poolclass": StaticPool}
+        return {"connect_args": connect_args, **pool_options}
+
+    if backend == "postgresql":
+        connect_args = {}
+        if DB_STATEMENT_TIMEOUT_MS and is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        elif DB_STATEMENT_TIMEOUT_MS:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+        return {"connect_args": connect_args, **pool_options}
+
+    return pool_options
+
+#PRAGMA statements run on every new SQLite connection for a profile
+def sqlite_pragmas(profile: str, read_only: bool = False) -> list[str]:
+    #SQLite ignores ON DELETE CASCADE unless foreign keys are switched on for each connection
+    pragmas = ["PRAGMA foreign_keys=ON"]
+    if profile == "performance":
+        #journal_mode is stored in the database file, so only writers need to set it
+        if not read_only:
+            pragmas.append("PRAGMA journal_mode=WAL")
+        pragmas += [
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+            f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+            f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+def _apply_pragmas(engine, pragmas: list[str]):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def create_db_engine(url=DATABASE_URL, pool_name: str = "primary", sqlite_profile: str = SQLITE_PROFILE, read_only: bool = False, **overrides):
+    options = engine_options(url, pool_name)
+    options.update(overrides)
+    engine = create_engine(url, **options)
+    if engine.dialect.name == "sqlite":
+        pragmas = sqlite_pragmas(sqlite_profile, read_only)
+        if pragmas:
+            _apply_pragmas(engine, pragmas)
+    return engine
+
+#URL of the async driver for the same database
+def async_database_url(url) -> str:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+def create_async_db_engine(url=None, pool_name: str = "async", sqlite_profile: str = SQLITE_PROFILE, **overrides):
+    url = url or ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+    options = engine_options(url, pool_name)
+    if "pool_size" in options:
+        options.update(pool_size=ASYNC_DB_POOL_SIZE, max_overflow=ASYNC_DB_MAX_OVERFLOW)
+    options.update(overrides)
+    engine = create_async_engine(url, **options)
+    if engine.dialect.name == "sqlite":
+        pragmas = sqlite_pragmas(sqlite_profile)
+        if pragmas:
+            _apply_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+#Read-only routes can use their own pool so long reads never wait behind writers for a connection
+if SQLITE_READ_POOL and is_sqlite_file(DATABASE_URL):
+    read_engine = create_db_engine(DATABASE_URL, pool_name="read", read_only=True)
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+#Sync session behind every AsyncSessionLocal session, session events for the async routes are registered on it
+class AsyncBackedSession(Session):
+    pass
+
+#Async engine for routes that run on the event loop instead of the threadpool
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AsyncBackedSession)
+
 Base = declarative_base()
 
-def get_db():
+#Chooses between the replica and the primary for reads, set by app.services.replication.configure_replica
+replica_router = None
+
+def get_db(response: Response):
     db = SessionLocal()
+    #Lets the commit hooks hand the client a consistency token for the write
+    db.info["response"] = response
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+#Session for routes that only read
+def get_read_db(request: Request):
+    if replica_router is not None:
+        db = replica_router.session_for_read(request)
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+#Async session for routes declared with async def
+async def get_async_db(response: Response):
+    async with AsyncSessionLocal() as db:
+        #Lets the commit hooks hand the client a consistency token for the write
+        db.info["response"] = response
+        yield db
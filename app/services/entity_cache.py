@@ -0,0 +1,188 @@
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime, event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import (
+    ENTITY_CACHE_TTL_SECONDS, ENTITY_CACHE_SIZE, ENTITY_CACHE_BACKEND, ENTITY_CACHE_SHARED_TTL_SECONDS, SHARED_STORE_URL
+)
+from app.models.candidate import Candidate
+from app.models.question import Question
+from app.models.user import User
+from app.models.user_group import UserGroup
+from app.models.voting_session import VotingSession
+from app.services.cache import TTLCache, MISSING
+from app.services.metrics import registry
+from app.services.replication import CONSISTENT_READ, REPLICA_READ
+from app.services.shared_store import SharedStoreClient, SharedStoreError
+
+logger = logging.getLogger(__name__)
+
+#Keys of the rows a session wrote, invalidated once it commits. A table name alone stands for all of its rows
+STALE_KEY = "entity_cache_stale"
+
+#Column values of one row keyed by attribute, the shared store only takes JSON
+def _to_json(values: dict) -> dict:
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in values.items()}
+
+def _from_json(mapper, values: dict) -> dict:
+    for attr in mapper.column_attrs:
+        if values.get(attr.key) is not None and isinstance(attr.columns[0].type, DateTime):
+            values[attr.key] = datetime.fromisoformat(values[attr.key])
+    return values
+
+#Read-through cache of rows looked up by primary key, holding their column values rather than ORM objects. A hit is
+#attached to the caller's session as if it had been loaded, so relationships still lazy load. Entries live in a
+#per-worker LRU and, when shared is set, in the shared store so a row read by one worker serves all of them. The
+#listeners below invalidate every row a session updates or deletes once it commits, from the ORM or by bulk statement.
+#A row read before an invalidation is not stored again for ttl seconds, in this worker by the generation counter as in
+#the catalog, in the shared store by the marker it keeps for the invalidated key. Requests with a consistency token
+#skip the cache, and rows read from a replica are returned but not stored, as the replica may not hold the latest write
+class EntityCache:
+    def __init__(self, models, ttl: float = ENTITY_CACHE_TTL_SECONDS, max_entries: int = ENTITY_CACHE_SIZE,
+                 shared: SharedStoreClient = None, shared_ttl: float = ENTITY_CACHE_SHARED_TTL_SECONDS, clock=time.monotonic):
+        self.ttl = ttl
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.local = TTLCache("entities", ttl, max_entries, clock)
+        self.generation = 0
+        #Mapped table -> table of the base mapper, subclasses of joined inheritance share the key of their base row
+        self.tables = {}
+        for model in models:
+            mapper = inspect(model)
+            for submapper in mapper.self_and_descendants:
+                self.tables[submapper.local_table.name] = mapper.local_table.name
+
+    #Row of model with the given id, None if there is none or it is soft-deleted
+    def get(self, db: Session, model, entity_id: int):
+        mapper = inspect(model)
+        table = self.tables.get(mapper.local_table.name)
+        #Reads that must see their own write query the database. So do rows already in the session, the query returns
+        #that copy and checks it still exists
+        if (
+            table is None
+            or db.info.get(CONSISTENT_READ)
+            or mapper.identity_key_from_primary_key((entity_id,)) in db.identity_map
+        ):
+            return db.query(model).filter(mapper.primary_key[0] == entity_id).first()
+
+        key = (table, entity_id)
+        values = self.local.get(key)
+        if values is MISSING and self.shared is not None:
+            values = self._shared_get(key)
+            if values is not MISSING:
+                values = _from_json(mapper.base_mapper, values)
+                self.local.put(key, values)
+        if values is not MISSING:
+            registry.counter("entity_cache_lookups_total", table=table, result="hit").inc()
+            return self._attach(db, model, values)
+
+        registry.counter("entity_cache_lookups_total", table=table, result="miss").inc()
+        generation = self.generation
+        instance = db.query(model).filter(mapper.primary_key[0] == entity_id).first()
+        if instance is not None:
+            state = inspect(instance)
+            names = [attr.key for attr in state.mapper.column_attrs]
+            #Expired or deferred columns would need another query, such a copy is not worth keeping, nor is a copy read
+            #from a replica that may lag behind the primary
+            fresh = generation == self.generation and not db.info.get(REPLICA_READ)
+            if fresh and all(name in state.dict for name in names):
+                values = {name: state.dict[name] for name in names}
+                self.local.put(key, values)
+                if self.shared is not None:
+                    self._shared_call("cache_add", key=self._shared_key(key), value=_to_json(values), ttl=self.shared_ttl)
+        return instance
+
+    #Persistent instance of the mapped class the values belong to, without a query. None when the row is of another
+    #subclass than the one asked for, as the query would return
+    def _attach(self, db: Session, model, values: dict):
+        mapper = inspect(model).base_mapper
+        if mapper.polymorphic_on is not None:
+            mapper = mapper.polymorphic_map[values[mapper.polymorphic_on.key]]
+        if not issubclass(mapper.class_, model):
+            return None
+        instance = mapper.class_manager.new_instance()
+        for key, value in values.items():
+            set_committed_value(instance, key, value)
+        make_transient_to_detached(instance)
+        db.add(instance)
+        return instance
+
+    def _shared_key(self, key) -> str:
+        return f"entity:{key[0]}:{key[1]}"
+
+    def _shared_call(self, op: str, **arguments):
+        try:
+            return self.shared.call(op, **arguments)
+        except SharedStoreError as e:
+            #Fail open, the database still answers every lookup
+            logger.warning("Entity cache store unavailable: %s", e)
+            return None
+
+    def _shared_get(self, key):
+        values = self._shared_call("cache_get", key=self._shared_key(key))
+        return MISSING if values is None else values
+
+    #Drop the given (table, id) keys and whole tables, called after the writing transaction commits
+    def invalidate(self, keys=(), tables=()):
+        self.generation += 1
+        for key in keys:
+            self.local.delete(key)
+        for table in tables:
+            self.local.delete_matching(lambda key: key[0] == table)
+        if self.shared is not None:
+            if keys:
+                self._shared_call("cache_invalidate", keys=[self._shared_key(key) for key in keys], hold=self.ttl)
+            for table in tables:
+                self._shared_call("cache_invalidate_namespace", namespace=f"entity:{table}", hold=self.ttl)
+
+    #Note the row behind instance, or every row of a table, as written by the session
+    def mark(self, session: Session, instance=None, table: str = None):
+        if instance is not None:
+            state = inspect(instance)
+            table = self.tables.get(state.mapper.local_table.name)
+            if table is not None and state.identity is not None:
+                session.info.setdefault(STALE_KEY, set()).add((table, state.identity[0]))
+        elif table in self.tables:
+            session.info.setdefault(STALE_KEY, set()).add(self.tables[table])
+
+    def clear(self):
+        self.generation += 1
+        self.local.clear()
+
+#Build the cache described by the configuration
+def create_entity_cache() -> EntityCache:
+    shared = SharedStoreClient(SHARED_STORE_URL) if ENTITY_CACHE_BACKEND == "shared" else None
+    return EntityCache([VotingSession, Question, Candidate, UserGroup, User], shared=shared)
+
+entity_cache = create_entity_cache()
+
+#Rows changed or deleted by a flush, the session's lists still hold them in after_flush
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session, flush_context):
+    for instance in list(session.dirty) + list(session.deleted):
+        entity_cache.mark(session, instance)
+
+#Bulk UPDATE and DELETE statements may touch any row of their table
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        #ORM statements name their entity, which may map to a join, Core statements name their table
+        tables = [mapper.local_table for mapper in orm_execute_state.all_mappers] or [orm_execute_state.statement.table]
+        for table in tables:
+            entity_cache.mark(orm_execute_state.session, table=getattr(table, "name", None))
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    stale = session.info.pop(STALE_KEY, None)
+    if stale:
+        entity_cache.invalidate(
+            keys=[key for key in stale if isinstance(key, tuple)], tables=[key for key in stale if isinstance(key, str)]
+        )
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(STALE_KEY, None)
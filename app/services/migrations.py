@@ -0,0 +1,127 @@
+import contextlib
+import logging
+import os
+import time
+
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+
+from app.config import DB_STARTUP_MODE, DB_MIGRATION_LOCK
+from app.models.voting_session import SEARCH_TABLE, SEARCH_VECTOR, SEARCH_VECTOR_INDEX
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ALEMBIC_INI = os.path.join(PROJECT_ROOT, "alembic.ini")
+
+#Revision holding the schema the old drop_all/create_all startup used to build
+BASELINE_REVISION = "fd1b88e94ce4"
+
+#pg_advisory_lock key shared by every worker migrating the same database
+MIGRATION_LOCK_KEY = 5_720_431
+
+class SchemaOutOfDateError(RuntimeError):
+    pass
+
+#Leaves out the search index the models do not describe: the FTS5 table and its shadow tables on SQLite, the tsvector
+#column and its index on PostgreSQL. Passed as include_name wherever the database is compared with the models
+def include_name(name, type_, parent_names) -> bool:
+    if type_ == "table":
+        return not name.startswith(SEARCH_TABLE)
+    return name not in (SEARCH_VECTOR, SEARCH_VECTOR_INDEX)
+
+def alembic_config() -> Config:
+    return Config(ALEMBIC_INI)
+
+def head_revision(config: Config) -> str:
+    return ScriptDirectory.from_config(config).get_current_head()
+
+def current_revision(connection):
+    return MigrationContext.configure(connection).get_current_revision()
+
+#Exclusive lock on a file, held across processes on the same host
+@contextlib.contextmanager
+def file_lock(path: str):
+    with open(path, "a+b") as handle:
+        if os.name == "nt":
+            import msvcrt
+            handle.seek(0)
+            while True:
+                try:
+                    #LK_LOCK gives up after ten seconds, keep waiting for the migrating worker
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+#File lock for workers on this host, plus an advisory lock when workers on other hosts share a PostgreSQL database
+@contextlib.contextmanager
+def migration_lock(connection, path: str = DB_MIGRATION_LOCK):
+    with file_lock(path):
+        if connection.dialect.name != "postgresql":
+            yield
+            return
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def _upgrade(connection, config: Config, revision):
+    config.attributes["connection"] = connection
+    #Batch migrations rebuild SQLite tables, with foreign keys enforced dropping the old table would cascade into its children
+    foreign_keys = None
+    if connection.dialect.name == "sqlite":
+        foreign_keys = connection.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    try:
+        #Databases built by create_all have the initial schema but no version row
+        if revision is None and inspect(connection).has_table("users"):
+            logger.info("Stamping unversioned database at %s", BASELINE_REVISION)
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+        connection.commit()
+    finally:
+        if foreign_keys:
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+#Bring the schema to the latest revision, or check that it already is, before the app serves requests
+def prepare_database(engine, mode: str = DB_STARTUP_MODE, lock_path: str = DB_MIGRATION_LOCK):
+    if mode == "skip":
+        return None
+
+    start = time.perf_counter()
+    config = alembic_config()
+    head = head_revision(config)
+    with engine.connect() as connection:
+        #Every worker after the first finds the schema current without waiting for the lock
+        revision = current_revision(connection)
+        if revision != head:
+            if mode == "verify":
+                raise SchemaOutOfDateError(f"Database is at revision {revision}, expected {head}. Run: alembic upgrade head")
+            with migration_lock(connection, lock_path):
+                #Another worker may have finished migrating while this one waited
+                revision = current_revision(connection)
+                if revision != head:
+                    logger.info("Migrating database from %s to %s", revision, head)
+                    _upgrade(connection, config, revision)
+                    revision = head
+
+    registry.gauge("db_startup_seconds").set(time.perf_counter() - start)
+    return revision
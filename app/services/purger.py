@@ -0,0 +1,125 @@
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import PURGE_CHUNK_SIZE, PURGE_PAUSE_SECONDS, PURGE_POLL_INTERVAL
+from app.models.answer import Answer
+from app.models.candidate import Candidate
+from app.models.group_whitelist import GroupWhitelist
+from app.models.purge_job import PurgeJob
+from app.models.question import Question
+from app.models.session_result import SessionResult
+from app.models.session_settings import SessionSettings
+from app.models.user import User
+from app.models.user_group import UserGroup, GroupMembership
+from app.models.vote import Vote
+from app.models.voting_session import VotingSession
+from app.models.whitelist import Whitelist
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+def _questions_of(session_id):
+    return select(Question.id).where(Question.session_id == session_id)
+
+def _groups_of(user_id):
+    return select(UserGroup.id).where(UserGroup.creator_id == user_id)
+
+UNFINISHED = ("pending", "running")
+
+#Tables emptied for each kind of job, leaves first so no chunk cascades into more than a handful of rows.
+#The last step removes the row itself, ON DELETE CASCADE cleans up whatever is left.
+PURGE_PLANS = {
+    "voting_session": [
+        (Vote, lambda session_id: Vote.session_id == session_id),
+        (Answer, lambda session_id: Answer.question_id.in_(_questions_of(session_id))),
+        (Candidate, lambda session_id: Candidate.question_id.in_(_questions_of(session_id))),
+        (Question, lambda session_id: Question.session_id == session_id),
+        (SessionSettings, lambda session_id: SessionSettings.session_id == session_id),
+        (Whitelist, lambda session_id: Whitelist.session_id == session_id),
+        (GroupWhitelist, lambda session_id: GroupWhitelist.session_id == session_id),
+        (SessionResult, lambda session_id: SessionResult.session_id == session_id),
+        (VotingSession, lambda session_id: VotingSession.id == session_id),
+    ],
+    "user": [
+        (Vote, lambda user_id: Vote.user_id == user_id),
+        (Whitelist, lambda user_id: Whitelist.user_id == user_id),
+        (GroupMembership, lambda user_id: GroupMembership.user_id == user_id),
+        (GroupMembership, lambda user_id: GroupMembership.group_id.in_(_groups_of(user_id))),
+        (GroupWhitelist, lambda user_id: GroupWhitelist.group_id.in_(_groups_of(user_id))),
+        (UserGroup, lambda user_id: UserGroup.creator_id == user_id),
+        (User, lambda user_id: User.id == user_id),
+    ],
+}
+
+#Deletes the dependents of soft-deleted rows in short transactions on a background thread
+class Purger:
+    def __init__(self, session_factory, chunk_size: int = PURGE_CHUNK_SIZE, pause: float = PURGE_PAUSE_SECONDS,
+                 interval: float = PURGE_POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    #Delete up to chunk_size rows for the oldest unfinished job in one transaction, False when there is nothing to do
+    def purge_chunk(self) -> bool:
+        with self.session_factory() as db:
+            job = db.execute(
+                select(PurgeJob).where(PurgeJob.status.in_(UNFINISHED)).order_by(PurgeJob.id).limit(1)
+            ).scalar_one_or_none()
+            if job is None:
+                registry.gauge("purge_jobs_pending").set(0)
+                return False
+
+            plan = PURGE_PLANS[job.entity]
+            model, condition = plan[job.step]
+            table = model.__table__
+            #DELETE ... WHERE id IN (SELECT id ... LIMIT n) keeps every transaction short, whatever the size of the table
+            chunk = select(table.c.id).where(condition(job.entity_id)).limit(self.chunk_size)
+            deleted = db.execute(delete(table).where(table.c.id.in_(chunk))).rowcount
+
+            now = datetime.utcnow()
+            if job.status == "pending":
+                job.status, job.time_started = "running", now
+            job.rows_deleted += deleted
+            if deleted < self.chunk_size:
+                job.step += 1
+            if job.step == len(plan):
+                job.status, job.time_finished = "done", now
+            db.commit()
+
+            registry.counter("purge_rows_deleted_total", entity=job.entity).inc(deleted)
+            registry.gauge("purge_jobs_pending").set(
+                db.execute(select(func.count()).select_from(PurgeJob).where(PurgeJob.status.in_(UNFINISHED))).scalar()
+            )
+            return True
+
+    #Purge until no job is left, for tests and maintenance scripts
+    def drain(self):
+        while self.purge_chunk():
+            pass
+
+    def _run(self):
+        wait = 0
+        while not self._stop.wait(wait):
+            try:
+                wait = self.pause if self.purge_chunk() else self.interval
+            except SQLAlchemyError as exc:
+                registry.counter("purge_errors_total").inc()
+                logger.warning("Purge failed: %s", exc)
+                wait = self.interval
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="purger", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,173 @@
+from sqlalchemy import select, exists, literal, or_, func, true, String
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.candidate import Candidate
+from app.models.group_whitelist import GroupWhitelist
+from app.models.question import Question, SINGLE_CHOICE_TYPES
+from app.models.session_result import SessionResult
+from app.models.user import User
+from app.models.user_group import GroupMembership
+from app.models.vote import Vote
+from app.models.voting_session import VotingSession
+from app.models.whitelist import Whitelist
+
+#Statements shared by the sync and async routes, run with db.execute() or await db.execute()
+
+def user_exists(user_id: int):
+    return select(exists().where(User.id == user_id, User.deleted_at.is_(None)))
+
+#The columns of a flat response schema as rows, for read-only lists. Nothing is hydrated into instances or tracked in
+#the identity map, and a subclass's table is not joined. Loader criteria such as the soft delete filter still apply
+def response_rows(model, schema):
+    return select(*(getattr(model, name) for name in schema.model_fields))
+
+#(question_id, session_id) of a candidate, the values copied onto its votes, its question type and the state of its
+#session. Nothing once the session is deleted
+def candidate_location(candidate_id: int):
+    return (
+        select(Candidate.question_id, Question.session_id, Question.type.label("question_type"), *_session_state_columns())
+        .join(Question, Question.id == Candidate.question_id)
+        .join(VotingSession, VotingSession.id == Question.session_id)
+        .where(Candidate.id == candidate_id, VotingSession.deleted_at.is_(None))
+    )
+
+def _session_state_columns():
+    return (VotingSession.creator_id, VotingSession.is_published, VotingSession.open_at, VotingSession.close_at, VotingSession.closed_at)
+
+#Who may vote and when, the part of a session cached by the catalog. Nothing once the session is deleted
+def session_state(session_id: int):
+    return select(*_session_state_columns()).where(VotingSession.id == session_id, VotingSession.deleted_at.is_(None))
+
+def existing_vote(user_id: int, candidate_id: int):
+    return select(Vote.id).where(Vote.user_id == user_id, Vote.candidate_id == candidate_id).limit(1)
+
+def session_has_questions(session_id: int):
+    return select(exists().where(Question.session_id == session_id))
+
+def session_has_candidates(session_id: int):
+    return select(exists().where(Candidate.question_id == Question.id, Question.session_id == session_id))
+
+def candidates_for_session(session_id: int):
+    return select(Candidate).join(Question, Question.id == Candidate.question_id).where(Question.session_id == session_id)
+
+def votes_for_session(session_id: int):
+    return select(Vote).where(Vote.session_id == session_id)
+
+#Votes per candidate, counted inside ix_votes_session_id_question_id_candidate_id
+def vote_counts_for_session(session_id: int):
+    return (
+        select(Vote.question_id, Vote.candidate_id, func.count().label("votes"))
+        .where(Vote.session_id == session_id)
+        .group_by(Vote.question_id, Vote.candidate_id)
+    )
+
+#Tally frozen when the session closed, same columns as vote_counts_for_session
+def results_for_session(session_id: int):
+    return select(SessionResult.question_id, SessionResult.candidate_id, SessionResult.votes).where(SessionResult.session_id == session_id)
+
+def all_voting_sessions():
+    return select(VotingSession)
+
+#Whitelisted for the session directly or through one of the user's groups, session_id may be a column to correlate with
+def session_access(session_id, user_id: int):
+    direct = exists().where(Whitelist.session_id == session_id, Whitelist.user_id == user_id)
+    through_group = (
+        exists()
+        .where(GroupWhitelist.session_id == session_id)
+        .where(GroupMembership.group_id == GroupWhitelist.group_id)
+        .where(GroupMembership.user_id == user_id)
+    )
+    return or_(direct, through_group)
+
+#True if the user is whitelisted for the session directly or through one of their groups
+def has_session_access(session_id: int, user_id: int):
+    return select(session_access(session_id, user_id))
+
+#Whether the user exists and may vote in the session, and the session's settings version
+def _voter_columns(user_id: int, session_id: int):
+    return (
+        exists().where(User.id == user_id, User.deleted_at.is_(None)).label("user_exists"),
+        session_access(session_id, user_id).label("whitelisted"),
+        select(VotingSession.settings_version).where(VotingSession.id == session_id).scalar_subquery().label("settings_version"),
+    )
+
+#What cast_vote checks about the voter in one row, for a candidate whose location came from the catalog: whether the
+#candidate and the user still exist, whether the user is whitelisted, the user's votes so far and the session's
+#settings version. Every subquery is a primary key or index lookup
+def vote_eligibility(user_id: int, candidate_id: int, question_id: int, session_id: int):
+    user_votes = select(func.count()).where(Vote.user_id == user_id)
+    return select(
+        exists().where(Candidate.id == candidate_id).label("candidate_exists"),
+        *_voter_columns(user_id, session_id),
+        exists().where(Vote.user_id == user_id, Vote.candidate_id == candidate_id).label("already_voted"),
+        user_votes.where(Vote.question_id == question_id).scalar_subquery().label("question_votes"),
+        user_votes.where(Vote.session_id == session_id).scalar_subquery().label("session_votes"),
+    )
+
+#The voter half of vote_eligibility, for requests that are not about a single candidate
+def voter_eligibility(user_id: int, session_id: int):
+    return select(*_voter_columns(user_id, session_id))
+
+#(id, question_id, question type) of the given candidates that belong to the session
+def ballot_candidates(session_id: int, candidate_ids):
+    return (
+        select(Candidate.id, Candidate.question_id, Question.type.label("question_type"))
+        .join(Question, Question.id == Candidate.question_id)
+        .where(Candidate.id.in_(candidate_ids), Question.session_id == session_id)
+    )
+
+#A user's votes in a session, or in one of its questions
+def ballot_votes(user_id: int, session_id: int, question_id=None):
+    statement = select(Vote).where(Vote.user_id == user_id, Vote.session_id == session_id)
+    if question_id is not None:
+        statement = statement.where(Vote.question_id == question_id)
+    return statement
+
+#INSERT ... ON CONFLICT DO NOTHING for the given dialect name, rows rejected by a unique index are skipped
+def insert_ignoring_conflicts(dialect_name: str, model):
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    return dialect_insert(model).on_conflict_do_nothing()
+
+#Transaction level lock on a user's votes in a session, taken before they are counted against the limits and held until
+#commit or rollback. Under READ COMMITTED two PostgreSQL transactions counting at the same time do not see each other's
+#uncommitted votes and could both pass, with the lock the second one counts after the first has committed. SQLite runs
+#one write transaction at a time, no lock is needed and None is returned
+def lock_voter(dialect_name: str, user_id: int, session_id: int):
+    if dialect_name != "postgresql":
+        return None
+    return select(func.pg_advisory_xact_lock(user_id, session_id))
+
+#Write the vote unless the unique indexes on votes already hold one for the candidate, or for the question when it is
+#single-choice, and while the user is under the question and session limits. The unique indexes hold against any
+#concurrent request, the limits only once the transaction holds lock_voter. Returns no row when the vote was refused
+def insert_vote(dialect_name: str, user_id: int, candidate_id: int, question_id: int, session_id: int, user_input=None,
+                single_choice: bool = False, question_limit=None, session_limit=None):
+    #SQLite needs a WHERE on INSERT ... SELECT ... ON CONFLICT even without limits
+    guards = [true()]
+    user_votes = select(func.count()).where(Vote.user_id == user_id)
+    if question_limit is not None:
+        guards.append(user_votes.where(Vote.question_id == question_id).scalar_subquery() < question_limit)
+    if session_limit is not None:
+        guards.append(user_votes.where(Vote.session_id == session_id).scalar_subquery() < session_limit)
+    row = select(
+        literal(user_id), literal(candidate_id), literal(question_id), literal(session_id),
+        literal(single_choice), literal(user_input, String), func.now()
+    ).where(*guards)
+    return (
+        insert_ignoring_conflicts(dialect_name, Vote)
+        .from_select(["user_id", "candidate_id", "question_id", "session_id", "single_choice", "user_input", "vote_date"], row)
+        .returning(Vote.id, Vote.user_id, Vote.candidate_id, Vote.vote_date, Vote.user_input)
+    )
+
+#Add the ballot's selections, the ones the user already holds are skipped by ix_votes_user_id_candidate_id
+def insert_ballot(dialect_name: str, user_id: int, session_id: int, selections):
+    return insert_ignoring_conflicts(dialect_name, Vote).values([
+        {
+            "user_id": user_id,
+            "candidate_id": selection.id,
+            "question_id": selection.question_id,
+            "session_id": session_id,
+            "single_choice": selection.question_type in SINGLE_CHOICE_TYPES,
+        }
+        for selection in selections
+    ]).returning(Vote.id)
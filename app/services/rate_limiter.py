@@ -0,0 +1,137 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import RATE_LIMIT_BACKEND, RATE_LIMIT_RULES, SHARED_STORE_URL
+from app.services.shared_store import SharedStoreClient, SharedStoreError
+
+logger = logging.getLogger(__name__)
+
+#A group of routes sharing one token bucket configuration
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    prefix: str
+    rate: float      #Tokens added per second
+    capacity: float  #Maximum burst size
+
+#Outcome of taking tokens from a bucket
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+#Parse rules in the "name:prefix:rate:capacity,..." format used by RATE_LIMIT_RULES
+def parse_rules(spec: str) -> list[RateLimitRule]:
+    rules = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, prefix, rate, capacity = entry.split(":")
+        rules.append(RateLimitRule(name=name, prefix=prefix, rate=float(rate), capacity=float(capacity)))
+    return rules
+
+#Refill a bucket and try to take tokens from it, returns the new token count and the decision
+def take_tokens(tokens: float, updated: float, now: float, rate: float, capacity: float, cost: float):
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        tokens -= cost
+        return tokens, RateLimitDecision(allowed=True, remaining=tokens, retry_after=0.0)
+    return tokens, RateLimitDecision(allowed=False, remaining=tokens, retry_after=(cost - tokens) / rate)
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        #key -> [tokens, last refill time], least recently used first
+        self.buckets = OrderedDict()
+
+#Token buckets kept in this process, split over several locks to reduce contention between threads
+class InMemoryBackend:
+    blocking = False
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000, clock=time.monotonic):
+        self._shards = [_Shard() for _ in range(shards)]
+        self._max_keys = max_keys_per_shard
+        self._clock = clock
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> RateLimitDecision:
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = self._clock()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                if len(shard.buckets) >= self._max_keys:
+                    self._prune(shard, now, rate, capacity)
+                bucket = shard.buckets[key] = [capacity, now]
+            else:
+                shard.buckets.move_to_end(key)
+            bucket[0], decision = take_tokens(bucket[0], bucket[1], now, rate, capacity, cost)
+            bucket[1] = now
+        return decision
+
+    #Drop buckets that have been idle long enough to be full again, they are equivalent to a new bucket. When every
+    #bucket is still in use, e.g. under a stream of distinct client addresses, the least recently used one is dropped
+    #so the shard never holds more than max_keys_per_shard buckets, that client starts over with a full bucket
+    def _prune(self, shard: _Shard, now: float, rate: float, capacity: float):
+        idle = capacity / rate
+        buckets = shard.buckets
+        while buckets and now - next(iter(buckets.values()))[1] >= idle:
+            buckets.popitem(last=False)
+        while len(buckets) >= self._max_keys:
+            buckets.popitem(last=False)
+
+    def reset(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+
+#Token buckets kept in a shared store so every worker process sees the same limits
+class SharedBackend:
+    blocking = True
+
+    def __init__(self, client: SharedStoreClient):
+        self._client = client
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> RateLimitDecision:
+        try:
+            reply = self._client.call("take", key=key, rate=rate, capacity=capacity, cost=cost)
+        except SharedStoreError as e:
+            #Fail open, an unreachable store must not take the API down with it
+            logger.warning("Rate limit store unavailable: %s", e)
+            return RateLimitDecision(allowed=True, remaining=capacity, retry_after=0.0)
+        return RateLimitDecision(**reply)
+
+#Matches requests to rules and takes tokens from the configured backend
+class RateLimiter:
+    def __init__(self, rules: list[RateLimitRule], backend):
+        #Longest prefix first so more specific groups win
+        self.rules = sorted(rules, key=lambda rule: len(rule.prefix), reverse=True)
+        self.backend = backend
+
+    def match(self, path: str):
+        for rule in self.rules:
+            if path.startswith(rule.prefix):
+                return rule
+        return None
+
+    def hit(self, rule: RateLimitRule, client_key: str, cost: float = 1.0) -> RateLimitDecision:
+        return self.backend.take(f"{rule.name}:{client_key}", rule.rate, rule.capacity, cost)
+
+#Whole seconds for the Retry-After header, never 0 for a denied request
+def retry_after_header(decision: RateLimitDecision) -> str:
+    return str(max(1, math.ceil(decision.retry_after)))
+
+#Build the limiter described by the configuration
+def create_rate_limiter() -> RateLimiter:
+    if RATE_LIMIT_BACKEND == "shared":
+        backend = SharedBackend(SharedStoreClient(SHARED_STORE_URL))
+    else:
+        backend = InMemoryBackend()
+    return RateLimiter(parse_rules(RATE_LIMIT_RULES), backend)
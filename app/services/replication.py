@@ -0,0 +1,192 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event, insert, select, text, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from app.config import DATABASE_REPLICA_URL, REPLICA_POSITION_TTL
+from app.models.write_position import WritePosition
+from app.services import database
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+#Clients echo the token from their last write so their reads never see data older than that write
+CONSISTENCY_HEADER = "X-Consistency-Token"
+
+#session.info keys of read sessions, set on sessions bound to the replica and on sessions of requests that carry a token.
+#Caches must not keep rows read from a lagging replica nor answer a request that has to see its own write
+REPLICA_READ = "replica_read"
+CONSISTENT_READ = "consistent_read"
+
+#How far a database has got in the primary's write history.
+#PostgreSQL replicas report their replayed WAL position, other databases count commits in the write_positions row,
+#which reaches the replica together with the data it describes.
+def primary_position(connection) -> int:
+    if connection.dialect.name == "postgresql":
+        return int(connection.execute(text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')")).scalar())
+    return connection.execute(select(WritePosition.position).where(WritePosition.id == 1)).scalar() or 0
+
+def replica_position(connection) -> int:
+    if connection.dialect.name == "postgresql":
+        lsn = connection.execute(text("SELECT pg_wal_lsn_diff(pg_last_wal_replay_lsn(), '0/0')")).scalar()
+        #NULL when the server is not in recovery, it is then the primary itself
+        return int(lsn) if lsn is not None else primary_position(connection)
+    return primary_position(connection)
+
+#Add one to the commit counter inside the committing transaction
+def bump_write_position(connection) -> int:
+    table = WritePosition.__table__
+    position = connection.execute(
+        update(table).where(table.c.id == 1).values(position=table.c.position + 1).returning(table.c.position)
+    ).scalar()
+    if position is None:
+        connection.execute(insert(table).values(id=1, position=1))
+        position = 1
+    return position
+
+def _has_pending_writes(session) -> bool:
+    return bool(session.info.get("wrote") or session.new or session.dirty or session.deleted)
+
+#Record the primary's position after every commit that wrote something and send it to the client as a header
+def track_write_positions(session_factory):
+    @event.listens_for(session_factory, "after_flush")
+    def mark_flush(session, flush_context):
+        session.info["wrote"] = True
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def mark_bulk_write(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            orm_execute_state.session.info["wrote"] = True
+
+    @event.listens_for(session_factory, "before_commit")
+    def count_commit(session):
+        if not _has_pending_writes(session):
+            return
+        connection = session.connection()
+        #PostgreSQL positions are only known once the commit record has been written
+        if connection.dialect.name == "postgresql":
+            session.info["write_position"] = None
+        else:
+            session.info["write_position"] = bump_write_position(connection)
+
+    @event.listens_for(session_factory, "after_commit")
+    def send_token(session):
+        session.info.pop("wrote", None)
+        if "write_position" not in session.info:
+            return
+        position = session.info.pop("write_position")
+        if position is None:
+            with session.get_bind().connect() as connection:
+                position = primary_position(connection)
+        response = session.info.get("response")
+        if response is not None:
+            response.headers[CONSISTENCY_HEADER] = str(position)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def forget_writes(session):
+        session.info.pop("wrote", None)
+        session.info.pop("write_position", None)
+
+#Sends reads to the replica unless the client's token is ahead of it
+class ReplicaRouter:
+    def __init__(self, primary_factory, replica_factory, position_ttl: float = REPLICA_POSITION_TTL, clock=time.monotonic):
+        self.primary_factory = primary_factory
+        self.replica_factory = replica_factory
+        self.position_ttl = position_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._position = 0
+        self._checked_at = None
+
+    #Replica position, read again once it is older than position_ttl
+    def replica_position(self) -> int:
+        now = self.clock()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.position_ttl:
+                return self._position
+        with self.replica_factory() as db:
+            position = replica_position(db.connection())
+        with self._lock:
+            #Positions only move forward, an older answer from a slower thread is ignored
+            self._position = max(self._position, position)
+            self._checked_at = now
+            registry.gauge("db_replica_position").set(self._position)
+            return self._position
+
+    def use_replica(self, token) -> bool:
+        try:
+            required = int(token) if token else 0
+        except ValueError:
+            required = 0
+        if required <= 0:
+            return True
+        if self.replica_position() >= required:
+            return True
+        #A cached position may be stale, check once more before falling back to the primary
+        with self._lock:
+            self._checked_at = None
+        return self.replica_position() >= required
+
+    def session_for_read(self, request):
+        token = request.headers.get(CONSISTENCY_HEADER)
+        if self.use_replica(token):
+            registry.counter("db_read_routing_total", target="replica").inc()
+            db = self.replica_factory()
+            db.info[REPLICA_READ] = True
+        else:
+            registry.counter("db_read_routing_total", target="primary").inc()
+            db = self.primary_factory()
+        if token:
+            db.info[CONSISTENT_READ] = True
+        return db
+
+#Stand-in for streaming replication between two SQLite files, copies the primary onto the replica with the backup API
+class SQLiteReplicator:
+    def __init__(self, primary_url, replica_url, interval: float = 1.0):
+        self.primary_path = make_url(primary_url).database
+        self.replica_path = make_url(replica_url).database
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sync(self):
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except sqlite3.Error as exc:
+                logger.warning("Replica sync failed: %s", exc)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sqlite-replicator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+#Route GET traffic to the replica at url and start tracking write positions on the primary, for the sync sessions and
+#the async ones, whose hooks run on their sync_session_class
+def configure_replica(url=DATABASE_REPLICA_URL, primary_factory=None, async_factory=None) -> ReplicaRouter:
+    primary_factory = primary_factory or database.SessionLocal
+    async_factory = async_factory or database.AsyncSessionLocal
+    replica_engine = database.create_db_engine(url, pool_name="replica", read_only=database.is_sqlite_file(url))
+    replica_factory = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    track_write_positions(primary_factory)
+    track_write_positions(async_factory.kw["sync_session_class"])
+    database.replica_router = ReplicaRouter(primary_factory, replica_factory)
+    return database.replica_router
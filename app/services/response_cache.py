@@ -0,0 +1,179 @@
+import functools
+import gzip
+import hashlib
+import inspect
+import threading
+import time
+from collections import namedtuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import event
+from sqlalchemy import inspect as inspect_mapper
+from sqlalchemy.orm import Session
+
+from app.config import (
+    RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_GZIP_MIN_BYTES
+)
+from app.services.cache import TTLCache, MISSING
+from app.services.replication import CONSISTENCY_HEADER
+from app.services.serialization import json_serializer
+from app.services.single_flight import SingleFlight
+
+#Tables a session wrote to, their versions are bumped once it commits
+WRITTEN_TABLES = "response_cache_written"
+
+#Encoded body of a response, its gzip copy (None for small bodies) and the ETag of the plain body
+EncodedResponse = namedtuple("EncodedResponse", "body gzipped etag")
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def _etag_matches(if_none_match: str, etags) -> bool:
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or any(etag in candidates for etag in etags)
+
+#Encoded JSON responses of read routes, kept per worker under the versions of the tables each route reads. A commit
+#that writes to a table bumps its version, so the next request misses and encodes the response again. Old entries are
+#never served again and age out of the LRU. Writes through other workers do not bump this worker's versions and show
+#up once an entry is ttl seconds old
+class ResponseCache:
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_SIZE,
+                 max_bytes: int = RESPONSE_CACHE_MAX_BYTES, gzip_min_bytes: int = RESPONSE_CACHE_GZIP_MIN_BYTES,
+                 clock=time.monotonic):
+        self.entries = TTLCache("responses", ttl, max_entries, clock)
+        self.max_bytes = max_bytes
+        self.gzip_min_bytes = gzip_min_bytes
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def versions(self, tables) -> tuple:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def encode(self, body: bytes) -> EncodedResponse:
+        gzipped = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= self.gzip_min_bytes else None
+        return EncodedResponse(body, gzipped, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+    def store(self, key, encoded: EncodedResponse):
+        if len(encoded.body) <= self.max_bytes:
+            self.entries.put(key, encoded)
+
+    #The plain or gzipped body as the request accepts it, or 304 Not Modified when the client already has it. Both
+    #encodings of a body are different representations and carry different ETags
+    def respond(self, encoded: EncodedResponse, request: Request) -> Response:
+        gzip_etag = encoded.etag[:-1] + '-gzip"'
+        use_gzip = encoded.gzipped is not None and _accepts_gzip(request.headers.get("accept-encoding", ""))
+        headers = {"ETag": gzip_etag if use_gzip else encoded.etag}
+        if encoded.gzipped is not None:
+            headers["Vary"] = "Accept-Encoding"
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, (encoded.etag, gzip_etag)):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(encoded.gzipped, media_type="application/json", headers=headers)
+        return Response(encoded.body, media_type="application/json", headers=headers)
+
+    #Note the tables behind the given mappers, or a table by name, as written by the session
+    def mark(self, session: Session, mappers=(), table=None):
+        written = session.info.setdefault(WRITTEN_TABLES, set())
+        for mapper in mappers:
+            written.update(mapped.name for mapped in mapper.tables)
+        if table is not None:
+            written.add(table)
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self._versions.clear()
+
+response_cache = ResponseCache()
+
+#Decorator caching the encoded response of a read route per value of params and version of the tables of models. A hit
+#returns the stored bytes without touching the database, the ORM, Pydantic or the JSON encoder, and requests arriving
+#while a miss is encoded share that work. Put it under the route decorator and pass the route's response_model as model.
+#Errors raised by the endpoint are not cached. Requests with a consistency token skip the cache, they must see their own
+#writes, which an entry filled from a lagging replica or by another worker may not hold yet
+def cache_response(name: str, *params: str, models, model=None):
+    flight = SingleFlight(name)
+    serialize = json_serializer(model)
+    tables = tuple(inspect_mapper(mapped).local_table.name for mapped in models)
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        #The wrapper needs the request for its ETag and Accept-Encoding headers, FastAPI passes it when the signature asks
+        wrapper_signature = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ])
+
+        def key(kwargs):
+            return (name, tuple(kwargs[param] for param in params), response_cache.versions(tables))
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(request: Request, **kwargs):
+                if CONSISTENCY_HEADER in request.headers:
+                    return response_cache.respond(response_cache.encode(serialize(await endpoint(**kwargs))), request)
+                cache_key = key(kwargs)
+                encoded = response_cache.entries.get(cache_key)
+                if encoded is MISSING:
+                    async def compute():
+                        encoded = response_cache.encode(serialize(await endpoint(**kwargs)))
+                        response_cache.store(cache_key, encoded)
+                        return encoded
+                    encoded = await flight.do_async(cache_key, compute)
+                return response_cache.respond(encoded, request)
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(request: Request, **kwargs):
+                if CONSISTENCY_HEADER in request.headers:
+                    return response_cache.respond(response_cache.encode(serialize(endpoint(**kwargs))), request)
+                cache_key = key(kwargs)
+                encoded = response_cache.entries.get(cache_key)
+                if encoded is MISSING:
+                    def compute():
+                        encoded = response_cache.encode(serialize(endpoint(**kwargs)))
+                        response_cache.store(cache_key, encoded)
+                        return encoded
+                    encoded = flight.do(cache_key, compute)
+                return response_cache.respond(encoded, request)
+
+        wrapper.__signature__ = wrapper_signature
+        wrapper.single_flight = flight
+        return wrapper
+    return decorator
+
+#Inserted, changed and deleted rows, the session's lists still hold them in after_flush
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        response_cache.mark(session, mappers=[inspect_mapper(instance).mapper])
+
+#Bulk INSERT, UPDATE and DELETE statements, ORM statements name their entity and Core statements their table
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        if orm_execute_state.all_mappers:
+            response_cache.mark(orm_execute_state.session, mappers=orm_execute_state.all_mappers)
+        else:
+            response_cache.mark(orm_execute_state.session, table=getattr(orm_execute_state.statement.table, "name", None))
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session):
+    written = session.info.pop(WRITTEN_TABLES, None)
+    if written:
+        response_cache.bump(written)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(WRITTEN_TABLES, None)
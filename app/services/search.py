@@ -0,0 +1,163 @@
+import base64
+import binascii
+import html
+import json
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import String, case, cast, column, func, literal, literal_column, null, select, table, tuple_, union_all
+
+from app.models.voting_session import VotingSession, SEARCH_TABLE, SEARCH_VECTOR
+from app.models.group_whitelist import GroupWhitelist
+from app.models.user import User
+from app.models.user_group import UserGroup
+
+#Words beyond this are ignored, every extra term is another index lookup
+MAX_SEARCH_TERMS = 8
+#Roughly how many words of context a snippet shows around the matches
+SNIPPET_WORDS = 12
+#Title matches count this many times as much as description matches on SQLite, PostgreSQL weighs them through setweight
+TITLE_WEIGHT = 4.0
+
+#Matches are marked with control characters in SQL so the text around them can be escaped before the <mark> tags go in
+_MATCH_START, _MATCH_END = "\x02", "\x03"
+_TERM = re.compile(r"[^\W_]+")
+
+search_index = table(SEARCH_TABLE, column("rowid"))
+
+#How to search voting sessions on one database: join target (None if the index lives on voting_sessions itself), the
+#filter, a rank where lower sorts first and the snippet column
+SessionMatch = namedtuple("SessionMatch", "target onclause condition rank snippet")
+
+#Lowercased words of a user's query, punctuation and operators are dropped so input can never be read as query syntax
+def search_terms(q: str) -> list[str]:
+    return _TERM.findall(q.lower())[:MAX_SEARCH_TERMS]
+
+#Every term has to match, the last characters of each term may be the start of a longer word
+def session_match(dialect_name: str, terms: list[str]) -> SessionMatch:
+    if dialect_name == "postgresql":
+        query = func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+        vector = literal_column(f"voting_sessions.{SEARCH_VECTOR}")
+        document = func.concat_ws(" ", VotingSession.title, VotingSession.description)
+        options = f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+        return SessionMatch(
+            None, None, vector.op("@@")(query), -func.ts_rank(vector, query),
+            func.ts_headline("english", document, query, options),
+        )
+
+    index = literal_column(SEARCH_TABLE)
+    return SessionMatch(
+        search_index, search_index.c.rowid == VotingSession.id,
+        index.op("MATCH")(" ".join(f'"{term}"*' for term in terms)),
+        func.bm25(index, TITLE_WEIGHT, 1.0),
+        func.snippet(index, -1, _MATCH_START, _MATCH_END, "…", SNIPPET_WORDS),
+    )
+
+#Limit an ORM query over VotingSession to the sessions matching the terms, returns the query and the SessionMatch
+def apply_session_search(query, dialect_name: str, terms: list[str]):
+    match = session_match(dialect_name, terms)
+    if match.target is not None:
+        query = query.join(match.target, match.onclause)
+    return query.filter(match.condition), match
+
+#Half-open [start, end) range of time_created the date filters leave, either end None when open. year, month and day
+#select one calendar year, month or day, exact_date the calendar day it falls on, end_date is exclusive.
+#A range keeps the filter on the bare column so an index on time_created can serve it, extract() cannot be indexed
+def created_range(year=None, month=None, day=None, exact_date=None, start_date=None, end_date=None):
+    starts, ends = [], []
+    if (day is not None and month is None) or (month is not None and year is None):
+        raise ValueError("Filtering by day needs a month and filtering by month needs a year")
+    if year is not None:
+        start = datetime(year, month or 1, day or 1)
+        if day is not None:
+            end = start + timedelta(days=1)
+        elif month is not None:
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+        else:
+            end = datetime(year + 1, 1, 1)
+        starts.append(start)
+        ends.append(end)
+    if exact_date is not None:
+        start = datetime(exact_date.year, exact_date.month, exact_date.day)
+        starts.append(start)
+        ends.append(start + timedelta(days=1))
+    if start_date is not None:
+        starts.append(start_date)
+    if end_date is not None:
+        ends.append(end_date)
+    return (max(starts) if starts else None), (min(ends) if ends else None)
+
+#Orders a search can be sorted and paginated by, relevance only when it has a q
+SORT_KEYS = {"time_created": VotingSession.time_created, "title": VotingSession.title}
+RELEVANCE = "relevance"
+
+#Opaque position after a row: the sort it belongs to, the row's sort key and its id as a tiebreaker
+def encode_cursor(sort: str, descending: bool, key, row_id: int) -> str:
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps([sort, descending, key, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+#(key, id) stored in a cursor, ValueError if it is malformed or was made for another sort
+def decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_sort, cursor_descending, key, row_id = payload
+        if sort == "time_created":
+            key = datetime.fromisoformat(key)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if (cursor_sort, cursor_descending) != (sort, descending) or not isinstance(row_id, int):
+        raise ValueError("Cursor belongs to a different sort order")
+    return key, row_id
+
+#Order the query by key then id and fetch limit + 1 rows after the cursor, the extra row tells whether another page
+#follows. Rows gain a sort_key column for the next cursor. Seeking with a row-value comparison keeps each page as
+#cheap as the first, an OFFSET would read and throw away every row before the page
+def keyset_page(query, key, descending: bool, after: Optional[tuple], limit: int):
+    position = tuple_(key, VotingSession.id)
+    if after is not None:
+        query = query.filter(position < after if descending else position > after)
+    order = (key.desc(), VotingSession.id.desc()) if descending else (key.asc(), VotingSession.id.asc())
+    return query.add_columns(key.label("sort_key")).order_by(*order).limit(limit + 1)
+
+#Facets counted by facet_counts, in the order they are listed
+FACETS = ("is_published", "creator", "month", "group")
+
+#Counts of the sessions an ORM query over VotingSession finds, per published state, creator, creation month (YYYY-MM)
+#and whitelisting group, as (facet, value, label, count) rows of one statement. The matching sessions are read once
+#into a CTE and every facet is a GROUP BY over it, values are strings so the branches can share a column
+def facet_counts(query, dialect_name: str):
+    matches = query.with_entities(
+        VotingSession.id, VotingSession.is_published, VotingSession.creator_id, VotingSession.time_created
+    ).order_by(None).cte("matches")
+    count = func.count().label("count")
+    if dialect_name == "postgresql":
+        month = func.to_char(matches.c.time_created, "YYYY-MM")
+    else:
+        month = func.strftime("%Y-%m", matches.c.time_created)
+    published = case((matches.c.is_published, "true"), else_="false")
+
+    return union_all(
+        select(literal("is_published").label("facet"), published.label("value"), null().label("label"), count)
+        .group_by(published),
+        select(literal("creator"), cast(matches.c.creator_id, String), User.username, count)
+        .join(User, User.id == matches.c.creator_id)
+        .group_by(matches.c.creator_id, User.username),
+        select(literal("month"), month, null(), count)
+        .group_by(month),
+        select(literal("group"), cast(GroupWhitelist.group_id, String), UserGroup.name, count)
+        .select_from(matches)
+        .join(GroupWhitelist, GroupWhitelist.session_id == matches.c.id)
+        .join(UserGroup, UserGroup.id == GroupWhitelist.group_id)
+        .group_by(GroupWhitelist.group_id, UserGroup.name),
+    )
+
+#Snippet as HTML with the matched words in <mark> tags, everything else escaped since titles are user input
+def render_snippet(snippet):
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet, quote=False)
+    return escaped.replace(_MATCH_START, "<mark>").replace(_MATCH_END, "</mark>")
@@ -0,0 +1,49 @@
+import functools
+import types
+import typing
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, EmailStr, TypeAdapter, create_model
+
+#Fields whose validation only matters on input. Values read back from the database passed it when they were written,
+#and EmailStr alone costs about 100 µs per value through email_validator
+_INPUT_ONLY_TYPES = {EmailStr: str}
+
+#The type responses are validated against, model with input-only field types swapped for what they hold once stored.
+#Serializes to the same JSON as model
+@functools.lru_cache(maxsize=None)
+def output_type(annotation):
+    if annotation in _INPUT_ONLY_TYPES:
+        return _INPUT_ONLY_TYPES[annotation]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        #A subclass overriding the changed fields keeps the model's config and validators
+        changed = {
+            name: (output_type(field.annotation), field)
+            for name, field in annotation.model_fields.items()
+            if output_type(field.annotation) != field.annotation
+        }
+        if not changed:
+            return annotation
+        return create_model(annotation.__name__, __base__=annotation, __module__=annotation.__module__, **changed)
+    args = typing.get_args(annotation)
+    converted = tuple(output_type(arg) for arg in args)
+    if converted != args:
+        #X | Y unions cannot be subscripted, typing.Union builds the same type
+        origin = typing.get_origin(annotation)
+        return (typing.Union if origin is types.UnionType else origin)[converted]
+    return annotation
+
+#Built once per response model, building a TypeAdapter compiles its whole validator and serializer
+@functools.lru_cache(maxsize=None)
+def type_adapter(model) -> TypeAdapter:
+    return TypeAdapter(output_type(model))
+
+#Serializes what an endpoint returns to JSON bytes the way FastAPI would, through model when given. Results may be ORM
+#objects, SQL rows or dicts, a list is validated in one call. Results without a model are encoded by orjson, several
+#times faster than the json module behind JSONResponse
+def json_serializer(model):
+    if model is None:
+        return lambda result: orjson.dumps(jsonable_encoder(result), option=orjson.OPT_NON_STR_KEYS)
+    adapter = type_adapter(model)
+    return lambda result: adapter.dump_json(adapter.validate_python(result, from_attributes=True))
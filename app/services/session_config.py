@@ -0,0 +1,115 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select, update
+
+from app.config import SESSION_CONFIG_CACHE_SIZE
+from app.models.session_settings import SessionSettings
+from app.models.voting_session import VotingSession
+from app.schemas.session_settings import SessionConfig
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+#setting_name values with a typed field in SessionConfig, other names are stored but never compiled
+SETTING_NAMES = tuple(SessionConfig.model_fields)
+
+#Message describing why value is not valid for a known setting, None when it is valid or the setting is unknown
+def setting_error(name: str, value) -> Optional[str]:
+    if name not in SessionConfig.model_fields:
+        return None
+    try:
+        SessionConfig.model_validate({name: value})
+    except ValidationError as exc:
+        return f"Invalid value for {name}: {exc.errors()[0]['msg']}"
+    return None
+
+#String stored in setting_value, parsed back by SessionConfig
+def setting_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+#Build the typed settings from (setting_name, setting_value) rows, invalid stored values fall back to the default
+def compile_settings(rows) -> SessionConfig:
+    values = {name: value for name, value in rows if name in SessionConfig.model_fields}
+    try:
+        return SessionConfig.model_validate(values)
+    except ValidationError as exc:
+        for error in exc.errors():
+            logger.warning("Ignoring invalid setting %s=%r", error["loc"][0], values.pop(error["loc"][0], None))
+        return SessionConfig.model_validate(values)
+
+#Compiled settings per session, an entry is only used while its version matches the session's settings_version
+class SessionConfigCache:
+    def __init__(self, max_entries: int = SESSION_CONFIG_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: int, version: int) -> Optional[SessionConfig]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] != version:
+                registry.counter("session_config_cache_total", result="miss").inc()
+                return None
+            self._entries.move_to_end(session_id)
+        registry.counter("session_config_cache_total", result="hit").inc()
+        return entry[1]
+
+    def put(self, session_id: int, version: int, config: SessionConfig):
+        with self._lock:
+            #A slow reader must not replace a newer version another request already cached
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[0] > version:
+                return
+            self._entries[session_id] = (version, config)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+config_cache = SessionConfigCache()
+
+#Mark the session's cached settings stale, part of the caller's transaction so the new version and rows commit together
+def bump_settings_version(db, session_id: int):
+    db.execute(
+        update(VotingSession)
+        .where(VotingSession.id == session_id)
+        .values(settings_version=VotingSession.settings_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+#Typed settings of a session, None if the session does not exist. Costs one primary key lookup when cached,
+#pass the version when the caller already loaded the session
+def load_session_config(db, session_id: int, version: Optional[int] = None) -> Optional[SessionConfig]:
+    if version is None:
+        version = db.execute(select(VotingSession.settings_version).where(VotingSession.id == session_id)).scalar()
+        if version is None:
+            return None
+
+    config = config_cache.get(session_id, version)
+    if config is None:
+        rows = db.execute(
+            select(SessionSettings.setting_name, SessionSettings.setting_value).where(SessionSettings.session_id == session_id)
+        ).all()
+        config = compile_settings(rows)
+        config_cache.put(session_id, version, config)
+    return config
+
+#load_session_config for the async routes, the caller passes the version it read with the session
+async def load_session_config_async(db, session_id: int, version: int) -> SessionConfig:
+    config = config_cache.get(session_id, version)
+    if config is None:
+        rows = (await db.execute(
+            select(SessionSettings.setting_name, SessionSettings.setting_value).where(SessionSettings.session_id == session_id)
+        )).all()
+        config = compile_settings(rows)
+        config_cache.put(session_id, version, config)
+    return config
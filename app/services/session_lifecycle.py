@@ -0,0 +1,157 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import SESSION_CLOSE_GRACE_SECONDS, SESSION_SCHEDULER_RELOAD_INTERVAL
+from app.models.session_result import SessionResult
+from app.models.vote import Vote
+from app.models.voting_session import VotingSession
+from app.services.catalog import catalog
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+#Why a vote is refused at time now, None while the session accepts votes
+def voting_window_error(open_at, close_at, closed_at, now: datetime) -> Optional[str]:
+    if closed_at is not None or (close_at is not None and now >= close_at):
+        return "Voting session is closed"
+    if open_at is not None and now < open_at:
+        return "Voting session is not open yet"
+    return None
+
+#Mark the session closed and copy its tally into session_results in one transaction. Only the worker whose UPDATE
+#claims the session writes the snapshot, False if the session is not due, already closed or deleted
+def close_session(db, session_id: int, now: datetime, grace: float = SESSION_CLOSE_GRACE_SECONDS) -> bool:
+    claimed = db.execute(
+        update(VotingSession)
+        .where(
+            VotingSession.id == session_id,
+            VotingSession.closed_at.is_(None),
+            VotingSession.deleted_at.is_(None),
+            VotingSession.close_at <= now - timedelta(seconds=grace),
+        )
+        .values(closed_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return False
+
+    #Counted inside ix_votes_session_id_question_id_candidate_id, the last time this session's votes are read
+    tally = (
+        select(literal(session_id), Vote.question_id, Vote.candidate_id, func.count())
+        .where(Vote.session_id == session_id)
+        .group_by(Vote.question_id, Vote.candidate_id)
+    )
+    db.execute(insert(SessionResult).from_select(["session_id", "question_id", "candidate_id", "votes"], tally))
+    db.commit()
+    catalog.invalidate_session(session_id)
+    registry.counter("sessions_closed_total").inc()
+    return True
+
+#Closes sessions when their close_at passes. Deadlines wait in a heap, a worker that restarts reloads them from the
+#database, and deadlines set through other workers are picked up by the periodic reload
+class SessionScheduler:
+    def __init__(self, session_factory, grace: float = SESSION_CLOSE_GRACE_SECONDS,
+                 reload_interval: float = SESSION_SCHEDULER_RELOAD_INTERVAL, clock=datetime.utcnow):
+        self.session_factory = session_factory
+        self.grace = grace
+        self.reload_interval = reload_interval
+        self.clock = clock
+        self._heap = []
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    #Replace the heap with every open session that has a close time
+    def load(self):
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(VotingSession.close_at, VotingSession.id)
+                .where(VotingSession.close_at.is_not(None), VotingSession.closed_at.is_(None))
+            ).all()
+        with self._condition:
+            self._heap = [tuple(row) for row in rows]
+            heapq.heapify(self._heap)
+            registry.gauge("session_scheduler_pending").set(len(self._heap))
+            self._condition.notify()
+
+    #Add or move a deadline, an outdated entry left in the heap is skipped when close_session finds the session not due
+    def schedule(self, session_id: int, close_at: Optional[datetime]):
+        if close_at is None:
+            return
+        with self._condition:
+            heapq.heappush(self._heap, (close_at, session_id))
+            registry.gauge("session_scheduler_pending").set(len(self._heap))
+            self._condition.notify()
+
+    #Seconds until the earliest deadline plus the grace period, None when nothing is scheduled
+    def next_due_in(self) -> Optional[float]:
+        with self._condition:
+            if not self._heap:
+                return None
+            due = self._heap[0][0] + timedelta(seconds=self.grace)
+        return max((due - self.clock()).total_seconds(), 0.0)
+
+    #Close every session whose deadline has passed, returns how many were closed
+    def run_due(self) -> int:
+        now = self.clock()
+        cutoff = now - timedelta(seconds=self.grace)
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= cutoff:
+                due.append(heapq.heappop(self._heap)[1])
+            registry.gauge("session_scheduler_pending").set(len(self._heap))
+
+        closed = 0
+        for session_id in due:
+            with self.session_factory() as db:
+                if close_session(db, session_id, now, self.grace):
+                    closed += 1
+        return closed
+
+    def _run(self):
+        next_reload = time.monotonic() + self.reload_interval
+        while True:
+            with self._condition:
+                if self._stop:
+                    return
+                wait = min(self.next_due_in() if self._heap else self.reload_interval, max(next_reload - time.monotonic(), 0))
+                self._condition.wait(wait)
+                if self._stop:
+                    return
+            try:
+                if time.monotonic() >= next_reload:
+                    self.load()
+                    next_reload = time.monotonic() + self.reload_interval
+                self.run_due()
+            except SQLAlchemyError as exc:
+                registry.counter("session_scheduler_errors_total").inc()
+                logger.warning("Closing sessions failed: %s", exc)
+
+    def start(self):
+        self.load()
+        self._thread = threading.Thread(target=self._run, name="session-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+#Scheduler of this worker, set by the lifespan handler in app/main.py
+scheduler = None
+
+#Tell this worker's scheduler about a new or changed close time, other workers find it on their next reload
+def schedule_close(session_id: int, close_at: Optional[datetime]):
+    if scheduler is not None:
+        scheduler.schedule(session_id, close_at)
@@ -0,0 +1,143 @@
+import argparse
+import json
+import socket
+import socketserver
+import threading
+from urllib.parse import urlparse
+
+#Small line-based JSON store shared by all worker processes.
+#Each request is {"op": ..., **arguments} and each reply is {"ok": true, "result": ...} or {"ok": false, "error": ...}
+
+class SharedStoreError(Exception):
+    pass
+
+#Operations served by the store
+def default_ops():
+    from app.config import SHARED_CACHE_SIZE
+    from app.services.cache import TTLCache, MISSING
+    from app.services.rate_limiter import InMemoryBackend
+
+    buckets = InMemoryBackend()
+
+    def take(key, rate, capacity, cost=1.0):
+        decision = buckets.take(key, rate, capacity, cost)
+        return {"allowed": decision.allowed, "remaining": decision.remaining, "retry_after": decision.retry_after}
+
+    #Cache entries keyed "<namespace>:<id>". None marks a key, or a whole namespace under "<namespace>:*", invalidated
+    #less than hold seconds ago, so a value read before the invalidation cannot be stored again right after it
+    entries = TTLCache("shared_store", ttl=0, max_entries=SHARED_CACHE_SIZE)
+    lock = threading.Lock()
+
+    def cache_get(key):
+        value = entries.get(key)
+        return None if value is MISSING else value
+
+    #Store the value unless the key is already there or was invalidated a moment ago, True if it was stored
+    def cache_add(key, value, ttl):
+        with lock:
+            if entries.get(key) is not MISSING or entries.get(key.rsplit(":", 1)[0] + ":*") is not MISSING:
+                return False
+            entries.put(key, value, ttl)
+            return True
+
+    def cache_invalidate(keys, hold):
+        with lock:
+            for key in keys:
+                entries.put(key, None, hold)
+
+    def cache_invalidate_namespace(namespace, hold):
+        prefix = namespace + ":"
+        with lock:
+            entries.delete_matching(lambda key: key.startswith(prefix))
+            entries.put(prefix + "*", None, hold)
+
+    return {
+        "take": take, "cache_get": cache_get, "cache_add": cache_add, "cache_invalidate": cache_invalidate,
+        "cache_invalidate_namespace": cache_invalidate_namespace,
+    }
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = self.server.ops[request.pop("op")]
+                reply = {"ok": True, "result": op(**request)}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+class SharedStoreServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6400, ops=None):
+        self.ops = ops if ops is not None else default_ops()
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    #Serve from a daemon thread, mainly for tests and local development
+    def start_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+#Client keeping one connection per thread
+class SharedStoreClient:
+    def __init__(self, url: str, timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or "127.0.0.1", parsed.port or 6400)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection(self.address, timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def call(self, op: str, **arguments):
+        payload = json.dumps({"op": op, **arguments}).encode() + b"\n"
+        #Retry once on a fresh connection in case the old one went stale
+        for attempt in range(2):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(payload)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("Connection closed by shared store")
+                break
+            except OSError as e:
+                self._drop_connection()
+                if attempt:
+                    raise SharedStoreError(str(e)) from e
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise SharedStoreError(reply["error"])
+        return reply["result"]
+
+    def close(self):
+        self._drop_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the shared store used by multi-worker deployments")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6400)
+    args = parser.parse_args()
+
+    server = SharedStoreServer(args.host, args.port)
+    print(f"Shared store listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import inspect
+import threading
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.services.metrics import registry
+from app.services.replication import CONSISTENCY_HEADER
+from app.services.serialization import json_serializer
+
+#One computation shared by every request that asked for the same key while it ran
+class _Flight:
+    __slots__ = ("done", "body", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.body = None
+        self.error = None
+        self.followers = 0
+
+#Runs one computation per key at a time, requests arriving while it runs wait for its result instead of starting their
+#own. Nothing is kept once the computation ends, the next request for the key starts a new one
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = {}
+        #Keys in flight on the event loop, only touched from the loop's thread
+        self._async_flights = {}
+
+    def _record(self, leader: bool):
+        role = "leader" if leader else "follower"
+        registry.counter("single_flight_requests_total", route=self.name, role=role).inc()
+        leaders = registry.counter("single_flight_requests_total", route=self.name, role="leader").value
+        followers = registry.counter("single_flight_requests_total", route=self.name, role="follower").value
+        #Share of requests served by another request's computation
+        registry.gauge("single_flight_coalesced_ratio", route=self.name).set(followers / (leaders + followers))
+
+    #Result of compute(), e.g. a serialized body, run by the first caller for key and shared with callers that arrive meanwhile.
+    #An exception raised by compute() is raised to every caller
+    def do(self, key, compute):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+        self._record(leader)
+        if not leader:
+            flight.done.wait()
+        else:
+            try:
+                flight.body = compute()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                registry.histogram("single_flight_followers", route=self.name).observe(flight.followers)
+                flight.done.set()
+        if flight.error is not None:
+            raise flight.error
+        return flight.body
+
+    #Same for coroutines on the event loop. A leader cancelled by its client disconnecting hands the key on, the
+    #requests that waited for it start over and one of them computes the result
+    async def do_async(self, key, compute):
+        while True:
+            future = self._async_flights.get(key)
+            if future is None:
+                break
+            self._record(False)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+        self._record(True)
+        future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            body = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            #Retrieved here so a flight nobody waited for does not log "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(body)
+            return body
+        finally:
+            del self._async_flights[key]
+
+#Decorator coalescing concurrent calls of a read route with the same values of params into one computation, whose
+#serialized body every caller receives. Put it under the route decorator and pass the route's response_model as model,
+#the route then returns the shared bytes as they are. Works on sync and async endpoints. Requests with a consistency
+#token compute their own result, the shared one may come from a replica that does not hold their writes yet
+def coalesce(name: str, *params: str, model=None):
+    flight = SingleFlight(name)
+    serialize = json_serializer(model)
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        #The wrapper needs the request for its consistency token, FastAPI passes it when the signature asks
+        wrapper_signature = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ])
+
+        def key(kwargs):
+            return tuple(kwargs[param] for param in params)
+
+        def shared(request):
+            return request is None or CONSISTENCY_HEADER not in request.headers
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(request: Request = None, **kwargs):
+                async def compute():
+                    return serialize(await endpoint(**kwargs))
+                body = await flight.do_async(key(kwargs), compute) if shared(request) else await compute()
+                return Response(body, media_type="application/json")
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(request: Request = None, **kwargs):
+                def compute():
+                    return serialize(endpoint(**kwargs))
+                body = flight.do(key(kwargs), compute) if shared(request) else compute()
+                return Response(body, media_type="application/json")
+
+        wrapper.__signature__ = wrapper_signature
+        wrapper.single_flight = flight
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+from sqlalchemy import event, exists, update
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from app.models.answer import Answer
+from app.models.candidate import Candidate
+from app.models.group_whitelist import GroupWhitelist
+from app.models.purge_job import PurgeJob
+from app.models.question import Question
+from app.models.session_result import SessionResult
+from app.models.session_settings import SessionSettings
+from app.models.user import User
+from app.models.user_group import GroupMembership
+from app.models.voting_session import VotingSession
+from app.models.whitelist import Whitelist
+from app.services.entity_cache import entity_cache
+from app.services.response_cache import response_cache
+
+#Execution option that lets a query see soft-deleted rows, e.g. db.query(User).execution_options(include_deleted=True)
+INCLUDE_DELETED = "include_deleted"
+
+#Rows hidden along with their deleted session or user until the purger removes them. Votes carry no criteria, a filter
+#on every vote row would take the tally out of its covering index: the vote routes answer for a deleted session as for
+#a missing one, and a deleted user's votes keep counting, in the live tally and in the frozen results alike, until the
+#purger removes them
+HIDDEN_WITH_SESSION = (Question, Candidate, Answer, Whitelist, GroupWhitelist, SessionResult, SessionSettings)
+HIDDEN_WITH_USER = (Whitelist, GroupMembership)
+
+#Primary key lookups on the parent's table correlated with the child row alone, through aliases so a query that already
+#joins the parent keeps its own FROM. Core tables, so the criteria are not applied to them again
+_sessions = VotingSession.__table__.alias()
+_users = User.__table__.alias()
+_questions = Question.__table__.alias()
+
+def _session_alive(session_id):
+    return exists().where(_sessions.c.id == session_id, _sessions.c.deleted_at.is_(None)).correlate_except(_sessions)
+
+def _user_alive(user_id):
+    return exists().where(_users.c.id == user_id, _users.c.deleted_at.is_(None)).correlate_except(_users)
+
+def _question_alive(question_id):
+    return exists().where(
+        _questions.c.id == question_id, _sessions.c.id == _questions.c.session_id, _sessions.c.deleted_at.is_(None)
+    ).correlate_except(_questions, _sessions)
+
+#Deleted sessions and users, and the rows that belong to them, disappear from every ORM query on any session (sync,
+#async, replica) once this module is imported. That covers column selects, joins and subqueries such as
+#queries.response_rows or queries.session_has_questions, Core statements on tables are left alone
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted_rows(orm_execute_state):
+    if (
+        not orm_execute_state.is_select
+        or orm_execute_state.is_column_load
+        or orm_execute_state.is_relationship_load
+        or orm_execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        return
+    #Lazy loads of relationships inherit the criteria from the query that loaded their parent
+    orm_execute_state.statement = orm_execute_state.statement.options(
+        with_loader_criteria(VotingSession, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        with_loader_criteria(User, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        with_loader_criteria(Question, lambda cls: _session_alive(cls.session_id), include_aliases=True),
+        with_loader_criteria(SessionSettings, lambda cls: _session_alive(cls.session_id), include_aliases=True),
+        with_loader_criteria(SessionResult, lambda cls: _session_alive(cls.session_id), include_aliases=True),
+        with_loader_criteria(GroupWhitelist, lambda cls: _session_alive(cls.session_id), include_aliases=True),
+        with_loader_criteria(Candidate, lambda cls: _question_alive(cls.question_id), include_aliases=True),
+        with_loader_criteria(Answer, lambda cls: _question_alive(cls.question_id), include_aliases=True),
+        with_loader_criteria(GroupMembership, lambda cls: _user_alive(cls.user_id), include_aliases=True),
+        with_loader_criteria(
+            Whitelist, lambda cls: _session_alive(cls.session_id) & _user_alive(cls.user_id), include_aliases=True
+        ),
+    )
+
+#Drop the cached responses and rows of the given models once the caller commits, they may hold hidden rows
+def _mark_hidden(db: Session, models):
+    for model in models:
+        response_cache.mark(db, table=model.__table__.name)
+        entity_cache.mark(db, table=model.__table__.name)
+
+#Hide the session now and queue the removal of its questions, candidates, votes and whitelist, the caller commits
+def soft_delete_voting_session(db: Session, session: VotingSession) -> PurgeJob:
+    session.deleted_at = datetime.utcnow()
+    _mark_hidden(db, HIDDEN_WITH_SESSION)
+    job = PurgeJob(entity="voting_session", entity_id=session.id)
+    db.add(job)
+    return job
+
+#Hide the user and the sessions they created, the sessions are queued first so they are gone before the user row
+def soft_delete_user(db: Session, user: User) -> PurgeJob:
+    now = datetime.utcnow()
+    session_ids = db.execute(
+        update(VotingSession)
+        .where(VotingSession.creator_id == user.id, VotingSession.deleted_at.is_(None))
+        .values(deleted_at=now)
+        .returning(VotingSession.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    _mark_hidden(db, HIDDEN_WITH_USER + (HIDDEN_WITH_SESSION if session_ids else ()))
+    db.add_all([PurgeJob(entity="voting_session", entity_id=session_id) for session_id in sorted(session_ids)])
+    user.deleted_at = now
+    job = PurgeJob(entity="user", entity_id=user.id)
+    db.add(job)
+    return job
@@ -0,0 +1,186 @@
+import bisect
+import heapq
+import logging
+import threading
+import time
+from array import array
+from collections import Counter
+
+from sqlalchemy import select
+
+from app.config import USER_INDEX_REFRESH_SECONDS, USER_INDEX_MAX_SCANNED, USER_INDEX_MIN_OVERLAP
+from app.models.user import User
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+#Marks the start of a name so prefixes, which is what a typeahead sends, share an extra trigram with it
+_START = "\x00"
+#Users read per statement while the index is loaded
+LOAD_CHUNK = 20_000
+
+#Distinct lowercase trigrams of the texts, each padded at the start. Whitespace splits a text into separate words
+def trigrams(*texts: str) -> set:
+    grams = set()
+    for text in texts:
+        for word in text.lower().split():
+            word = _START + word
+            grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+#A user is indexed under their username and the part of their email before the @. Domains are shared by
+#thousands of users and would make every lookup read their huge posting lists
+def user_trigrams(username, email) -> set:
+    return trigrams(username or "", (email or "").split("@")[0])
+
+#Per-worker inverted index from trigrams to user ids for fuzzy typeahead. Each trigram keeps a sorted array of user ids,
+#4 bytes per entry, and sizes[id] holds how many trigrams the user has. Loaded on the first lookup, then kept up to date
+#by add/remove from the user routes of this worker and by reading users created through other workers every
+#refresh_interval seconds. Users deleted through other workers stay indexed until a restart and are dropped when the
+#matches are read back from the database. loaded_through is the highest id read from the database, users added by
+#this worker do not move it, so users created meanwhile by other workers with lower ids are still read
+class UserIndex:
+    def __init__(self, refresh_interval: float = USER_INDEX_REFRESH_SECONDS, max_scanned: int = USER_INDEX_MAX_SCANNED,
+                 min_overlap: float = USER_INDEX_MIN_OVERLAP, clock=time.monotonic):
+        self.refresh_interval = refresh_interval
+        self.max_scanned = max_scanned
+        self.min_overlap = min_overlap
+        self.clock = clock
+        self._postings = {}
+        self._sizes = array("H")
+        self._lock = threading.Lock()
+        #Held while reading new users from the database, the index itself stays readable meanwhile
+        self._refresh_lock = threading.Lock()
+        self.loaded = False
+        self.loaded_through = 0
+        self._refreshed = 0.0
+
+    def _add(self, user_id: int, grams: set):
+        if user_id >= len(self._sizes):
+            self._sizes.extend([0] * (user_id + 1 - len(self._sizes)))
+        elif self._sizes[user_id]:
+            return
+        self._sizes[user_id] = min(len(grams), 0xFFFF)
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = array("I", (user_id,))
+            elif postings[-1] < user_id:
+                postings.append(user_id)
+            else:
+                bisect.insort(postings, user_id)
+
+    #Call after the user's insert commits
+    def add(self, user_id: int, username, email):
+        with self._lock:
+            if self.loaded:
+                self._add(user_id, user_trigrams(username, email))
+
+    #Call after the user's delete commits, with the name and email the user was indexed under
+    def remove(self, user_id: int, username, email):
+        with self._lock:
+            if not self.loaded or user_id >= len(self._sizes) or not self._sizes[user_id]:
+                return
+            self._sizes[user_id] = 0
+            for gram in user_trigrams(username, email):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    continue
+                position = bisect.bisect_left(postings, user_id)
+                if position < len(postings) and postings[position] == user_id:
+                    del postings[position]
+                if not postings:
+                    del self._postings[gram]
+
+    #Index the users with an id above loaded_through, all of them on the first call. Called with _refresh_lock held,
+    #only adding the rows takes the index lock
+    def _catch_up(self, db):
+        while True:
+            rows = db.execute(
+                select(User.id, User.username, User.email)
+                .where(User.id > self.loaded_through).order_by(User.id).limit(LOAD_CHUNK)
+            ).all()
+            with self._lock:
+                for row in rows:
+                    self._add(row.id, user_trigrams(row.username, row.email))
+                if rows:
+                    self.loaded_through = rows[-1].id
+            if len(rows) < LOAD_CHUNK:
+                break
+        with self._lock:
+            self.loaded = True
+            self._refreshed = self.clock()
+
+    def _due(self) -> bool:
+        return not self.loaded or self.clock() - self._refreshed >= self.refresh_interval
+
+    #Catch up when the index is not loaded or is refresh_interval seconds old. Lookups on a loaded index do not wait
+    #for a refresh another thread is running
+    def _refresh(self, db):
+        if not self._refresh_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            if self._due():
+                start = time.perf_counter()
+                self._catch_up(db)
+                registry.histogram("user_index_refresh_seconds").observe(time.perf_counter() - start)
+        finally:
+            self._refresh_lock.release()
+
+    #Load the index in a background thread so the first typeahead does not wait for it, lookups made meanwhile wait
+    #on the lock instead of loading it again
+    def preload(self, session_factory) -> threading.Thread:
+        def load():
+            try:
+                with session_factory() as db, self._refresh_lock:
+                    if not self.loaded:
+                        self._catch_up(db)
+            except Exception:
+                logger.exception("Preloading the user index failed, it is loaded on the first lookup instead")
+
+        thread = threading.Thread(target=load, name="user-index-preload", daemon=True)
+        thread.start()
+        return thread
+
+    #Up to limit user ids best matching q, best first. A user matches when they share at least min_overlap of the
+    #query's counted trigrams, ties go to the user with fewer other trigrams (the closer, shorter name)
+    def search(self, db, q: str, limit: int) -> list[int]:
+        grams = trigrams(q)
+        if not grams:
+            return []
+        if self._due():
+            self._refresh(db)
+        with self._lock:
+            #Rarest trigrams first, they tell users apart. Trigrams whose lists no longer fit in the budget are shared by
+            #so many users that they hardly change the ranking and are skipped, which bounds the cost of a lookup
+            counts = Counter()
+            scanned = counted = 0
+            for postings in sorted((self._postings.get(gram, ()) for gram in grams), key=len):
+                if scanned and scanned + len(postings) > self.max_scanned:
+                    break
+                #Even the rarest trigram can be very common for a query of two or three letters
+                counts.update(postings[:self.max_scanned])
+                scanned += min(len(postings), self.max_scanned)
+                counted += 1
+
+            needed = max(1, round(counted * self.min_overlap))
+            sizes = self._sizes
+            matches = ((shared, -sizes[user_id], user_id) for user_id, shared in counts.items() if shared >= needed)
+            best = heapq.nlargest(limit, matches)
+        registry.counter("user_index_searches_total").inc()
+        return [user_id for _, _, user_id in best]
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._sizes = array("H")
+            self.loaded = False
+            self.loaded_through = 0
+
+    def size(self) -> dict:
+        return {
+            "users": sum(1 for size in self._sizes if size), "trigrams": len(self._postings),
+            "postings": sum(len(postings) for postings in self._postings.values()),
+        }
+
+user_index = UserIndex()
@@ -0,0 +1,66 @@
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from app.models.question import SINGLE_CHOICE_TYPES
+from app.schemas.session_settings import SessionConfig
+from app.services.session_lifecycle import voting_window_error
+
+#Reason given when the insert refused a vote the checks read after the refusal no longer explain, e.g. because a
+#concurrent request deleted the vote that conflicted with it
+REFUSED_VOTE = (409, "Vote conflicted with a concurrent change, please try again")
+
+#How many candidates of the question a user may vote for, None for no limit
+def question_limit(question_type: str, config: SessionConfig) -> Optional[int]:
+    if question_type in SINGLE_CHOICE_TYPES:
+        return 1
+    return config.max_selections
+
+#(status_code, detail) explaining why the user may not vote in the session right now, None if they may.
+#checks carries the user's whitelisted flag from queries.voter_eligibility or queries.vote_eligibility
+def session_rejection(user_id: int, session, checks, now: datetime) -> Optional[tuple[int, str]]:
+    closed_reason = voting_window_error(session.open_at, session.close_at, session.closed_at, now)
+    if closed_reason:
+        return 403, closed_reason
+    if not session.is_published:
+        return 403, "Voting session is not published"
+    if not (checks.whitelisted or session.creator_id == user_id):
+        return 403, "User is not whitelisted for this session"
+    return None
+
+#(status_code, detail) explaining why the user's vote is refused, None if it is allowed. location comes from the catalog and
+#checks is the queries.vote_eligibility row for the voter
+def vote_rejection(user_id: int, location, checks, config: SessionConfig, now: datetime) -> Optional[tuple[int, str]]:
+    if not checks.user_exists:
+        return 404, "User not found"
+    if not checks.candidate_exists:
+        return 404, "Candidate not found"
+    rejection = session_rejection(user_id, location.session, checks, now)
+    if rejection:
+        return rejection
+    return selection_rejection(location, checks, config)
+
+#(status_code, detail) when the user already voted for the candidate or has no selections left in the question or the
+#session, None otherwise. Also explains an insert refused by the unique indexes or the limits, from checks read again
+#after the refusal
+def selection_rejection(location, checks, config: SessionConfig) -> Optional[tuple[int, str]]:
+    if checks.already_voted:
+        return 400, "User has already voted for this candidate"
+    limit = question_limit(location.question_type, config)
+    if limit is not None and checks.question_votes >= limit:
+        return 400, "No selections left for this question"
+    if config.max_votes is not None and checks.session_votes >= config.max_votes:
+        return 400, "Vote limit reached for this session"
+    return None
+
+#(status_code, detail) when a ballot selects more candidates than the limits allow, None if it fits. selections are
+#queries.ballot_candidates rows and other_votes counts the user's votes in the session the ballot leaves alone
+def ballot_rejection(selections, config: SessionConfig, other_votes: int = 0) -> Optional[tuple[int, str]]:
+    types = {selection.question_id: selection.question_type for selection in selections}
+    for question_id, count in Counter(selection.question_id for selection in selections).items():
+        limit = question_limit(types[question_id], config)
+        if limit is not None and count > limit:
+            return 400, f"Too many selections for question {question_id}"
+    if config.max_votes is not None and other_votes + len(selections) > config.max_votes:
+        return 400, "Vote limit reached for this session"
+    return None
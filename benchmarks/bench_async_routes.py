@@ -0,0 +1,96 @@
+#Compares requests per second of the sync routes and their async versions at high concurrency.
+#Run from the project root: python -m benchmarks.bench_async_routes
+import asyncio
+import os
+import tempfile
+import time
+
+#Point the app at a throwaway database before it is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ.setdefault("SQLITE_PROFILE", "performance")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+#Sync routes hold their connection until the dependency closes the session on the threadpool (40 threads).
+#With fewer connections than concurrent requests every thread can end up waiting for a connection held by a
+#request that is itself waiting for a thread, so the pool is sized to the concurrency to keep the sync run alive.
+os.environ.setdefault("DB_POOL_SIZE", "100")
+os.environ.setdefault("DB_MAX_OVERFLOW", "100")
+os.environ.setdefault("ASYNC_DB_POOL_SIZE", "5")
+os.environ.setdefault("ASYNC_DB_MAX_OVERFLOW", "10")
+os.environ.setdefault("SQLITE_BUSY_TIMEOUT_MS", "30000")
+
+import httpx
+
+from app.main import app
+from app.services.database import SessionLocal, engine
+from app.services.migrations import prepare_database
+from app.models.user import User
+from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
+from app.models.whitelist import Whitelist
+
+CONCURRENCY = 200
+REQUESTS = 1000
+USERS = 1000
+CANDIDATES = 20
+
+def seed():
+    db = SessionLocal()
+    db.add_all([User(id=i, username=f"user{i}", email=f"user{i}@example.com", password="x", type="user") for i in range(1, USERS + 1)])
+    db.add_all([VotingSession(id=i, title=f"Poll {i}", creator_id=1, is_published=True) for i in range(1, 101)])
+    db.add(Question(id=1, session_id=1, title="Question", type="multiple_choice"))
+    db.add_all([Candidate(id=i, question_id=1, name=f"Candidate {i}") for i in range(1, CANDIDATES + 1)])
+    db.add_all([Whitelist(user_id=i, session_id=1) for i in range(1, USERS + 1, 2)])
+    db.flush()
+    db.add_all([Vote(user_id=i, candidate_id=i % CANDIDATES + 1) for i in range(1, 201)])
+    db.commit()
+    db.close()
+
+async def run(client, name, make_request):
+    queue = iter(range(REQUESTS))
+    statuses = {}
+
+    async def worker():
+        for i in queue:
+            response = await make_request(client, i)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<38} {REQUESTS / elapsed:>8.0f} req/s  statuses: {statuses}", flush=True)
+
+def cast(prefix, candidate_offset):
+    #Every request votes for a different (user, candidate) pair so none are rejected as duplicates
+    async def request(client, i):
+        user_id = i % USERS + 1
+        candidate_id = (i // USERS + candidate_offset) % CANDIDATES + 1
+        return await client.post(f"{prefix}/votes/", json={"user_id": user_id, "candidate_id": candidate_id})
+    return request
+
+def get(path):
+    async def request(client, i):
+        return await client.get(path(i))
+    return request
+
+async def main():
+    #ASGITransport does not run the lifespan handler, so build the schema here
+    prepare_database(engine)
+    seed()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        print(f"{REQUESTS} requests per route, {CONCURRENCY} concurrent clients")
+        #Reads first so both variants see the same number of votes
+        routes = [
+            ("session results", lambda prefix: get(lambda i: f"{prefix}/votes/session/1/results")),
+            ("session listing", lambda prefix: get(lambda i: f"{prefix}/voting-sessions/")),
+            ("access check", lambda prefix: get(lambda i: f"{prefix}/voting-sessions/1/access/{i % USERS + 1}")),
+            ("cast vote", lambda prefix: cast(prefix, 1 if prefix == "/api" else 2)),
+        ]
+        for name, make_request in routes:
+            for label, prefix in (("sync", "/api"), ("async", "/api/async")):
+                await run(client, f"{label} {name}", make_request(prefix))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+#Compares deleting a large voting session through the ORM object graph and through ON DELETE CASCADE.
+#Run from the project root: python -m benchmarks.bench_cascade_delete
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.models.user import User
+from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
+from app.models.whitelist import Whitelist
+
+QUESTIONS = 10
+CANDIDATES_PER_QUESTION = 10
+VOTES = 200_000
+USERS = 5_000
+
+def seed(engine):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x", "type": "user"} for i in range(1, USERS + 1)])
+        conn.execute(insert(VotingSession.__table__), [{"id": 1, "title": "Large poll", "creator_id": 1, "is_published": True}])
+        conn.execute(insert(Question.__table__), [{"id": q, "session_id": 1, "title": f"Question {q}", "type": "multiple_choice"} for q in range(1, QUESTIONS + 1)])
+        candidates = [
+            {"id": (q - 1) * CANDIDATES_PER_QUESTION + c, "question_id": q, "name": f"Candidate {c}"}
+            for q in range(1, QUESTIONS + 1) for c in range(1, CANDIDATES_PER_QUESTION + 1)
+        ]
+        conn.execute(insert(Candidate.__table__), candidates)
+        conn.execute(insert(Whitelist.__table__), [{"user_id": i, "session_id": 1} for i in range(1, USERS + 1)])
+        votes = []
+        for i in range(VOTES):
+            candidate = candidates[i % len(candidates)]
+            votes.append({
+                "user_id": i % USERS + 1,
+                "candidate_id": candidate["id"],
+                "question_id": candidate["question_id"],
+                "session_id": 1,
+            })
+        conn.execute(insert(Vote.__table__), votes)
+
+def run(label: str, load_graph: bool):
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_db_engine(url, pool_name=f"bench_delete_{load_graph}", sqlite_profile="performance")
+    seed(engine)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    db = sessionmaker(bind=engine)()
+    tracemalloc.start()
+    start = time.perf_counter()
+    session = db.get(VotingSession, 1)
+    if load_graph:
+        #What the ORM cascade did before passive_deletes: every child is loaded and deleted one by one
+        for question in session.questions:
+            for candidate in question.candidates:
+                candidate.votes
+        session.whitelist
+    db.delete(session)
+    db.commit()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    deletes = sum(1 for statement in statements if statement.lstrip().upper().startswith("DELETE"))
+    print(f"{label:<22} {elapsed:>8.2f}s  peak memory: {peak / 2**20:>7.1f} MiB  statements: {len(statements):>6} ({deletes} DELETE)")
+    db.close()
+    engine.dispose()
+
+if __name__ == "__main__":
+    print(f"Deleting a session with {QUESTIONS} questions, {QUESTIONS * CANDIDATES_PER_QUESTION} candidates, {USERS} whitelist entries and {VOTES} votes")
+    run("orm object graph", load_graph=True)
+    run("database cascade", load_graph=False)
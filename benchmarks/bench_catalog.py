@@ -0,0 +1,95 @@
+#Memory used by a catalog holding 1M candidates and the cost of a catalog hit against the candidate_location query
+#it replaces. Run from the project root: python -m benchmarks.bench_catalog
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.services import queries
+from app.services.catalog import Catalog
+from app.services.database import Base, create_db_engine
+from app.models.candidate import Candidate
+from app.models.question import Question
+from app.models.user import User
+from app.models.voting_session import VotingSession
+
+CANDIDATES = 1_000_000
+CANDIDATES_PER_QUESTION = 5
+QUESTIONS_PER_SESSION = 200
+CHUNK = 50_000
+LOOKUPS = 200_000
+QUERIES = 5_000
+
+def seed(engine):
+    questions = CANDIDATES // CANDIDATES_PER_QUESTION
+    sessions = questions // QUESTIONS_PER_SESSION
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{"id": 1, "username": "owner", "email": "owner@example.com", "password": "x", "type": "user"}])
+        conn.execute(insert(VotingSession.__table__), [
+            {"id": i, "title": f"Poll {i}", "creator_id": 1, "is_published": True} for i in range(1, sessions + 1)
+        ])
+        conn.execute(insert(Question.__table__), [
+            {"id": i, "session_id": (i - 1) // QUESTIONS_PER_SESSION + 1, "title": "Q", "type": "multiple_choice"}
+            for i in range(1, questions + 1)
+        ])
+        for start in range(1, CANDIDATES + 1, CHUNK):
+            conn.execute(insert(Candidate.__table__), [
+                {"id": i, "question_id": (i - 1) // CANDIDATES_PER_QUESTION + 1, "name": f"C{i}"}
+                for i in range(start, min(start + CHUNK, CANDIDATES + 1))
+            ])
+
+#Fill the catalog through store_candidate, the path taken by a lazy miss, a chunk of rows at a time
+def fill(db, catalog):
+    location = queries.candidate_location(0)
+    columns = [Candidate.id, *location.selected_columns]
+    for start in range(1, CANDIDATES + 1, CHUNK):
+        rows = db.execute(
+            select(*columns).select_from(Candidate)
+            .join(Question, Question.id == Candidate.question_id)
+            .join(VotingSession, VotingSession.id == Question.session_id)
+            .where(Candidate.id >= start, Candidate.id < start + CHUNK)
+        ).all()
+        for row in rows:
+            catalog.store_candidate(row.id, row, catalog.generation)
+
+def main():
+    engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'catalog.db')}", pool_name="bench_catalog")
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    seed(engine)
+    print(f"seeded {CANDIDATES:,} candidates in {time.perf_counter() - start:.1f}s")
+
+    catalog = Catalog(ttl=3600)
+    with sessionmaker(bind=engine)() as db:
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        fill(db, catalog)
+        gc.collect()
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sizes = catalog.sizes()
+        print(f"filled {sizes} in {time.perf_counter() - start:.1f}s")
+        print(f"catalog memory: {used / 2**20:.1f} MiB, {used / CANDIDATES:.0f} bytes per candidate")
+
+        ids = [random.randint(1, CANDIDATES) for _ in range(LOOKUPS)]
+        start = time.perf_counter()
+        for candidate_id in ids:
+            catalog.candidate(candidate_id)
+        hit = (time.perf_counter() - start) / LOOKUPS
+
+        start = time.perf_counter()
+        for candidate_id in ids[:QUERIES]:
+            db.execute(queries.candidate_location(candidate_id)).first()
+        query = (time.perf_counter() - start) / QUERIES
+
+    print(f"catalog hit: {hit * 1e6:.2f} us, candidate_location query: {query * 1e6:.1f} us ({query / hit:.0f}x)")
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#Measures the overhead the rate limiter adds to a request.
+#Run from the project root: python -m benchmarks.bench_rate_limiter
+import asyncio
+import threading
+import time
+
+from app.middleware import RateLimitMiddleware
+from app.services.rate_limiter import InMemoryBackend, SharedBackend, RateLimiter, parse_rules
+from app.services.shared_store import SharedStoreServer, SharedStoreClient
+
+RULES = "votes:/api/votes:1000000:1000000,sessions:/api/voting-sessions:1000000:1000000,api:/api/:1000000:1000000"
+
+#Time `operations` calls of fn spread over `threads` threads, returns microseconds per call
+def time_calls(fn, operations, threads=1):
+    per_thread = operations // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            fn(f"user:{(offset + i) % 1000}")
+
+    workers = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e6
+
+def bench_backends():
+    memory = InMemoryBackend()
+    take_memory = lambda key: memory.take(key, 1000000, 1000000)
+    for threads in (1, 8):
+        print(f"in-memory backend, {threads} thread(s): {time_calls(take_memory, 200000, threads):.2f} us/op")
+
+    server = SharedStoreServer(port=0)
+    server.start_in_thread()
+    shared = SharedBackend(SharedStoreClient(server.url))
+    take_shared = lambda key: shared.take(key, 1000000, 1000000)
+    for threads in (1, 8):
+        print(f"shared backend, {threads} thread(s): {time_calls(take_shared, 20000, threads):.2f} us/op")
+    server.shutdown()
+    server.server_close()
+
+#Drive a bare ASGI app directly so only the middleware cost is measured
+async def time_asgi(app, requests):
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/votes/", "query_string": b"",
+        "headers": [(b"x-api-key", b"integration")], "client": ("127.0.0.1", 5000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+def bench_middleware():
+    requests = 100000
+    bare = asyncio.run(time_asgi(endpoint, requests))
+    limited = asyncio.run(time_asgi(RateLimitMiddleware(endpoint, RateLimiter(parse_rules(RULES), InMemoryBackend())), requests))
+    print(f"ASGI request without limiter: {bare:.2f} us")
+    print(f"ASGI request with in-memory limiter: {limited:.2f} us (+{limited - bare:.2f} us)")
+
+if __name__ == "__main__":
+    bench_backends()
+    bench_middleware()
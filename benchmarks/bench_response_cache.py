@@ -0,0 +1,58 @@
+#Latency of listing voting sessions served from the response cache against encoding the list on every request.
+#Run from the project root: python -m benchmarks.bench_response_cache
+import os
+import statistics
+import tempfile
+import time
+
+#Point the app at a throwaway database before it is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ.setdefault("SQLITE_PROFILE", "performance")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.main import app
+from app.services.database import engine
+from app.services.migrations import prepare_database
+from app.services.replication import CONSISTENCY_HEADER
+from app.models.user import User
+from app.models.voting_session import VotingSession
+
+SESSIONS = 2_000
+REQUESTS = 200
+
+def seed():
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{"id": 1, "username": "owner", "email": "owner@example.com", "password": "x", "type": "user"}])
+        conn.execute(insert(VotingSession.__table__), [
+            {"id": i, "title": f"Poll number {i}", "description": "A poll about the budget", "creator_id": 1, "is_published": i % 2 == 0}
+            for i in range(1, SESSIONS + 1)
+        ])
+
+def measure(client, label: str, headers: dict):
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = client.get("/api/voting-sessions/", headers=headers)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code in (200, 304)
+    timings.sort()
+    print(f"{label:<24} p50 {statistics.median(timings) * 1e3:>7.2f} ms   p99 {timings[int(len(timings) * 0.99) - 1] * 1e3:>7.2f} ms   "
+          f"{int(response.headers.get('content-length', 0)) / 1024:>6.0f} KiB sent", flush=True)
+
+def main():
+    prepare_database(engine)
+    seed()
+    print(f"GET /api/voting-sessions/ with {SESSIONS:,} sessions, {REQUESTS} requests each")
+    with TestClient(app) as client:
+        #The consistency token makes every request skip the cache and encode the list again
+        measure(client, "uncached", {"Accept-Encoding": "identity", CONSISTENCY_HEADER: "0"})
+        measure(client, "cached", {"Accept-Encoding": "identity"})
+        measure(client, "cached, gzip", {"Accept-Encoding": "gzip"})
+        etag = client.get("/api/voting-sessions/", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+        measure(client, "cached, If-None-Match", {"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+if __name__ == "__main__":
+    main()
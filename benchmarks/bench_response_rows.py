@@ -0,0 +1,80 @@
+#Memory and latency of list endpoints reading ORM objects against reading only the response columns as rows.
+#Run from the project root: python -m benchmarks.bench_response_rows
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, with_polymorphic
+
+from app.services import queries
+from app.services.database import Base
+from app.services.serialization import json_serializer
+from app.models.user import User
+from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
+from app.schemas.user_schema import UserOut
+from app.schemas.vote import VoteResponse
+
+ROWS = 100_000
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x" * 60, "type": "user"}
+            for i in range(1, ROWS + 1)
+        ])
+        conn.execute(insert(VotingSession.__table__), [{"id": 1, "title": "Poll", "creator_id": 1}])
+        conn.execute(insert(Question.__table__), [{"id": 1, "session_id": 1, "title": "Question", "type": "multiple_choice"}])
+        conn.execute(insert(Candidate.__table__), [{"id": 1, "question_id": 1, "name": "C1"}])
+        conn.execute(insert(Vote.__table__), [
+            {"user_id": i, "candidate_id": 1, "question_id": 1, "session_id": 1, "single_choice": False, "user_input": None}
+            for i in range(1, ROWS + 1)
+        ])
+
+#Time of reading the list and encoding it, then the peak of traced memory in a second run, each in a fresh session.
+#tracemalloc slows allocations down, so it stays off while timing
+def measure(engine, label: str, read, serialize):
+    gc.collect()
+    with Session(engine) as db:
+        start = time.perf_counter()
+        result = read(db)
+        loaded = time.perf_counter() - start
+        body = serialize(result)
+        total = time.perf_counter() - start
+    del result
+    gc.collect()
+    with Session(engine) as db:
+        tracemalloc.start()
+        serialize(read(db))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print(f"  {label:<36} read {loaded * 1e3:>6.0f} ms   total {total * 1e3:>6.0f} ms   peak {peak / 2**20:>6.1f} MiB", flush=True)
+    return body
+
+def main():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    seed(engine)
+    users = json_serializer(List[UserOut])
+    votes = json_serializer(List[VoteResponse])
+
+    print(f"GET /api/users/, {ROWS:,} users")
+    #The mapper used to load every User with_polymorphic="*", joining administrators
+    before = measure(engine, "User objects, administrators joined", lambda db: db.query(with_polymorphic(User, "*")).all(), users)
+    measure(engine, "User objects", lambda db: db.query(User).all(), users)
+    after = measure(engine, "response rows", lambda db: db.execute(queries.response_rows(User, UserOut)).all(), users)
+    assert before == after
+
+    print(f"GET /api/votes/candidate/1, {ROWS:,} votes")
+    before = measure(engine, "Vote objects", lambda db: db.query(Vote).filter(Vote.candidate_id == 1).all(), votes)
+    after = measure(engine, "response rows", lambda db: db.execute(queries.response_rows(Vote, VoteResponse).where(Vote.candidate_id == 1)).all(), votes)
+    assert before == after
+
+if __name__ == "__main__":
+    main()
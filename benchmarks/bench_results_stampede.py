@@ -0,0 +1,80 @@
+#Hundreds of clients asking for the results of one poll at the same moment, with and without single-flight coalescing.
+#Run from the project root: python -m benchmarks.bench_results_stampede
+import asyncio
+import os
+import tempfile
+import time
+
+#Point the app at a throwaway database before it is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ.setdefault("SQLITE_PROFILE", "performance")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+#Enough connections for every threadpool thread, see bench_async_routes
+os.environ.setdefault("DB_POOL_SIZE", "100")
+os.environ.setdefault("DB_MAX_OVERFLOW", "100")
+
+import httpx
+from sqlalchemy import insert
+
+from app.main import app
+from app.routes import vote_routes, async_vote_routes
+from app.services.database import engine
+from app.services.metrics import registry
+from app.services.migrations import prepare_database
+from app.models.user import User
+from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
+
+CLIENTS = 200
+VOTERS = 5_000
+CANDIDATES = 5
+
+def seed():
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x", "type": "user"}
+            for i in range(1, VOTERS + 1)
+        ])
+        conn.execute(insert(VotingSession.__table__), [{"id": 1, "title": "Poll", "creator_id": 1, "is_published": True}])
+        conn.execute(insert(Question.__table__), [{"id": 1, "session_id": 1, "title": "Question", "type": "multiple_choice"}])
+        conn.execute(insert(Candidate.__table__), [{"id": i, "question_id": 1, "name": f"C{i}"} for i in range(1, CANDIDATES + 1)])
+        conn.execute(insert(Vote.__table__), [
+            {"user_id": i, "candidate_id": i % CANDIDATES + 1, "question_id": 1, "session_id": 1, "single_choice": False}
+            for i in range(1, VOTERS + 1)
+        ])
+
+#Every request computes its own response
+def disable(flight):
+    flight.do = lambda key, compute: compute()
+    flight.do_async = lambda key, compute: compute()
+
+async def stampede(client, path: str, label: str, flight):
+    before = {role: registry.counter("single_flight_requests_total", route=flight.name, role=role).value for role in ("leader", "follower")}
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.get(path) for _ in range(CLIENTS)))
+    elapsed = time.perf_counter() - start
+    assert all(response.status_code == 200 for response in responses)
+    after = {role: registry.counter("single_flight_requests_total", route=flight.name, role=role).value for role in before}
+    computed = after["leader"] - before["leader"] or CLIENTS
+    print(f"{label:<28} {elapsed * 1e3:>8.0f} ms for {CLIENTS} requests, {computed} computed, {len(responses[0].content) / 1024:.0f} KiB each", flush=True)
+
+async def main():
+    #ASGITransport does not run the lifespan handler, so build the schema here
+    prepare_database(engine)
+    seed()
+    print(f"{CLIENTS} concurrent clients, results of one session with {VOTERS:,} votes")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for path, label, endpoint in (
+            ("/api/votes/session/1/results", "sync", vote_routes.get_session_results),
+            ("/api/async/votes/session/1/results", "async", async_vote_routes.get_session_results),
+        ):
+            flight = endpoint.single_flight
+            await stampede(client, path, f"{label} coalesced", flight)
+            disable(flight)
+            await stampede(client, path, f"{label} not coalesced", flight)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+#Compares concurrent read and write throughput on a SQLite file with and without the performance profile.
+#Run from the project root: python -m benchmarks.bench_sqlite_profile
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.services.database import create_db_engine
+
+DURATION = 5.0
+WRITERS = 4
+READERS = 8
+
+def run(profile: str, read_pool: bool):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    writer_engine = create_db_engine(url, pool_name=f"bench_{profile}", sqlite_profile=profile, pool_size=WRITERS + READERS)
+    reader_engine = writer_engine
+    if read_pool:
+        reader_engine = create_db_engine(url, pool_name=f"bench_{profile}_read", sqlite_profile=profile, read_only=True, pool_size=READERS)
+
+    with writer_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE votes (id INTEGER PRIMARY KEY, user_id INTEGER, candidate_id INTEGER)"))
+        conn.execute(text("CREATE INDEX ix_votes_candidate_id ON votes (candidate_id)"))
+        conn.execute(
+            text("INSERT INTO votes (user_id, candidate_id) VALUES (:u, :c)"),
+            [{"u": i, "c": i % 50} for i in range(20000)],
+        )
+
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + DURATION
+
+    def writer(worker):
+        done = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                with writer_engine.begin() as conn:
+                    conn.execute(text("INSERT INTO votes (user_id, candidate_id) VALUES (:u, :c)"), {"u": worker, "c": done % 50})
+                done += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    def reader(worker):
+        done = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                with reader_engine.connect() as conn:
+                    conn.execute(text("SELECT candidate_id, COUNT(*) FROM votes WHERE candidate_id = :c GROUP BY candidate_id"), {"c": done % 50}).all()
+                done += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts["reads"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    writer_engine.dispose()
+    reader_engine.dispose()
+    label = f"{profile}{' + read pool' if read_pool else ''}"
+    print(f"{label:<28} writes/s: {counts['writes'] / DURATION:>8.0f}  reads/s: {counts['reads'] / DURATION:>8.0f}  errors: {counts['errors']}")
+
+if __name__ == "__main__":
+    print(f"{WRITERS} writer and {READERS} reader threads for {DURATION:.0f}s each")
+    run("default", read_pool=False)
+    run("performance", read_pool=False)
+    run("performance", read_pool=True)
@@ -0,0 +1,66 @@
+#Cost of encoding the user list: User objects through the response model as FastAPI validates them, against SQL rows
+#through the cached output TypeAdapter. Run from the project root: python -m benchmarks.bench_user_list_serialization
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.services import queries
+from app.services.database import Base
+from app.services.serialization import json_serializer
+from app.models.user import User
+from app.schemas.user_schema import UserOut
+
+USERS = 50_000
+
+def timed(label: str, run):
+    start = time.perf_counter()
+    result = run()
+    print(f"{label:<40} {(time.perf_counter() - start) * 1e3:>8.0f} ms", flush=True)
+    return result
+
+#What GET /api/users/ did before: every row loaded as a User, validated from attributes with EmailStr checked again,
+#dumped to Python and encoded by the json module
+def before(db):
+    users = timed("  load User objects", lambda: db.query(User).all())
+    adapter = TypeAdapter(List[UserOut])
+    return timed("  validate and encode", lambda: json.dumps(
+        adapter.dump_python(adapter.validate_python(users, from_attributes=True), mode="json"),
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8"))
+
+def after(db):
+    rows = timed("  select the UserOut columns", lambda: db.execute(queries.response_rows(User, UserOut)).all())
+    serialize = json_serializer(List[UserOut])
+    return timed("  validate and encode", lambda: serialize(rows))
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x", "type": "user"}
+            for i in range(1, USERS + 1)
+        ])
+    #Build the cached adapter outside the timings, it is built once per process
+    json_serializer(List[UserOut])
+
+    print(f"GET /api/users/ body for {USERS:,} users")
+    with Session(engine) as db:
+        start = time.perf_counter()
+        print("before")
+        old = before(db)
+        print(f"  total {(time.perf_counter() - start) * 1e3:.0f} ms")
+    with Session(engine) as db:
+        start = time.perf_counter()
+        print("after")
+        new = after(db)
+        print(f"  total {(time.perf_counter() - start) * 1e3:.0f} ms")
+    assert json.loads(old) == json.loads(new)
+    print(f"{len(new) / 1024 / 1024:.1f} MiB, same JSON")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#Load time, memory and lookup latency of the fuzzy user index over 500k users, queries are prefixes of real names and
+#names with a typo. Run from the project root: python -m benchmarks.bench_user_typeahead
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services.user_index import UserIndex
+from app.models.user import User
+
+USERS = 500_000
+CHUNK = 50_000
+QUERIES = 2_000
+LIMIT = 10
+SYLLABLES = ["an", "ber", "ca", "da", "el", "fi", "go", "ha", "is", "jo", "ka", "li", "ma", "no", "ol", "pe", "ra", "si", "ta", "vi", "wen", "xa", "yu", "zo"]
+DOMAINS = ["gmail.com", "example.org", "uni.edu", "corp.io", "mail.net"]
+
+def name(syllables: int) -> str:
+    return "".join(random.choice(SYLLABLES) for _ in range(syllables))
+
+def seed(engine) -> list[str]:
+    firsts = [name(2) for _ in range(500)]
+    lasts = [name(random.randint(2, 4)) for _ in range(5_000)]
+    usernames = []
+    with engine.begin() as conn:
+        for start in range(1, USERS + 1, CHUNK):
+            rows = []
+            for i in range(start, min(start + CHUNK, USERS + 1)):
+                first, last = random.choice(firsts), random.choice(lasts)
+                username = f"{first}.{last}{i}"
+                usernames.append(username)
+                rows.append({"id": i, "username": username, "email": f"{first}{last}{i}@{random.choice(DOMAINS)}", "password": "x", "type": "user"})
+            conn.execute(insert(User.__table__), rows)
+    return usernames
+
+#A prefix of 3 to 8 characters, every third query with two neighbouring letters swapped
+def queries(usernames: list[str]) -> list[str]:
+    result = []
+    for i in range(QUERIES):
+        q = random.choice(usernames)[:random.randint(3, 8)]
+        if i % 3 == 0 and len(q) > 4:
+            j = random.randint(1, len(q) - 2)
+            q = q[:j] + q[j + 1] + q[j] + q[j + 2:]
+        result.append(q)
+    return result
+
+def main():
+    engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'users.db')}", pool_name="bench_user_typeahead")
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    usernames = seed(engine)
+    print(f"seeded {USERS:,} users in {time.perf_counter() - start:.1f}s")
+
+    index = UserIndex(refresh_interval=3600)
+    with sessionmaker(bind=engine)() as db:
+        start = time.perf_counter()
+        index.search(db, "warmup", LIMIT)
+        loaded = time.perf_counter() - start
+        size = index.size()
+        #Posting arrays take 4 bytes per entry and the trigram counts 2 bytes per user, the dict of trigrams is small
+        used = size["postings"] * 4 + USERS * 2
+        print(f"loaded {size} in {loaded:.1f}s, posting arrays {used / 2**20:.1f} MiB, {used / USERS:.0f} bytes per user")
+
+        timings = []
+        for q in queries(usernames):
+            start = time.perf_counter()
+            index.search(db, q, LIMIT)
+            timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(
+        f"lookup over {QUERIES} queries: median {statistics.median(timings) * 1e3:.2f} ms, "
+        f"p99 {timings[int(len(timings) * 0.99)] * 1e3:.2f} ms, max {timings[-1] * 1e3:.2f} ms"
+    )
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#Casts votes from 500 concurrent voters through the sync and async routes and reports requests per second and
+#SQL statements per vote. Half the voters are whitelisted directly and half through a group, and every voter tries
+#one selection more than max_selections allows so refused votes are part of the mix.
+#Run from the project root: python -m benchmarks.bench_vote_eligibility
+import asyncio
+import os
+import tempfile
+import time
+
+#Point the app at a throwaway database before it is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+os.environ.setdefault("SQLITE_PROFILE", "performance")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+#See bench_async_routes for why the sync pool is sized to the concurrency
+os.environ.setdefault("DB_POOL_SIZE", "250")
+os.environ.setdefault("DB_MAX_OVERFLOW", "250")
+os.environ.setdefault("ASYNC_DB_POOL_SIZE", "5")
+os.environ.setdefault("ASYNC_DB_MAX_OVERFLOW", "10")
+os.environ.setdefault("SQLITE_BUSY_TIMEOUT_MS", "30000")
+
+import httpx
+from sqlalchemy import event, insert
+
+from app.main import app
+from app.services.database import SessionLocal, async_engine, engine
+from app.services.migrations import prepare_database
+from app.models.user import User
+from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.session_settings import SessionSettings
+from app.models.whitelist import Whitelist
+from app.models.group_whitelist import GroupWhitelist
+from app.models.user_group import UserGroup, GroupMembership
+
+VOTERS = 500
+MAX_SELECTIONS = 3
+#Session 1 is voted on through the sync routes, session 2 through the async routes
+SESSIONS = (1, 2)
+
+def seed():
+    with SessionLocal() as db:
+        db.execute(insert(User.__table__), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x", "type": "user"}
+            for i in range(1, VOTERS + 1)
+        ])
+        db.execute(insert(VotingSession.__table__), [
+            {"id": i, "title": f"Poll {i}", "creator_id": 1, "is_published": True} for i in SESSIONS
+        ])
+        db.execute(insert(Question.__table__), [
+            {"id": i, "session_id": i, "title": "Question", "type": "multiple_choice"} for i in SESSIONS
+        ])
+        db.execute(insert(Candidate.__table__), [
+            {"id": (i - 1) * 10 + c, "question_id": i, "name": f"Candidate {c}"} for i in SESSIONS for c in range(1, MAX_SELECTIONS + 2)
+        ])
+        db.execute(insert(SessionSettings.__table__), [
+            {"session_id": i, "setting_name": "max_selections", "setting_value": str(MAX_SELECTIONS)} for i in SESSIONS
+        ])
+        db.execute(insert(UserGroup.__table__), [{"id": 1, "name": "Voters", "creator_id": 1}])
+        db.execute(insert(GroupMembership.__table__), [{"group_id": 1, "user_id": i} for i in range(2, VOTERS + 1, 2)])
+        db.execute(insert(GroupWhitelist.__table__), [{"group_id": 1, "session_id": i} for i in SESSIONS])
+        db.execute(insert(Whitelist.__table__), [{"user_id": u, "session_id": i} for i in SESSIONS for u in range(1, VOTERS + 1, 2)])
+        db.commit()
+
+def count_statements(sync_engine):
+    counter = [0]
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+    return counter
+
+async def run(client, name, prefix, session_id, counter):
+    statuses = {}
+    first_candidate = (session_id - 1) * 10 + 1
+
+    async def voter(user_id):
+        for candidate_id in range(first_candidate, first_candidate + MAX_SELECTIONS + 1):
+            response = await client.post(f"{prefix}/votes/", json={"user_id": user_id, "candidate_id": candidate_id})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    counter[0] = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(voter(user_id) for user_id in range(1, VOTERS + 1)))
+    elapsed = time.perf_counter() - start
+    requests = sum(statuses.values())
+    print(f"{name:<12} {requests / elapsed:>8.0f} req/s  {counter[0] / requests:>5.1f} statements/vote  statuses: {statuses}", flush=True)
+
+async def main():
+    #ASGITransport does not run the lifespan handler, so build the schema here
+    prepare_database(engine)
+    seed()
+    sync_counter = count_statements(engine)
+    async_counter = count_statements(async_engine.sync_engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        print(f"{VOTERS} concurrent voters, {MAX_SELECTIONS + 1} votes each with max_selections={MAX_SELECTIONS}")
+        await run(client, "sync", "/api", 1, sync_counter)
+        await run(client, "async", "/api/async", 2, async_counter)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,55 @@
+import os
+
+#Sessions the tests do not override, such as the async routes' under the sync client, must not create or write the
+#default ./test.db
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+#Tests build their own schema, the app must not migrate the configured database on startup
+os.environ.setdefault("DB_STARTUP_MODE", "skip")
+#Tests run the purger, the session scheduler and the user index themselves instead of background threads against the
+#configured database
+os.environ.setdefault("PURGE_POLL_INTERVAL", "0")
+os.environ.setdefault("SESSION_SCHEDULER_RELOAD_INTERVAL", "0")
+os.environ.setdefault("USER_INDEX_PRELOAD", "false")
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.services.database import Base, get_db
+from app.services.database import Base, create_db_engine, get_db, get_read_db
+from app.services.session_config import config_cache
+from app.services.catalog import catalog
+from app.services.cache import facet_cache
+from app.services.user_index import user_index
+from app.services.entity_cache import entity_cache
+from app.services.response_cache import response_cache
 from app.main import app  # Import your actual app instance
+from app.middleware import RateLimitMiddleware, known_api_keys
 
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
-engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+#Same connection setup as the app, including SQLite foreign key enforcement for ON DELETE CASCADE
+engine = create_db_engine(TEST_DATABASE_URL, pool_name="test")
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Ids start over in every test, settings, catalog entries, cached rows and responses, facet counts and indexed users of
+# the previous test must not match
+@pytest.fixture(autouse=True)
+def clear_caches():
+    config_cache.clear()
+    catalog.clear()
+    entity_cache.clear()
+    response_cache.clear()
+    facet_cache.clear()
+    user_index.clear()
+
+# Every test starts with full rate limit buckets and no remembered API keys, requests made by earlier tests must not
+# throttle it
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    known_api_keys.clear()
+    for middleware in app.user_middleware:
+        if middleware.cls is RateLimitMiddleware:
+            middleware.kwargs["limiter"].backend.reset()
+
 @pytest.fixture(scope="function")
 def db_session():
     # Create all tables fresh for each test
@@ -34,6 +74,7 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as client:
         yield client
     app.dependency_overrides.clear()
\ No newline at end of file
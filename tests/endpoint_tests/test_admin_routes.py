@@ -3,7 +3,9 @@ from conftest import *
 from fastapi import status
 from app.models import User, AdminUser
 from app.schemas.user_schema import AdminOut
+from app.services.purger import Purger
 from passlib.hash import bcrypt
+from sqlalchemy.orm import sessionmaker
 from pydantic import ValidationError
 from app.schemas.user_schema import AdminOut, AdminBase  # Import your schemas
 
@@ -94,12 +96,38 @@ class TestAdminRoutes:
     def test_delete_admin(self, client, clean_db):
         # Create and delete admin
         admin = create_test_admin(clean_db)
-        response = client.delete(f"/api/admin/{admin.id}")
+        admin_id = admin.id
+        response = client.delete(f"/api/admin/{admin_id}")
         assert response.status_code == status.HTTP_200_OK
         
-        # Verify deletion
-        assert clean_db.query(AdminUser).get(admin.id) is None
-        assert clean_db.query(User).get(admin.id) is None
+        # Verify deletion, the admin is hidden at once and removed by the purger
+        clean_db.expunge_all()
+        assert clean_db.query(AdminUser).get(admin_id) is None
+        assert clean_db.query(User).get(admin_id) is None
+        Purger(sessionmaker(bind=clean_db.bind)).drain()
+        assert clean_db.query(User).execution_options(include_deleted=True).filter(User.id == admin_id).first() is None
+
+    def test_purge_job_progress(self, client, clean_db):
+        admin = create_test_admin(clean_db)
+        client.delete(f"/api/admin/{admin.id}")
+
+        response = client.get("/api/admin/purge-jobs", params={"status": "pending"})
+        assert response.status_code == status.HTTP_200_OK
+        jobs = response.json()
+        assert [(job["entity"], job["entity_id"], job["step"]) for job in jobs] == [("user", admin.id, 0)]
+
+        Purger(sessionmaker(bind=clean_db.bind)).drain()
+        response = client.get(f"/api/admin/purge-jobs/{jobs[0]['id']}")
+        assert response.status_code == status.HTTP_200_OK
+        job = response.json()
+        assert job["status"] == "done"
+        assert job["step"] == job["steps"]
+        assert job["rows_deleted"] == 1
+        assert job["time_finished"] is not None
+
+    def test_purge_job_not_found(self, client, clean_db):
+        response = client.get("/api/admin/purge-jobs/9999")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
         
     def test_get_admin_by_username_success(self, client, clean_db):
         admin = create_test_admin(clean_db)
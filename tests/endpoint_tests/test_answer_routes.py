@@ -2,6 +2,8 @@
 import pytest
 from fastapi import status
 from app.models.question import Question
+from app.models.user import User
+from app.models.voting_session import VotingSession
 from app.models.answer import Answer
 from app.schemas.answer import AnswerResponse, AnswerCreate, AnswerUpdate
 
@@ -19,9 +21,21 @@ TEST_ANSWER = {
 }
 
 # Helper functions to create test objects directly in the DB
+def create_test_voting_session(db_session):
+    """Creates and returns a VotingSession (and its creator) for test questions to belong to."""
+    creator = User(username="creator", email="creator@example.com", password="secret", type="user")
+    db_session.add(creator)
+    db_session.commit()
+    session = VotingSession(title="Test Session", creator_id=creator.id)
+    db_session.add(session)
+    db_session.commit()
+    db_session.refresh(session)
+    return session
+
 def create_test_question(db_session, is_quiz=True):
     """Creates and returns a Question instance."""
-    question_data = {**TEST_QUESTION, "is_quiz": is_quiz}
+    session = create_test_voting_session(db_session)
+    question_data = {**TEST_QUESTION, "session_id": session.id, "is_quiz": is_quiz}
     question = Question(**question_data)
     db_session.add(question)
     db_session.commit()
@@ -0,0 +1,196 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.services.database import Base, get_async_db
+from app.services.soft_delete import soft_delete_voting_session
+from app.models.user import User
+from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
+from app.models.whitelist import Whitelist
+from app.models.group_whitelist import GroupWhitelist
+from app.models.user_group import UserGroup, GroupMembership
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+# The async routes need an async driver, so these tests use a SQLite file that
+# is seeded through a sync session and read by the routes through aiosqlite.
+
+@pytest.fixture
+def file_db_session(tmp_path):
+    url = f"sqlite:///{tmp_path}/async_test.db"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    yield session, url
+
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def async_client(file_db_session):
+    session, url = file_db_session
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as client:
+        yield client, session
+    app.dependency_overrides.clear()
+
+# ------------------------------------------------------------------------------
+# Helper Functions
+# ------------------------------------------------------------------------------
+
+def add(db_session, obj):
+    """
+    Adds, commits and refreshes a model instance.
+    """
+    db_session.add(obj)
+    db_session.commit()
+    db_session.refresh(obj)
+    return obj
+
+def create_poll(db_session):
+    """
+    Creates a creator, a published session, one question and one candidate.
+    """
+    creator = add(db_session, User(username="creator", email="creator@example.com", password="secret", type="user"))
+    session = add(db_session, VotingSession(title="Async Poll", description="Poll", creator_id=creator.id, is_published=True))
+    question = add(db_session, Question(session_id=session.id, title="Question", type="multiple_choice"))
+    candidate = add(db_session, Candidate(question_id=question.id, name="Candidate"))
+    return creator, session, question, candidate
+
+# ------------------------------------------------------------------------------
+# Test Class for the Async Routes
+# ------------------------------------------------------------------------------
+class TestAsyncRoutes:
+    # ----------------------
+    # Cast Vote
+    # ----------------------
+    def test_cast_vote_success(self, async_client):
+        """Test that a vote can be cast through the async route."""
+        client, db_session = async_client
+        creator, _, _, candidate = create_poll(db_session)
+
+        response = client.post("/api/async/votes/", json={"user_id": creator.id, "candidate_id": candidate.id})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["user_id"] == creator.id
+        assert data["candidate_id"] == candidate.id
+        assert db_session.query(Vote).count() == 1
+
+    def test_cast_vote_not_found(self, async_client):
+        """Test that unknown users and candidates return 404."""
+        client, db_session = async_client
+        creator, _, _, candidate = create_poll(db_session)
+
+        response = client.post("/api/async/votes/", json={"user_id": 9999, "candidate_id": candidate.id})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "user not found" in response.json()["detail"].lower()
+
+        response = client.post("/api/async/votes/", json={"user_id": creator.id, "candidate_id": 9999})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "candidate not found" in response.json()["detail"].lower()
+
+    def test_cast_vote_duplicate(self, async_client):
+        """Test that a duplicate vote is rejected."""
+        client, db_session = async_client
+        creator, _, _, candidate = create_poll(db_session)
+        payload = {"user_id": creator.id, "candidate_id": candidate.id}
+
+        assert client.post("/api/async/votes/", json=payload).status_code == status.HTTP_200_OK
+        response = client.post("/api/async/votes/", json=payload)
+        assert response.status_code == 400
+        assert "already voted" in response.json()["detail"].lower()
+
+    def test_cast_vote_not_whitelisted(self, async_client):
+        """Test that only the creator and whitelisted users can vote."""
+        client, db_session = async_client
+        _, session, _, candidate = create_poll(db_session)
+        voter = add(db_session, User(username="voter", email="voter@example.com", password="secret", type="user"))
+        payload = {"user_id": voter.id, "candidate_id": candidate.id}
+
+        response = client.post("/api/async/votes/", json=payload)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "not whitelisted" in response.json()["detail"].lower()
+
+        add(db_session, Whitelist(user_id=voter.id, session_id=session.id))
+        assert client.post("/api/async/votes/", json=payload).status_code == status.HTTP_200_OK
+
+    # ----------------------
+    # Session Results
+    # ----------------------
+    def test_get_session_results(self, async_client):
+        """Test that the async results route returns the session's votes."""
+        client, db_session = async_client
+        creator, session, _, candidate = create_poll(db_session)
+        vote = add(db_session, Vote(user_id=creator.id, candidate_id=candidate.id))
+
+        response = client.get(f"/api/async/votes/session/{session.id}/results")
+        assert response.status_code == status.HTTP_200_OK
+        assert [v["id"] for v in response.json()] == [vote.id]
+
+    def test_get_session_results_no_questions(self, async_client):
+        """Test that a session without questions returns 404."""
+        client, db_session = async_client
+        creator = add(db_session, User(username="creator", email="creator@example.com", password="secret", type="user"))
+        session = add(db_session, VotingSession(title="Empty", creator_id=creator.id))
+
+        response = client.get(f"/api/async/votes/session/{session.id}/results")
+        assert response.status_code == 404
+        assert "no questions found" in response.json()["detail"].lower()
+
+    def test_get_session_results_deleted_session(self, async_client):
+        """Test that the votes of a deleted session are hidden from the async results route."""
+        client, db_session = async_client
+        creator, session, _, candidate = create_poll(db_session)
+        add(db_session, Vote(user_id=creator.id, candidate_id=candidate.id))
+        soft_delete_voting_session(db_session, session)
+        db_session.commit()
+
+        response = client.get(f"/api/async/votes/session/{session.id}/results")
+        assert response.status_code == 404
+
+    # ----------------------
+    # Sessions and Access
+    # ----------------------
+    def test_get_voting_sessions(self, async_client):
+        """Test that the async listing returns all sessions."""
+        client, db_session = async_client
+        _, session, _, _ = create_poll(db_session)
+
+        response = client.get("/api/async/voting-sessions/")
+        assert response.status_code == status.HTTP_200_OK
+        assert [s["id"] for s in response.json()] == [session.id]
+
+    def test_check_session_access(self, async_client):
+        """Test access through the whitelist, through a group, and without either."""
+        client, db_session = async_client
+        creator, session, _, _ = create_poll(db_session)
+        direct = add(db_session, User(username="direct", email="direct@example.com", password="secret", type="user"))
+        member = add(db_session, User(username="member", email="member@example.com", password="secret", type="user"))
+        outsider = add(db_session, User(username="outsider", email="outsider@example.com", password="secret", type="user"))
+
+        add(db_session, Whitelist(user_id=direct.id, session_id=session.id))
+        group = add(db_session, UserGroup(name="Group", creator_id=creator.id))
+        add(db_session, GroupMembership(group_id=group.id, user_id=member.id))
+        add(db_session, GroupWhitelist(group_id=group.id, session_id=session.id))
+
+        for user, expected in ((direct, True), (member, True), (outsider, False)):
+            response = client.get(f"/api/async/voting-sessions/{session.id}/access/{user.id}")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == {"has_access": expected}
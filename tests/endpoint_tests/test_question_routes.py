@@ -2,6 +2,8 @@
 import pytest
 from fastapi import status
 from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
 from app.models.voting_session import VotingSession
 from app.models.user import User
 from app.schemas.question import QuestionResponse, QuestionCreate, QuestionUpdate
@@ -164,6 +166,34 @@ class TestQuestionRoutes:
         updated_question = db_session.query(Question).get(question.id)
         assert updated_question.title == update_payload["title"]
 
+    def test_update_question_to_single_choice(self, client, db_session):
+        """Test that switching to a single-choice type flags the question's votes for the unique index."""
+        voting_session = create_test_voting_session(db_session)
+        question = create_test_question(db_session, voting_session.id)
+        candidate = Candidate(question_id=question.id, name="A")
+        db_session.add(candidate)
+        db_session.commit()
+        db_session.add(Vote(user_id=voting_session.creator_id, candidate_id=candidate.id))
+        db_session.commit()
+
+        response = client.put(f"/api/questions/questions/{question.id}", json=TEST_QUESTION_UPDATE)
+        assert response.status_code == status.HTTP_200_OK
+        assert db_session.query(Vote).one().single_choice
+
+    def test_update_question_to_single_choice_conflict(self, client, db_session):
+        """Test that a question cannot become single-choice while a user has voted for several of its candidates."""
+        voting_session = create_test_voting_session(db_session)
+        question = create_test_question(db_session, voting_session.id)
+        candidates = [Candidate(question_id=question.id, name=name) for name in ("A", "B")]
+        db_session.add_all(candidates)
+        db_session.commit()
+        db_session.add_all([Vote(user_id=voting_session.creator_id, candidate_id=c.id) for c in candidates])
+        db_session.commit()
+
+        response = client.put(f"/api/questions/questions/{question.id}", json=TEST_QUESTION_UPDATE)
+        assert response.status_code == 400
+        assert "several candidates" in response.json()["detail"].lower()
+
     def test_update_question_not_found(self, client):
         update_payload = TEST_QUESTION_UPDATE.copy()
         response = client.put("/api/questions/questions/9999", json=update_payload)
@@ -0,0 +1,274 @@
+import pytest
+from datetime import datetime
+from fastapi import status
+from sqlalchemy import event
+from app.models.user import User
+from app.models.voting_session import VotingSession
+from app.models.whitelist import Whitelist
+from app.models.group_whitelist import GroupWhitelist
+from app.models.user_group import UserGroup, GroupMembership
+
+SEARCH_URL = "/api/voting-sessions/search"
+
+def create_test_user(db_session, username="testuser", email="testuser@example.com", password="secret"):
+    """
+    Creates and returns a dummy User instance.
+    """
+    user = User(username=username, email=email, password=password, type="user")
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+def create_test_voting_session(db_session, creator_id, title, description=None, is_published=True, time_created=None):
+    """
+    Creates and returns a VotingSession instance associated with the given creator.
+    """
+    session = VotingSession(
+        title=title, description=description, creator_id=creator_id, is_published=is_published, time_created=time_created
+    )
+    db_session.add(session)
+    db_session.commit()
+    db_session.refresh(session)
+    return session
+
+def titles(response):
+    return titles_of(response.json())
+
+def titles_of(page):
+    return [session["title"] for session in page["items"]]
+
+def all_pages(client, url, params):
+    """
+    Follows next_cursor until the last page and returns the titles of every page.
+    """
+    pages, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == status.HTTP_200_OK
+        pages.append(titles(response))
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            return pages
+
+# ------------------------------------------------------------------------------
+# Test Class for Session Search Routes
+# ------------------------------------------------------------------------------
+class TestSessionSearchRoutes:
+    # ----------------------
+    # Full-text Search Tests
+    # ----------------------
+    def test_search_ranks_title_matches_first(self, client, db_session):
+        """Test that every word has to match, prefixes match whole words and title matches rank above description matches."""
+        creator = create_test_user(db_session)
+        create_test_voting_session(db_session, creator.id, "Lunch menu", "Which budget should the canteen get")
+        create_test_voting_session(db_session, creator.id, "Budget for the canteen", "Yearly spending")
+        create_test_voting_session(db_session, creator.id, "Board election", "Budget committee seats")
+
+        response = client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, "q": "budg canteen"})
+        assert response.status_code == status.HTTP_200_OK
+        assert titles(response) == ["Budget for the canteen", "Lunch menu"]
+
+    def test_search_snippet_is_escaped_html(self, client, db_session):
+        """Test that the snippet marks the matched words and escapes the text around them."""
+        creator = create_test_user(db_session)
+        create_test_voting_session(db_session, creator.id, "Poll", "Pick <b>colours</b> for the office")
+
+        response = client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, "q": "colour"})
+        assert response.json()["items"][0]["snippet"] == "Pick &lt;b&gt;<mark>colours</mark>&lt;/b&gt; for the office"
+
+    def test_index_follows_writes(self, client, db_session):
+        """Test that renamed and purged sessions are found under their new text only."""
+        creator = create_test_user(db_session)
+        session = create_test_voting_session(db_session, creator.id, "Spring party")
+        response = client.put(f"/api/voting-sessions/{session.id}", json={"title": "Autumn party"})
+        assert response.status_code == status.HTTP_200_OK
+
+        assert titles(client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, "q": "spring"})) == []
+        assert titles(client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, "q": "autumn"})) == ["Autumn party"]
+
+        db_session.delete(session)
+        db_session.commit()
+        assert titles(client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, "q": "autumn"})) == []
+
+    @pytest.mark.parametrize("q", ['"', "title:x OR", "NEAR(a b)", "*"])
+    def test_query_syntax_is_not_interpreted(self, client, db_session, q):
+        """Test that operators in the query are treated as plain words or rejected, never as a syntax error."""
+        creator = create_test_user(db_session)
+        create_test_voting_session(db_session, creator.id, "Title near x")
+
+        response = client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, "q": q})
+        assert response.status_code in (status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_query_rejected(self, client, db_session):
+        """Test that a query without any words is refused."""
+        creator = create_test_user(db_session)
+        response = client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, "q": "  -- "})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Search query has no words"
+
+    # ----------------------
+    # Whitelisted Search Tests
+    # ----------------------
+    def test_whitelisted_search(self, client, db_session):
+        """Test that a user finds published sessions they are whitelisted in directly or through a group."""
+        creator = create_test_user(db_session, username="creator", email="creator@example.com")
+        voter = create_test_user(db_session, username="voter", email="voter@example.com")
+        direct = create_test_voting_session(db_session, creator.id, "Direct poll")
+        grouped = create_test_voting_session(db_session, creator.id, "Group poll")
+        draft = create_test_voting_session(db_session, creator.id, "Draft poll", is_published=False)
+        create_test_voting_session(db_session, creator.id, "Other poll")
+
+        group = UserGroup(name="Team", creator_id=creator.id)
+        db_session.add(group)
+        db_session.commit()
+        db_session.add_all([
+            Whitelist(user_id=voter.id, session_id=direct.id),
+            Whitelist(user_id=voter.id, session_id=draft.id),
+            GroupMembership(group_id=group.id, user_id=voter.id),
+            GroupWhitelist(group_id=group.id, session_id=grouped.id),
+        ])
+        db_session.commit()
+
+        response = client.get(f"{SEARCH_URL}/whitelisted", params={"user_id": voter.id, "order_by": "title"})
+        assert response.status_code == status.HTTP_200_OK
+        assert titles(response) == ["Direct poll", "Group poll"]
+
+        response = client.get(f"{SEARCH_URL}/whitelisted", params={"user_id": voter.id, "q": "group", "creator_name": "creat"})
+        assert titles(response) == ["Group poll"]
+        assert response.json()["items"][0]["snippet"] == "<mark>Group</mark> poll"
+
+    # ----------------------
+    # Date Filter Tests
+    # ----------------------
+    @pytest.mark.parametrize("filters, expected", [
+        ({"year": 2024}, ["Feb 29", "Mar 1", "Dec 31"]),
+        ({"year": 2024, "month": 2}, ["Feb 29"]),
+        ({"year": 2024, "month": 12}, ["Dec 31"]),
+        ({"year": 2024, "month": 3, "day": 1}, ["Mar 1"]),
+        ({"exact_date": "2024-03-01T17:45:00"}, ["Mar 1"]),
+        ({"exact_date": "2024-03-01T01:00:00+02:00"}, ["Feb 29"]),
+        ({"start_date": "2024-03-01T00:00:00", "end_date": "2025-01-01T00:00:00"}, ["Mar 1", "Dec 31"]),
+        ({"year": 2024, "end_date": "2024-12-31T23:59:59"}, ["Feb 29", "Mar 1"]),
+    ])
+    def test_date_filters(self, client, db_session, filters, expected):
+        """Test that year, month, day and exact_date select whole calendar periods and end_date is exclusive."""
+        creator = create_test_user(db_session)
+        for title, created in [
+            ("Feb 29", datetime(2024, 2, 29, 23, 59)), ("Mar 1", datetime(2024, 3, 1, 0, 0)),
+            ("Dec 31", datetime(2024, 12, 31, 23, 59, 59)), ("New year", datetime(2025, 1, 1)),
+        ]:
+            create_test_voting_session(db_session, creator.id, title, time_created=created)
+
+        response = client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, **filters})
+        assert response.status_code == status.HTTP_200_OK
+        assert titles(response) == expected
+
+    @pytest.mark.parametrize("filters", [{"day": 1}, {"month": 2}, {"day": 1, "year": 2024}, {"year": 2024, "month": 2, "day": 30}])
+    def test_incomplete_dates_rejected(self, client, db_session, filters):
+        """Test that a day or month without the larger units, or a day that does not exist, is refused."""
+        creator = create_test_user(db_session)
+        response = client.get(f"{SEARCH_URL}/my-polls", params={"user_id": creator.id, **filters})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # ----------------------
+    # Pagination Tests
+    # ----------------------
+    def test_pages_follow_creation_time(self, client, db_session):
+        """Test that pages by creation time cover every session once, ties on time_created are broken by id."""
+        creator = create_test_user(db_session)
+        for i in range(7):
+            create_test_voting_session(db_session, creator.id, f"Poll {i}", time_created=datetime(2024, 1, 1 + i // 2))
+
+        params = {"user_id": creator.id, "limit": 3}
+        assert all_pages(client, f"{SEARCH_URL}/my-polls", params) == [
+            ["Poll 0", "Poll 1", "Poll 2"], ["Poll 3", "Poll 4", "Poll 5"], ["Poll 6"]
+        ]
+        assert all_pages(client, f"{SEARCH_URL}/my-polls", {**params, "order_direction": "desc"}) == [
+            ["Poll 6", "Poll 5", "Poll 4"], ["Poll 3", "Poll 2", "Poll 1"], ["Poll 0"]
+        ]
+
+    def test_pages_follow_relevance(self, client, db_session):
+        """Test that a ranked search can be paged through without repeating or skipping sessions."""
+        creator = create_test_user(db_session)
+        create_test_voting_session(db_session, creator.id, "Budget", "Budget budget")
+        for i in range(4):
+            create_test_voting_session(db_session, creator.id, f"Poll {i}", "About the budget")
+
+        pages = all_pages(client, f"{SEARCH_URL}/my-polls", {"user_id": creator.id, "q": "budget", "limit": 2})
+        assert pages == [["Budget", "Poll 0"], ["Poll 1", "Poll 2"], ["Poll 3"]]
+
+    def test_bad_cursor_and_order_rejected(self, client, db_session):
+        """Test that malformed cursors, cursors of another sort order and unknown orders are refused."""
+        creator = create_test_user(db_session)
+        for i in range(2):
+            create_test_voting_session(db_session, creator.id, f"Poll {i}")
+        params = {"user_id": creator.id, "limit": 1}
+        cursor = client.get(f"{SEARCH_URL}/my-polls", params=params).json()["next_cursor"]
+
+        for bad in ({"cursor": "not-a-cursor"}, {"cursor": cursor, "order_by": "title"}, {"order_by": "creator"}):
+            response = client.get(f"{SEARCH_URL}/my-polls", params={**params, **bad})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get(f"{SEARCH_URL}/my-polls", params={**params, "limit": 0}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    # ----------------------
+    # Facet Tests
+    # ----------------------
+    def test_facets_count_every_match(self, client, db_session):
+        """Test that facets count all sessions matching the filters in one statement, not only the page."""
+        creator = create_test_user(db_session, username="creator", email="creator@example.com")
+        voter = create_test_user(db_session, username="voter", email="voter@example.com")
+        other = create_test_user(db_session, username="other", email="other@example.com")
+        sessions = [
+            create_test_voting_session(db_session, creator.id, "Poll 1", time_created=datetime(2024, 1, 5)),
+            create_test_voting_session(db_session, creator.id, "Poll 2", time_created=datetime(2024, 1, 6)),
+            create_test_voting_session(db_session, other.id, "Poll 3", time_created=datetime(2024, 2, 1)),
+            create_test_voting_session(db_session, other.id, "Survey", time_created=datetime(2024, 2, 1)),
+        ]
+        group = UserGroup(name="Team", creator_id=creator.id)
+        db_session.add(group)
+        db_session.commit()
+        db_session.add_all([Whitelist(user_id=voter.id, session_id=session.id) for session in sessions])
+        db_session.add_all([GroupWhitelist(group_id=group.id, session_id=session.id) for session in sessions[:2]])
+        db_session.commit()
+        voter_id, creator_id, other_id, group_id = voter.id, creator.id, other.id, group.id
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db_session.bind, "before_cursor_execute", record)
+        response = client.get(
+            f"{SEARCH_URL}/whitelisted", params={"user_id": voter_id, "q": "poll", "limit": 1, "facets": True}
+        )
+        event.remove(db_session.bind, "before_cursor_execute", record)
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert len(body["items"]) == 1
+        assert len(statements) == 2
+        assert body["facets"] == {
+            "is_published": [{"value": "true", "label": None, "count": 3}],
+            "creator": [
+                {"value": str(creator_id), "label": "creator", "count": 2},
+                {"value": str(other_id), "label": "other", "count": 1},
+            ],
+            "month": [{"value": "2024-01", "label": None, "count": 2}, {"value": "2024-02", "label": None, "count": 1}],
+            "group": [{"value": str(group_id), "label": "Team", "count": 2}],
+        }
+        assert client.get(f"{SEARCH_URL}/whitelisted", params={"user_id": voter_id}).json()["facets"] is None
+
+    def test_facets_are_cached_per_user_and_filters(self, client, db_session):
+        """Test that facet counts are reused for other pages of the same search and recomputed for other filters."""
+        creator = create_test_user(db_session)
+        for i in range(3):
+            create_test_voting_session(db_session, creator.id, f"Poll {i}", is_published=False)
+        params = {"user_id": creator.id, "facets": True, "limit": 2}
+        first = client.get(f"{SEARCH_URL}/my-polls", params=params).json()
+
+        create_test_voting_session(db_session, creator.id, "Poll 3", is_published=False)
+        cached = client.get(f"{SEARCH_URL}/my-polls", params={**params, "cursor": first["next_cursor"]}).json()
+        assert titles_of(cached) == ["Poll 2", "Poll 3"]
+        assert cached["facets"] == first["facets"]
+        assert cached["facets"]["is_published"] == [{"value": "false", "label": None, "count": 3}]
+
+        fresh = client.get(f"{SEARCH_URL}/my-polls", params={**params, "is_published": False}).json()
+        assert fresh["facets"]["is_published"] == [{"value": "false", "label": None, "count": 4}]
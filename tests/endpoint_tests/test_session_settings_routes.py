@@ -4,6 +4,7 @@ from app.models.voting_session import VotingSession
 from app.models.session_settings import SessionSettings
 from app.models.user import User
 from app.schemas.session_settings import SessionSettingsResponse, SessionSettingsCreate, SessionSettingsUpdate
+from app.services.metrics import registry
 
 # ------------------------------------------------------------------------------
 # Test Data
@@ -172,3 +173,77 @@ class TestSessionSettingsRoutes:
         response = client.delete("/api/session-settings/settings/9999")
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "session setting not found" in response.json()["detail"].lower()
+
+    def test_create_session_setting_invalid_value(self, client, db_session):
+        voting_session = create_test_voting_session(db_session)
+        response = client.post(
+            f"/api/session-settings/{voting_session.id}/settings/",
+            json={"setting_name": "max_votes", "setting_value": "many"}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "invalid value for max_votes" in response.json()["detail"].lower()
+
+    def test_create_session_setting_duplicate(self, client, db_session):
+        voting_session = create_test_voting_session(db_session)
+        create_test_session_setting(db_session, voting_session.id)
+        response = client.post(
+            f"/api/session-settings/{voting_session.id}/settings/",
+            json=TEST_SETTING_UPDATE
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "setting already exists" in response.json()["detail"].lower()
+
+    # Bulk Upsert and Typed Config Tests
+    def test_upsert_session_settings(self, client, db_session):
+        voting_session = create_test_voting_session(db_session)
+        create_test_session_setting(db_session, voting_session.id)
+        create_test_session_setting(db_session, voting_session.id, {"setting_name": "anonymous", "setting_value": "true"})
+
+        response = client.put(
+            f"/api/session-settings/{voting_session.id}/settings/",
+            json={"max_votes": 3, "max_selections": 2, "anonymous": None}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["max_votes"] == 3
+        assert data["max_selections"] == 2
+        assert data["anonymous"] is False
+        assert data["settings_version"] == 1
+
+        # One row per setting: max_votes updated in place, max_selections added, anonymous removed.
+        rows = db_session.query(SessionSettings).filter(SessionSettings.session_id == voting_session.id).all()
+        assert {row.setting_name: row.setting_value for row in rows} == {"max_votes": "3", "max_selections": "2"}
+
+    def test_upsert_session_settings_rejects_unknown_and_invalid(self, client, db_session):
+        voting_session = create_test_voting_session(db_session)
+        url = f"/api/session-settings/{voting_session.id}/settings/"
+        assert client.put(url, json={"max_votes": 0}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert client.put(url, json={"colour": "red"}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_upsert_session_settings_session_not_found(self, client):
+        response = client.put("/api/session-settings/9999/settings/", json={"max_votes": 3})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_session_config_is_cached_per_version(self, client, db_session):
+        voting_session = create_test_voting_session(db_session)
+        url = f"/api/session-settings/{voting_session.id}/config"
+        hits = registry.counter("session_config_cache_total", result="hit")
+
+        assert client.get(url).json()["max_votes"] is None
+        before = hits.value
+        assert client.get(url).json()["max_votes"] is None
+        assert hits.value == before + 1
+
+        # Every write path bumps the version, so the next read compiles the new settings.
+        response = client.post(f"/api/session-settings/{voting_session.id}/settings/", json=TEST_SETTING_DATA)
+        assert client.get(url).json()["max_votes"] == 5
+        client.put(f"/api/session-settings/settings/{response.json()['id']}", json=TEST_SETTING_UPDATE)
+        assert client.get(url).json()["max_votes"] == 10
+        client.delete(f"/api/session-settings/settings/{response.json()['id']}")
+        data = client.get(url).json()
+        assert data["max_votes"] is None
+        assert data["settings_version"] == 3
+
+    def test_session_config_not_found(self, client):
+        response = client.get("/api/session-settings/9999/config")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -2,7 +2,17 @@
 import pytest
 from fastapi import status
 from app.models.user import User
+from app.models.feedback import Feedback
+from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
+from app.models.whitelist import Whitelist
+from app.services.session_lifecycle import close_session
+from datetime import datetime, timedelta
 from app.schemas.user_schema import UserOut, UserBase, UserCreate, LoginRequest
+from app.services.purger import Purger
+from sqlalchemy.orm import sessionmaker
 from passlib.hash import bcrypt
 # Test data for creating a user
 TEST_USER_DATA = {
@@ -82,11 +92,86 @@ class TestUserRoutes:
         user_in_db = db_session.query(User).filter(User.id == user.id).first()
         assert user_in_db is None
 
+    def test_delete_user_keeps_feedback(self, client, db_session):
+        user = create_test_user(db_session, username="leaving", email="leaving@example.com")
+        feedback = Feedback(user_id=user.id, title="Bye", description="Thanks")
+        db_session.add(feedback)
+        db_session.commit()
+        user_id, feedback_id = user.id, feedback.id
+        db_session.expunge_all()
+
+        response = client.delete(f"/api/users/{user_id}")
+        assert response.status_code == status.HTTP_200_OK
+        Purger(sessionmaker(bind=db_session.bind)).drain()
+        # Feedback outlives its author, the database clears the reference.
+        feedback = db_session.query(Feedback).filter(Feedback.id == feedback_id).first()
+        assert feedback is not None
+        assert feedback.user_id is None
+
+    def test_delete_user_keeps_the_tally_through_close(self, client, db_session):
+        creator = create_test_user(db_session, username="pollster", email="pollster@example.com")
+        voter = create_test_user(db_session, username="voter", email="voter@example.com")
+        session = VotingSession(title="Poll", creator_id=creator.id, close_at=datetime.utcnow() - timedelta(minutes=1))
+        db_session.add(session)
+        db_session.commit()
+        question = Question(session_id=session.id, type="multiple_choice", title="Question")
+        db_session.add(question)
+        db_session.commit()
+        candidate = Candidate(question_id=question.id, name="Candidate")
+        db_session.add(candidate)
+        db_session.commit()
+        for user in (creator, voter):
+            db_session.add_all([
+                Vote(user_id=user.id, candidate_id=candidate.id, question_id=question.id, session_id=session.id),
+                Whitelist(user_id=user.id, session_id=session.id),
+            ])
+        db_session.commit()
+        creator_id, voter_id, session_id, question_id, candidate_id = creator.id, voter.id, session.id, question.id, candidate.id
+        db_session.expunge_all()
+
+        response = client.delete(f"/api/users/{voter_id}")
+        assert response.status_code == status.HTTP_200_OK
+        # The voter is gone and so is their access, their votes count until the purger removes them.
+        assert client.get(f"/api/votes/user/{voter_id}").status_code == status.HTTP_404_NOT_FOUND
+        assert [entry["user_id"] for entry in client.get("/api/whitelist/").json()] == [creator_id]
+        assert len(client.get(f"/api/votes/candidate/{candidate_id}").json()) == 2
+        live = client.get(f"/api/votes/session/{session_id}/tally").json()
+        assert live == [{"question_id": question_id, "candidate_id": candidate_id, "votes": 2}]
+
+        # The frozen results hold the same counts as the live tally did.
+        assert close_session(db_session, session_id, datetime.utcnow(), grace=0)
+        assert client.get(f"/api/votes/session/{session_id}/tally").json() == live
+
     def test_delete_user_not_found(self, client):
         response = client.delete("/api/users/9999")
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "user not found" in response.json()["detail"].lower()
 
+    # GET /api/users/search - fuzzy typeahead over usernames and emails
+    def test_search_users_with_typo(self, client, db_session):
+        create_test_user(db_session, username="jonathan.smith", email="jsmith@example.com")
+        create_test_user(db_session, username="maria.kowalska", email="maria@example.com")
+        response = client.get("/api/users/search", params={"q": "jonatan"})
+        assert response.status_code == status.HTTP_200_OK
+        assert [u["username"] for u in response.json()] == ["jonathan.smith"]
+
+    def test_search_users_follows_create_and_delete(self, client, db_session, monkeypatch):
+        from app.services.user_index import user_index
+        #Only the route hooks may update the index during this test
+        monkeypatch.setattr(user_index, "refresh_interval", 3600)
+        create_test_user(db_session, username="someone", email="someone@example.com")
+        assert client.get("/api/users/search", params={"q": "kowalsk"}).json() == []
+
+        user_id = client.post("/api/users/", json={"username": "kowalski", "email": "k@example.com", "password": "secret"}).json()["id"]
+        assert [u["id"] for u in client.get("/api/users/search", params={"q": "kowalsk"}).json()] == [user_id]
+
+        assert client.delete(f"/api/users/{user_id}").status_code == status.HTTP_200_OK
+        assert client.get("/api/users/search", params={"q": "kowalsk"}).json() == []
+
+    def test_search_users_query_too_short(self, client):
+        response = client.get("/api/users/search", params={"q": "j"})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
     # GET /api/users/username/{user_name} - get user by username
     def test_get_user_by_username_success(self, client, db_session):
         user = create_test_user(db_session, username="uniqueuser", email="unique@example.com")
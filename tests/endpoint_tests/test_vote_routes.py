@@ -1,11 +1,17 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi import status
 from app.models.vote import Vote
 from app.models.user import User
 from app.models.candidate import Candidate
 from app.models.question import Question
 from app.models.voting_session import VotingSession
+from app.models.whitelist import Whitelist
+from app.models.group_whitelist import GroupWhitelist
+from app.models.user_group import UserGroup, GroupMembership
+from app.models.session_settings import SessionSettings
+from app.schemas.vote import VoteResponse
+from app.services.session_lifecycle import close_session
 # Import passlib for hashing passwords
 from passlib.hash import bcrypt
 
@@ -91,6 +97,13 @@ def create_test_vote(db_session, user_id, candidate_id):
     db_session.refresh(vote)
     return vote
 
+def whitelist_user(db_session, user_id, session_id):
+    """
+    Lets the user vote in the session.
+    """
+    db_session.add(Whitelist(user_id=user_id, session_id=session_id))
+    db_session.commit()
+
 # ------------------------------------------------------------------------------
 # Test Class for Vote Routes
 # ------------------------------------------------------------------------------
@@ -104,6 +117,7 @@ class TestVoteRoutes:
         voting_session = create_test_voting_session(db_session)
         question = create_test_question(db_session, session_id=voting_session.id)
         candidate = create_test_candidate(db_session, question_id=question.id)
+        whitelist_user(db_session, user.id, voting_session.id)
         payload = {"user_id": user.id, "candidate_id": candidate.id}
         
         response = client.post("/api/votes/", json=payload)
@@ -111,6 +125,9 @@ class TestVoteRoutes:
         data = response.json()
         assert data["user_id"] == user.id
         assert data["candidate_id"] == candidate.id
+        # The vote carries its question and session for single-table session reads.
+        vote = db_session.query(Vote).filter(Vote.id == data["id"]).first()
+        assert (vote.question_id, vote.session_id) == (question.id, voting_session.id)
 
     def test_cast_vote_user_not_found(self, client, db_session):
         """Test casting a vote with a non-existent user returns 404."""
@@ -138,6 +155,7 @@ class TestVoteRoutes:
         voting_session = create_test_voting_session(db_session)
         question = create_test_question(db_session, session_id=voting_session.id)
         candidate = create_test_candidate(db_session, question_id=question.id)
+        whitelist_user(db_session, user.id, voting_session.id)
         payload = {"user_id": user.id, "candidate_id": candidate.id}
         
         # First vote should succeed.
@@ -149,6 +167,195 @@ class TestVoteRoutes:
         assert response2.status_code == 400
         assert "already voted" in response2.json()["detail"].lower()
 
+    def test_cast_vote_unpublished_session(self, client, db_session):
+        """Test that votes are refused while the session is not published."""
+        user = create_test_user(db_session, username="draft", email="draft@example.com")
+        voting_session = create_test_voting_session(db_session, is_published=False)
+        whitelist_user(db_session, user.id, voting_session.id)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=question.id)
+
+        response = client.post("/api/votes/", json={"user_id": user.id, "candidate_id": candidate.id})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "not published" in response.json()["detail"].lower()
+
+    def test_cast_vote_not_whitelisted(self, client, db_session):
+        """Test that a user missing from the whitelist cannot vote, and that a group whitelist lets them in."""
+        user = create_test_user(db_session, username="outsider", email="outsider@example.com")
+        voting_session = create_test_voting_session(db_session)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=question.id)
+        payload = {"user_id": user.id, "candidate_id": candidate.id}
+
+        response = client.post("/api/votes/", json=payload)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "not whitelisted" in response.json()["detail"].lower()
+
+        group = UserGroup(name="Voters", creator_id=voting_session.creator_id)
+        db_session.add(group)
+        db_session.commit()
+        db_session.add_all([GroupMembership(group_id=group.id, user_id=user.id), GroupWhitelist(group_id=group.id, session_id=voting_session.id)])
+        db_session.commit()
+        assert client.post("/api/votes/", json=payload).status_code == status.HTTP_200_OK
+
+    def test_cast_vote_selection_limits(self, client, db_session):
+        """Test that max_selections and single-choice questions cap the votes per question."""
+        user = create_test_user(db_session, username="picker", email="picker@example.com")
+        voting_session = create_test_voting_session(db_session)
+        whitelist_user(db_session, user.id, voting_session.id)
+        db_session.add(SessionSettings(session_id=voting_session.id, setting_name="max_selections", setting_value="2"))
+        db_session.commit()
+        multiple = create_test_question(db_session, session_id=voting_session.id)
+        single = create_test_question(db_session, session_id=voting_session.id, type="true_false")
+        picks = [create_test_candidate(db_session, question_id=multiple.id, name=f"Pick {i}") for i in range(3)]
+        answers = [create_test_candidate(db_session, question_id=single.id, name=name) for name in ("True", "False")]
+
+        statuses = [client.post("/api/votes/", json={"user_id": user.id, "candidate_id": c.id}).status_code for c in picks + answers]
+        assert statuses == [200, 200, 400, 200, 400]
+        response = client.post("/api/votes/", json={"user_id": user.id, "candidate_id": answers[1].id})
+        assert "no selections left" in response.json()["detail"].lower()
+        assert db_session.query(Vote).filter(Vote.user_id == user.id).count() == 3
+
+    def test_cast_vote_refusals_by_the_insert(self, client, db_session, monkeypatch):
+        """Test that votes refused by the insert itself, as under a concurrent request, report which limit or index refused them."""
+        import app.routes.vote_routes as vote_routes
+        #Let every vote through the checks made before the insert, as if a concurrent vote had not committed yet
+        monkeypatch.setattr(vote_routes, "vote_rejection", lambda *args: None)
+        #A refused insert writes nothing, the route's rollback would only roll back the test's own transaction
+        monkeypatch.setattr(db_session, "rollback", lambda: None)
+        user = create_test_user(db_session, username="racer", email="racer@example.com")
+        voting_session = create_test_voting_session(db_session)
+        whitelist_user(db_session, user.id, voting_session.id)
+        db_session.add(SessionSettings(session_id=voting_session.id, setting_name="max_votes", setting_value="2"))
+        db_session.commit()
+        single = create_test_question(db_session, session_id=voting_session.id, type="single_choice")
+        multiple = create_test_question(db_session, session_id=voting_session.id)
+        answers = [create_test_candidate(db_session, question_id=single.id, name=name) for name in ("Yes", "No")]
+        picks = [create_test_candidate(db_session, question_id=multiple.id, name=f"Pick {i}") for i in range(2)]
+        for candidate in (answers[0], picks[0]):
+            assert client.post("/api/votes/", json={"user_id": user.id, "candidate_id": candidate.id}).status_code == status.HTTP_200_OK
+
+        for candidate, reason in ((picks[0], "already voted"), (answers[1], "no selections left"), (picks[1], "vote limit reached")):
+            response = client.post("/api/votes/", json={"user_id": user.id, "candidate_id": candidate.id})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert reason in response.json()["detail"].lower()
+
+    def test_cast_vote_after_unpublish(self, client, db_session):
+        """Test that unpublishing a session refuses votes at once although its candidate is cached."""
+        voting_session = create_test_voting_session(db_session)
+        voters = [create_test_user(db_session, username=f"cached{i}", email=f"cached{i}@example.com") for i in range(2)]
+        for voter in voters:
+            whitelist_user(db_session, voter.id, voting_session.id)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=question.id)
+        assert client.post("/api/votes/", json={"user_id": voters[0].id, "candidate_id": candidate.id}).status_code == status.HTTP_200_OK
+
+        response = client.put(f"/api/voting-sessions/{voting_session.id}", json={"is_published": False})
+        assert response.status_code == status.HTTP_200_OK
+        response = client.post("/api/votes/", json={"user_id": voters[1].id, "candidate_id": candidate.id})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "not published" in response.json()["detail"].lower()
+
+    def test_cast_vote_before_open(self, client, db_session):
+        """Test that votes are refused until the session opens."""
+        user = create_test_user(db_session, username="early", email="early@example.com")
+        voting_session = create_test_voting_session(db_session)
+        voting_session.open_at = datetime.utcnow() + timedelta(hours=1)
+        db_session.commit()
+        question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=question.id)
+
+        response = client.post("/api/votes/", json={"user_id": user.id, "candidate_id": candidate.id})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "not open yet" in response.json()["detail"].lower()
+
+    def test_cast_vote_after_close(self, client, db_session):
+        """Test that votes are refused once close_at has passed, even before the scheduler closes the session."""
+        user = create_test_user(db_session, username="late", email="late@example.com")
+        voting_session = create_test_voting_session(db_session)
+        voting_session.close_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+        question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=question.id)
+
+        response = client.post("/api/votes/", json={"user_id": user.id, "candidate_id": candidate.id})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert "closed" in response.json()["detail"].lower()
+
+    # ----------------------
+    # Ballot Tests
+    # ----------------------
+    def test_update_ballot_touches_only_changed_votes(self, client, db_session):
+        """Test that a ballot deletes dropped selections, adds new ones and keeps the rest as they were."""
+        user = create_test_user(db_session, username="changer", email="changer@example.com")
+        voting_session = create_test_voting_session(db_session)
+        whitelist_user(db_session, user.id, voting_session.id)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        a, b, c = [create_test_candidate(db_session, question_id=question.id, name=name) for name in "ABC"]
+        kept = create_test_vote(db_session, user.id, b.id)
+        create_test_vote(db_session, user.id, a.id)
+        kept_id = kept.id
+
+        response = client.put(f"/api/votes/ballot/{voting_session.id}", json={"user_id": user.id, "candidate_ids": [b.id, c.id]})
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["added"], data["removed"]) == (1, 1)
+        assert sorted(vote["candidate_id"] for vote in data["votes"]) == [b.id, c.id]
+        assert kept_id in [vote["id"] for vote in data["votes"]]
+
+    def test_update_ballot_changes_single_choice_answer(self, client, db_session):
+        """Test that a true/false answer can be swapped in one request for one question only."""
+        user = create_test_user(db_session, username="swapper", email="swapper@example.com")
+        voting_session = create_test_voting_session(db_session)
+        whitelist_user(db_session, user.id, voting_session.id)
+        single = create_test_question(db_session, session_id=voting_session.id, type="true_false")
+        other = create_test_question(db_session, session_id=voting_session.id)
+        yes, no = [create_test_candidate(db_session, question_id=single.id, name=name) for name in ("True", "False")]
+        untouched = create_test_candidate(db_session, question_id=other.id)
+        create_test_vote(db_session, user.id, yes.id)
+        create_test_vote(db_session, user.id, untouched.id)
+
+        payload = {"user_id": user.id, "candidate_ids": [no.id], "question_id": single.id}
+        response = client.put(f"/api/votes/ballot/{voting_session.id}", json=payload)
+        assert response.status_code == status.HTTP_200_OK
+        assert [vote["candidate_id"] for vote in response.json()["votes"]] == [no.id]
+        assert sorted(v.candidate_id for v in db_session.query(Vote).filter(Vote.user_id == user.id)) == sorted([no.id, untouched.id])
+
+        #Both answers at once break the single-choice rule
+        payload["candidate_ids"] = [yes.id, no.id]
+        response = client.put(f"/api/votes/ballot/{voting_session.id}", json=payload)
+        assert response.status_code == 400
+        assert "too many selections" in response.json()["detail"].lower()
+
+    def test_update_ballot_rejects_foreign_candidates(self, client, db_session):
+        """Test that candidates of another session or question are refused."""
+        user = create_test_user(db_session, username="stranger", email="stranger@example.com")
+        voting_session = create_test_voting_session(db_session)
+        whitelist_user(db_session, user.id, voting_session.id)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        other_question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=other_question.id)
+
+        for payload in (
+            {"user_id": user.id, "candidate_ids": [9999]},
+            {"user_id": user.id, "candidate_ids": [candidate.id], "question_id": question.id},
+        ):
+            response = client.put(f"/api/votes/ballot/{voting_session.id}", json=payload)
+            assert response.status_code == 400
+            assert "not part of this ballot" in response.json()["detail"].lower()
+
+    def test_update_ballot_closed_session(self, client, db_session):
+        """Test that a ballot cannot change votes once the session has closed."""
+        user = create_test_user(db_session, username="toolate", email="toolate@example.com")
+        voting_session = create_test_voting_session(db_session)
+        voting_session.close_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+        whitelist_user(db_session, user.id, voting_session.id)
+
+        response = client.put(f"/api/votes/ballot/{voting_session.id}", json={"user_id": user.id, "candidate_ids": []})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert client.put("/api/votes/ballot/9999", json={"user_id": user.id, "candidate_ids": []}).status_code == status.HTTP_404_NOT_FOUND
+
     # ----------------------
     # Get Votes by Candidate
     # ----------------------
@@ -201,6 +408,23 @@ class TestVoteRoutes:
         returned_ids = [v["id"] for v in data]
         assert vote.id in returned_ids
 
+    def test_get_votes_by_session_ignores_other_sessions(self, client, db_session):
+        """Test that session votes are matched by session id, not by question id."""
+        user = create_test_user(db_session, username="voter9", email="voter9@example.com")
+        empty_session = create_test_voting_session(db_session, title="Empty Session")
+        voting_session = create_test_voting_session(db_session, creator=user)
+        # Offset the question ids so no question shares an id with a session.
+        create_test_question(db_session, session_id=voting_session.id, title="Question 1")
+        question = create_test_question(db_session, session_id=voting_session.id, title="Question 2")
+        candidate = create_test_candidate(db_session, question_id=question.id)
+        vote = create_test_vote(db_session, user_id=user.id, candidate_id=candidate.id)
+        assert (vote.question_id, vote.session_id) == (question.id, voting_session.id)
+
+        response = client.get(f"/api/votes/session/{voting_session.id}")
+        assert [v["id"] for v in response.json()] == [vote.id]
+        response = client.get(f"/api/votes/session/{empty_session.id}")
+        assert response.json() == []
+
     # ----------------------
     # Get Session Results
     # ----------------------
@@ -224,6 +448,20 @@ class TestVoteRoutes:
         returned_ids = [v["id"] for v in data]
         assert vote.id in returned_ids
 
+    def test_get_session_results_use_the_response_model(self, client, db_session):
+        """
+        Test that the results route serializes votes through VoteResponse, as the async route does.
+        """
+        user = create_test_user(db_session, username="voter12", email="voter12@example.com")
+        voting_session = create_test_voting_session(db_session)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=question.id)
+        create_test_vote(db_session, user_id=user.id, candidate_id=candidate.id)
+
+        response = client.get(f"/api/votes/session/{voting_session.id}/results")
+        assert response.status_code == status.HTTP_200_OK
+        assert list(response.json()[0]) == list(VoteResponse.model_fields)
+
     def test_get_session_results_no_questions(self, client, db_session):
         """
         Test that if no questions exist in a session, the endpoint returns 404.
@@ -233,6 +471,57 @@ class TestVoteRoutes:
         assert response.status_code == 404
         assert "no questions found" in response.json()["detail"].lower()
 
+    def test_get_session_results_no_votes(self, client, db_session):
+        """Test that a session with candidates but no votes returns an empty list."""
+        voting_session = create_test_voting_session(db_session)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        create_test_candidate(db_session, question_id=question.id)
+
+        response = client.get(f"/api/votes/session/{voting_session.id}/results")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+
+    def test_get_session_tally(self, client, db_session):
+        """Test that the tally counts votes per candidate."""
+        voting_session = create_test_voting_session(db_session)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        first = create_test_candidate(db_session, question_id=question.id, name="Candidate 1")
+        second = create_test_candidate(db_session, question_id=question.id, name="Candidate 2")
+        for i in range(3):
+            user = create_test_user(db_session, username=f"tally{i}", email=f"tally{i}@example.com")
+            create_test_vote(db_session, user_id=user.id, candidate_id=first.id if i < 2 else second.id)
+
+        response = client.get(f"/api/votes/session/{voting_session.id}/tally")
+        assert response.status_code == status.HTTP_200_OK
+        counts = {row["candidate_id"]: row["votes"] for row in response.json()}
+        assert counts == {first.id: 2, second.id: 1}
+
+    def test_get_closed_session_tally(self, client, db_session):
+        """Test that a closed session's tally comes from the frozen results and its votes can no longer change."""
+        voting_session = create_test_voting_session(db_session)
+        question = create_test_question(db_session, session_id=voting_session.id)
+        candidate = create_test_candidate(db_session, question_id=question.id)
+        user = create_test_user(db_session, username="frozen", email="frozen@example.com")
+        vote = create_test_vote(db_session, user_id=user.id, candidate_id=candidate.id)
+        voting_session.close_at = datetime.utcnow() - timedelta(minutes=1)
+        db_session.commit()
+        assert close_session(db_session, voting_session.id, datetime.utcnow(), grace=0)
+
+        response = client.delete(f"/api/votes/{vote.id}")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        # Votes removed behind the API's back do not change the frozen tally.
+        db_session.query(Vote).delete()
+        db_session.commit()
+        response = client.get(f"/api/votes/session/{voting_session.id}/tally")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [{"question_id": question.id, "candidate_id": candidate.id, "votes": 1}]
+
+    def test_get_session_tally_no_questions(self, client, db_session):
+        """Test that the tally of a session without questions returns 404."""
+        voting_session = create_test_voting_session(db_session)
+        response = client.get(f"/api/votes/session/{voting_session.id}/tally")
+        assert response.status_code == 404
+
     # ----------------------
     # Delete Vote
     # ----------------------
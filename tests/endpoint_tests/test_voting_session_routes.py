@@ -3,6 +3,12 @@ from fastapi import status
 from datetime import datetime
 from app.models.user import User
 from app.models.voting_session import VotingSession
+from app.models.question import Question
+from app.models.candidate import Candidate
+from app.models.vote import Vote
+from app.models.whitelist import Whitelist
+from app.services.purger import Purger
+from sqlalchemy.orm import sessionmaker
 from app.schemas.voting_session import VotingSessionCreate, VotingSessionUpdate, VotingSessionResponse
 
 TEST_SESSION_DATA = {
@@ -123,6 +129,21 @@ class TestVotingSessionRoutes:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "voting session not found" in response.json()["detail"].lower()
 
+    def test_get_voting_session_by_id_deleted(self, client, db_session):
+        """
+        Test that a deleted voting session returns 404, also after it was cached.
+        """
+        creator = create_test_user(db_session, username="creator13", email="creator13@example.com")
+        session = create_test_voting_session(db_session, creator.id)
+        session_id = session.id
+        db_session.expunge_all()
+        assert client.get(f"/api/voting-sessions/{session_id}").status_code == status.HTTP_200_OK
+
+        assert client.delete(f"/api/voting-sessions/{session_id}").status_code == status.HTTP_200_OK
+        response = client.get(f"/api/voting-sessions/{session_id}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "voting session not found" in response.json()["detail"].lower()
+
     # Delete Voting Session Tests
     def test_delete_voting_session_success(self, client, db_session):
         """
@@ -138,6 +159,115 @@ class TestVotingSessionRoutes:
         deleted = db_session.query(VotingSession).filter(VotingSession.id == session.id).first()
         assert deleted is None
 
+    def test_delete_voting_session_cascades(self, client, db_session):
+        """
+        Test that deleting a session hides it at once and the purger removes its questions, candidates, votes and whitelist.
+        """
+        creator = create_test_user(db_session, username="creator9", email="creator9@example.com")
+        session = create_test_voting_session(db_session, creator.id)
+        question = Question(session_id=session.id, type="multiple_choice", title="Question")
+        db_session.add(question)
+        db_session.commit()
+        candidate = Candidate(question_id=question.id, name="Candidate")
+        db_session.add(candidate)
+        db_session.commit()
+        db_session.add_all([Vote(user_id=creator.id, candidate_id=candidate.id), Whitelist(user_id=creator.id, session_id=session.id)])
+        db_session.commit()
+        session_id, user_id, candidate_id = session.id, creator.id, candidate.id
+        # Start from an empty identity map so the ORM has no children to delete itself.
+        db_session.expunge_all()
+
+        response = client.delete(f"/api/voting-sessions/{session_id}")
+        assert response.status_code == status.HTTP_200_OK
+        assert client.get("/api/voting-sessions/").json() == []
+        assert client.delete(f"/api/voting-sessions/{session_id}").status_code == status.HTTP_404_NOT_FOUND
+        # Nobody can vote in the deleted session while its candidates wait for the purger.
+        response = client.post("/api/votes/", json={"user_id": user_id, "candidate_id": candidate_id})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        Purger(sessionmaker(bind=db_session.bind)).drain()
+        for model in (Question, Candidate, Vote, Whitelist):
+            assert db_session.query(model).count() == 0
+        assert db_session.query(VotingSession).execution_options(include_deleted=True).count() == 0
+
+    def test_delete_voting_session_hides_its_rows(self, client, db_session):
+        """
+        Test that once a session is deleted no read route shows its questions, candidates, votes or whitelist, even
+        after the responses and rows were cached.
+        """
+        creator = create_test_user(db_session, username="creator12", email="creator12@example.com")
+        session = create_test_voting_session(db_session, creator.id)
+        kept = create_test_voting_session(db_session, creator.id)
+        question = Question(session_id=session.id, type="multiple_choice", title="Question")
+        db_session.add(question)
+        db_session.commit()
+        candidate = Candidate(question_id=question.id, name="Candidate")
+        db_session.add(candidate)
+        db_session.commit()
+        db_session.add_all([
+            Vote(user_id=creator.id, candidate_id=candidate.id, question_id=question.id, session_id=session.id),
+            Whitelist(user_id=creator.id, session_id=session.id),
+            Whitelist(user_id=creator.id, session_id=kept.id),
+        ])
+        db_session.commit()
+        session_id, question_id, candidate_id, kept_id, user_id = session.id, question.id, candidate.id, kept.id, creator.id
+        db_session.expunge_all()
+
+        reads = [
+            f"/api/questions/{session_id}/questions/",
+            f"/api/questions/questions/{question_id}",
+            f"/api/candidates/{question_id}/candidates/",
+            f"/api/candidates/candidates/{candidate_id}",
+            f"/api/candidates/session/{session_id}",
+            f"/api/votes/candidate/{candidate_id}",
+            f"/api/votes/session/{session_id}",
+            f"/api/votes/session/{session_id}/results",
+            f"/api/votes/session/{session_id}/tally",
+        ]
+        # Fill the caches first, the delete has to drop them.
+        for url in reads:
+            assert client.get(url).status_code == status.HTTP_200_OK
+        assert len(client.get(f"/api/votes/user/{user_id}").json()) == 1
+        assert len(client.get("/api/whitelist/").json()) == 2
+
+        assert client.delete(f"/api/voting-sessions/{session_id}").status_code == status.HTTP_200_OK
+        for url in reads:
+            response = client.get(url)
+            assert response.status_code == status.HTTP_404_NOT_FOUND or response.json() == [], url
+        assert client.get(f"/api/votes/user/{user_id}").json() == []
+        assert [entry["session_id"] for entry in client.get("/api/whitelist/").json()] == [kept_id]
+
+    def test_voting_window_is_validated(self, client, db_session):
+        """
+        Test that close_at must come after open_at, on create and on update.
+        """
+        creator = create_test_user(db_session, username="creator10", email="creator10@example.com")
+        payload = {
+            "title": "Scheduled", "creator_id": creator.id,
+            "open_at": "2030-01-02T00:00:00", "close_at": "2030-01-01T00:00:00",
+        }
+        response = client.post("/api/voting-sessions/", json=payload)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        session = create_test_voting_session(db_session, creator.id)
+        response = client.put(f"/api/voting-sessions/{session.id}", json={"open_at": "2030-01-02T00:00:00", "close_at": "2030-01-01T00:00:00"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = client.put(f"/api/voting-sessions/{session.id}", json={"close_at": "2030-01-01T02:00:00+02:00"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["close_at"] == "2030-01-01T00:00:00"
+
+    def test_closed_session_cannot_be_rescheduled(self, client, db_session):
+        """
+        Test that a session whose results are frozen keeps its close time.
+        """
+        creator = create_test_user(db_session, username="creator11", email="creator11@example.com")
+        session = create_test_voting_session(db_session, creator.id)
+        session.closed_at = datetime(2030, 1, 1)
+        db_session.commit()
+        response = client.put(f"/api/voting-sessions/{session.id}", json={"close_at": "2031-01-01T00:00:00"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "closed" in response.json()["detail"].lower()
+
     def test_delete_voting_session_not_found(self, client):
         """
         Test that deleting a non-existent voting session returns 404.
@@ -162,6 +292,36 @@ class TestVotingSessionRoutes:
         updated_session = db_session.query(VotingSession).filter(VotingSession.id == session.id).first()
         assert updated_session.is_published is True
 
+    def test_publish_is_visible_through_the_entity_cache(self, client, db_session):
+        """
+        Test that GET /api/voting-sessions/{id} serves the cached row until a commit changes it.
+        """
+        creator = create_test_user(db_session, username="creator6", email="creator6@example.com")
+        session_id = create_test_voting_session(db_session, creator.id, extra_data={"is_published": False}).id
+        #Requests share the test's session, emptying it makes the route read through the cache
+        db_session.expunge_all()
+        assert client.get(f"/api/voting-sessions/{session_id}").json()["is_published"] is False
+        db_session.expunge_all()
+        assert client.get(f"/api/voting-sessions/{session_id}").json()["is_published"] is False
+
+        assert client.patch(f"/api/voting-sessions/{session_id}/publish").status_code == status.HTTP_200_OK
+        db_session.expunge_all()
+        assert client.get(f"/api/voting-sessions/{session_id}").json()["is_published"] is True
+
+    def test_list_follows_writes_and_answers_304(self, client, db_session):
+        """
+        Test that GET /api/voting-sessions/ answers 304 to its own ETag and includes a session published after it was cached.
+        """
+        creator = create_test_user(db_session, username="creator7", email="creator7@example.com")
+        session_id = create_test_voting_session(db_session, creator.id, extra_data={"is_published": False}).id
+        first = client.get("/api/voting-sessions/")
+        assert client.get("/api/voting-sessions/", headers={"If-None-Match": first.headers["etag"]}).status_code == status.HTTP_304_NOT_MODIFIED
+
+        assert client.patch(f"/api/voting-sessions/{session_id}/publish").status_code == status.HTTP_200_OK
+        second = client.get("/api/voting-sessions/")
+        assert second.headers["etag"] != first.headers["etag"]
+        assert [s["is_published"] for s in second.json() if s["id"] == session_id] == [True]
+
     def test_publish_voting_session_not_found(self, client):
         """
         Test that publishing a non-existent session returns 404.
@@ -204,3 +364,22 @@ class TestVotingSessionRoutes:
         response = client.put("/api/voting-sessions/9999", json=update_payload)
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "voting session not found" in response.json()["detail"].lower()
+
+    # Session Access Tests
+    def test_check_session_access(self, client, db_session):
+        """
+        Test that only whitelisted users have access to a session.
+        """
+        from app.models.whitelist import Whitelist
+        creator = create_test_user(db_session, username="creator9", email="creator9@example.com")
+        outsider = create_test_user(db_session, username="outsider", email="outsider@example.com")
+        session = create_test_voting_session(db_session, creator.id)
+        db_session.add(Whitelist(user_id=creator.id, session_id=session.id))
+        db_session.commit()
+
+        response = client.get(f"/api/voting-sessions/{session.id}/access/{creator.id}")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"has_access": True}
+
+        response = client.get(f"/api/voting-sessions/{session.id}/access/{outsider.id}")
+        assert response.json() == {"has_access": False}
@@ -0,0 +1,26 @@
+from app.services.cache import TTLCache, MISSING
+
+# ------------------------------------------------------------------------------
+# Test Class for the TTL Cache
+# ------------------------------------------------------------------------------
+class TestTTLCache:
+    def test_entries_expire(self):
+        """Test that an entry is served until it is ttl seconds old, a cached None is a hit."""
+        now = [0.0]
+        cache = TTLCache("test", ttl=10, max_entries=10, clock=lambda: now[0])
+        cache.put("a", None)
+        now[0] = 9.9
+        assert cache.get("a") is None
+        now[0] = 10
+        assert cache.get("a") is MISSING
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_dropped(self):
+        """Test that a full cache drops the entry read longest ago."""
+        cache = TTLCache("test", ttl=10, max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is MISSING
+        assert (cache.get("a"), cache.get("c")) == (1, 3)
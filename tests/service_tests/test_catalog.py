@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services import catalog as catalog_module
+from app.services.catalog import Catalog, lookup_candidate, lookup_session
+from app.models.candidate import Candidate
+from app.models.question import Question
+from app.models.user import User
+from app.models.voting_session import VotingSession
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/catalog.db", pool_name="catalog_test")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{"id": 1, "username": "owner", "email": "owner@example.com", "password": "x", "type": "user"}])
+        conn.execute(insert(VotingSession.__table__), [{"id": 1, "title": "Poll", "creator_id": 1, "is_published": True}])
+        conn.execute(insert(Question.__table__), [{"id": 1, "session_id": 1, "title": "Q", "type": "multiple_choice"}])
+        conn.execute(insert(Candidate.__table__), [{"id": i, "question_id": 1, "name": f"C{i}"} for i in (1, 2)])
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+#A fresh catalog with a clock the test moves, swapped in for the module's catalog used by the lookups
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(catalog_module, "catalog", Catalog(ttl=30, clock=lambda: now[0]))
+    return now
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+# ------------------------------------------------------------------------------
+# Test Class for the Catalog
+# ------------------------------------------------------------------------------
+class TestCatalog:
+    def test_lookups_are_served_from_memory(self, engine, db, clock):
+        """Test that a candidate is read from the database once and its session comes along with it."""
+        statements = count_statements(engine)
+        location = lookup_candidate(db, 1)
+        assert (location.question_id, location.session_id, location.question_type) == (1, 1, "multiple_choice")
+        assert location.session.is_published and location.session.creator_id == 1
+
+        assert lookup_candidate(db, 1) == location
+        assert lookup_session(db, 1) == location.session
+        assert len(statements) == 1
+        #Another candidate of the same question only costs its own lookup
+        lookup_candidate(db, 2)
+        assert len(statements) == 2
+        assert catalog_module.catalog.sizes() == {"candidates": 2, "questions": 1, "sessions": 1}
+
+    def test_missing_and_deleted(self, db, clock):
+        """Test that unknown candidates and deleted sessions are not found."""
+        assert lookup_candidate(db, 99) is None
+        db.execute(update(VotingSession).where(VotingSession.id == 1).values(deleted_at=VotingSession.time_created))
+        db.commit()
+        assert lookup_session(db, 1) is None
+        assert lookup_candidate(db, 1) is None
+
+    def test_invalidation_reloads_the_session(self, db, clock):
+        """Test that a session write followed by an invalidation is seen on the next lookup."""
+        assert lookup_candidate(db, 1).session.is_published
+        db.execute(update(VotingSession).where(VotingSession.id == 1).values(is_published=False))
+        db.commit()
+        assert lookup_candidate(db, 1).session.is_published
+
+        catalog_module.catalog.invalidate_session(1)
+        assert not lookup_candidate(db, 1).session.is_published
+
+    def test_entries_expire(self, db, clock):
+        """Test that changes made through another worker show up once the entry is older than the ttl."""
+        lookup_candidate(db, 1)
+        db.execute(update(Question).where(Question.id == 1).values(type="true_false"))
+        db.commit()
+        clock[0] = 29
+        assert lookup_candidate(db, 1).question_type == "multiple_choice"
+        clock[0] = 30
+        assert lookup_candidate(db, 1).question_type == "true_false"
+
+    def test_slow_reader_cannot_undo_an_invalidation(self, db, clock):
+        """Test that a row read before an invalidation is returned but not cached."""
+        catalog = catalog_module.catalog
+        generation = catalog.generation
+        row = db.execute(catalog_module.queries.candidate_location(1)).first()
+        catalog.invalidate_session(1)
+        catalog.store_candidate(1, row, generation)
+        assert catalog.candidate(1) is None
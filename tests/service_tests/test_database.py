@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import StaticPool
+
+import app.services.database as database
+from app.services.database import create_db_engine, engine_options, InstrumentedQueuePool
+from app.services.metrics import registry
+
+# ------------------------------------------------------------------------------
+# Test Class for the Engine Factory
+# ------------------------------------------------------------------------------
+class TestEngineFactory:
+    def test_sqlite_file_options(self):
+        """Test that a SQLite file gets thread-safe connect args and a tunable pool."""
+        options = engine_options("sqlite:///./votes.db")
+        assert options["connect_args"] == {"check_same_thread": False}
+        assert issubclass(options["poolclass"], InstrumentedQueuePool)
+        assert options["pool_size"] == database.DB_POOL_SIZE
+        assert options["pool_pre_ping"] == database.DB_POOL_PRE_PING
+
+    def test_sqlite_memory_options(self):
+        """Test that an in-memory SQLite database shares a single connection."""
+        options = engine_options("sqlite:///:memory:")
+        assert options["poolclass"] is StaticPool
+        assert "pool_size" not in options
+
+    def test_postgres_options(self, monkeypatch):
+        """Test that PostgreSQL gets no SQLite arguments and an optional statement timeout."""
+        options = engine_options("postgresql://voting:secret@db/voting")
+        assert options["connect_args"] == {}
+        assert options["pool_recycle"] == database.DB_POOL_RECYCLE
+
+        monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 5000)
+        monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 2)
+        options = engine_options("postgresql+psycopg2://voting:secret@db/voting")
+        assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+        assert options["max_overflow"] == 2
+
+    def test_overrides(self, tmp_path):
+        """Test that explicit keyword arguments win over the configuration."""
+        engine = create_db_engine(f"sqlite:///{tmp_path}/votes.db", pool_size=2, max_overflow=0)
+        assert engine.pool.size() == 2
+        engine.dispose()
+
+    # ----------------------
+    # Pool Metrics
+    # ----------------------
+    def test_pool_reports_wait_and_saturation(self, tmp_path):
+        """Test that checkouts record their wait time and the pool saturation."""
+        engine = create_db_engine(f"sqlite:///{tmp_path}/votes.db", pool_name="metrics_test", pool_size=2, max_overflow=0)
+
+        first = engine.connect()
+        first.execute(text("SELECT 1"))
+        snapshot = registry.snapshot()
+        assert snapshot['db_pool_saturation{pool="metrics_test"}'] == 0.5
+        assert snapshot['db_pool_checkout_wait_seconds{pool="metrics_test"}']["count"] >= 1
+
+        second = engine.connect()
+        assert registry.snapshot()['db_pool_saturation{pool="metrics_test"}'] == 1.0
+
+        first.close()
+        second.close()
+        assert registry.snapshot()['db_pool_saturation{pool="metrics_test"}'] == 0.0
+        engine.dispose()
+
+    def test_pool_timeout_is_counted(self, tmp_path):
+        """Test that a checkout that gives up waiting is counted."""
+        engine = create_db_engine(
+            f"sqlite:///{tmp_path}/votes.db", pool_name="timeout_test",
+            pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        held = engine.connect()
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        held.close()
+        assert registry.snapshot()['db_pool_timeouts_total{pool="timeout_test"}'] == 1
+        assert registry.snapshot()['db_pool_checkout_wait_seconds{pool="timeout_test"}']["max"] >= 0.05
+        engine.dispose()
+
+    # ----------------------
+    # SQLite Profile
+    # ----------------------
+    def test_performance_profile_pragmas(self, tmp_path):
+        """Test that the performance profile is applied to every new connection."""
+        engine = create_db_engine(f"sqlite:///{tmp_path}/votes.db", sqlite_profile="performance")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA temp_store")).scalar() == 2
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == database.SQLITE_CACHE_SIZE
+        engine.dispose()
+
+    def test_default_profile_leaves_sqlite_alone(self, tmp_path):
+        """Test that the default profile keeps SQLite's rollback journal but still enforces foreign keys."""
+        engine = create_db_engine(f"sqlite:///{tmp_path}/votes.db", sqlite_profile="default")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        engine.dispose()
+
+    def test_read_only_pool_rejects_writes(self, tmp_path):
+        """Test that connections from the read pool can read but not write."""
+        url = f"sqlite:///{tmp_path}/votes.db"
+        writer = create_db_engine(url, sqlite_profile="performance")
+        reader = create_db_engine(url, pool_name="read_test", sqlite_profile="performance", read_only=True)
+        with writer.begin() as conn:
+            conn.execute(text("CREATE TABLE votes (id INTEGER PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO votes (id) VALUES (1)"))
+
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM votes")).scalar() == 1
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO votes (id) VALUES (2)"))
+        writer.dispose()
+        reader.dispose()
+
+    def test_metrics_endpoint(self, client):
+        """Test that the metrics snapshot is served over the API."""
+        registry.counter("test_requests_total").inc()
+        response = client.get("/api/metrics/")
+        assert response.status_code == 200
+        assert response.json()["test_requests_total"] >= 1
@@ -0,0 +1,149 @@
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services import entity_cache as entity_cache_module
+from app.services.entity_cache import EntityCache
+from app.services.shared_store import SharedStoreServer, SharedStoreClient
+from app.services.soft_delete import soft_delete_user
+from app.models.candidate import Candidate
+from app.models.question import Question
+from app.models.user import User, AdminUser
+from app.models.user_group import UserGroup
+from app.models.voting_session import VotingSession
+
+MODELS = [VotingSession, Question, Candidate, UserGroup, User]
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/entities.db", pool_name="entity_cache_test")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": 1, "username": "owner", "email": "owner@example.com", "password": "x", "type": "user"},
+            {"id": 2, "username": "root", "email": "root@example.com", "password": "x", "type": "admin"},
+        ])
+        conn.execute(insert(AdminUser.__table__), [{"id": 2}])
+        conn.execute(insert(VotingSession.__table__), [{"id": 1, "title": "Poll", "creator_id": 1, "is_published": True}])
+        conn.execute(insert(Question.__table__), [{"id": 1, "session_id": 1, "title": "Q", "type": "multiple_choice"}])
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(bind=engine)
+
+#A fresh cache swapped in for the module's cache that the commit listeners invalidate
+@pytest.fixture
+def cache(monkeypatch):
+    cache = EntityCache(MODELS, ttl=30)
+    monkeypatch.setattr(entity_cache_module, "entity_cache", cache)
+    return cache
+
+@pytest.fixture
+def shared_store():
+    server = SharedStoreServer(port=0)
+    server.start_in_thread()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+# ------------------------------------------------------------------------------
+# Test Class for the Entity Cache
+# ------------------------------------------------------------------------------
+class TestEntityCache:
+    def test_lookups_are_served_from_memory(self, engine, factory, cache):
+        """Test that a row is read once, later sessions get an attached copy whose relationships still load."""
+        with factory() as db:
+            session = cache.get(db, VotingSession, 1)
+            time_created = session.time_created
+        statements = count_statements(engine)
+        with factory() as db:
+            session = cache.get(db, VotingSession, 1)
+            assert (session.title, session.is_published, session.time_created) == ("Poll", True, time_created)
+            assert session in db and not db.dirty
+            assert len(statements) == 0
+            assert session.creator.username == "owner"
+            assert len(statements) == 1
+
+    def test_missing_rows_are_not_cached(self, factory, cache):
+        """Test that a lookup of a row that does not exist returns None and finds it once it is created."""
+        with factory() as db:
+            assert cache.get(db, Candidate, 1) is None
+            db.add(Candidate(id=1, question_id=1, name="Late"))
+            db.commit()
+        with factory() as db:
+            assert cache.get(db, Candidate, 1).name == "Late"
+
+    def test_commits_invalidate_changed_rows(self, factory, cache):
+        """Test that updates and deletes through the ORM are visible on the next lookup, rolled back ones leave the entry."""
+        with factory() as db:
+            cache.get(db, Question, 1).title = "Renamed"
+            db.flush()
+            db.rollback()
+        assert len(cache.local) == 1
+
+        with factory() as db:
+            cache.get(db, Question, 1).title = "Renamed"
+            db.commit()
+        with factory() as db:
+            assert cache.get(db, Question, 1).title == "Renamed"
+            db.delete(cache.get(db, Question, 1))
+            db.commit()
+        with factory() as db:
+            assert cache.get(db, Question, 1) is None
+
+    def test_bulk_updates_invalidate_the_table(self, factory, cache):
+        """Test that a bulk UPDATE, here the soft delete of a user's sessions, drops every cached row of its table."""
+        with factory() as db:
+            cache.get(db, VotingSession, 1)
+            soft_delete_user(db, cache.get(db, User, 1))
+            db.commit()
+        with factory() as db:
+            assert cache.get(db, VotingSession, 1) is None
+            assert cache.get(db, User, 1) is None
+
+    def test_subclasses(self, factory, cache):
+        """Test that a cached admin comes back as an admin and a plain user is not returned as one."""
+        with factory() as db:
+            cache.get(db, User, 1)
+            cache.get(db, User, 2)
+        with factory() as db:
+            assert type(cache.get(db, User, 2)) is AdminUser
+            assert cache.get(db, AdminUser, 1) is None
+
+    def test_shared_store_serves_other_workers(self, engine, factory, shared_store):
+        """Test that a row read by one worker is served to another from the shared store, and an invalidation keeps
+        a row read before it from being stored again."""
+        first = EntityCache(MODELS, ttl=30, shared=SharedStoreClient(shared_store.url))
+        second = EntityCache(MODELS, ttl=30, shared=SharedStoreClient(shared_store.url))
+        with factory() as db:
+            time_created = first.get(db, VotingSession, 1).time_created
+        statements = count_statements(engine)
+        with factory() as db:
+            assert second.get(db, VotingSession, 1).time_created == time_created
+        assert len(statements) == 0
+
+        first.invalidate(keys=[("voting_sessions", 1)])
+        second.local.clear()
+        with factory() as db:
+            second.get(db, VotingSession, 1)
+        assert len(statements) == 1
+        assert second.shared.call("cache_get", key="entity:voting_sessions:1") is None
+
+    def test_unreachable_shared_store_fails_open(self, factory):
+        """Test that lookups fall back to the database when the shared store is down."""
+        cache = EntityCache(MODELS, shared=SharedStoreClient("tcp://127.0.0.1:1", timeout=0.1))
+        with factory() as db:
+            assert cache.get(db, VotingSession, 1).title == "Poll"
+            assert cache.get(db, VotingSession, 1).title == "Poll"
@@ -0,0 +1,190 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.services.database import Base, create_db_engine
+from app.services.migrations import (
+    BASELINE_REVISION, PROJECT_ROOT, SchemaOutOfDateError, alembic_config, head_revision, include_name, prepare_database
+)
+
+#Startup against an up to date schema only reads the revision, a slow check would delay every worker restart
+STARTUP_BUDGET_SECONDS = 0.5
+#Fresh interpreter importing the app and running its startup, mostly spent importing FastAPI and the routes
+COLD_START_BUDGET_SECONDS = 10.0
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path}/migrations.db"
+
+@pytest.fixture
+def lock_path(tmp_path):
+    return str(tmp_path / "migrations.lock")
+
+@pytest.fixture
+def engine(db_url):
+    engine = create_engine(db_url)
+    yield engine
+    engine.dispose()
+
+def upgrade_to(engine, revision):
+    config = alembic_config()
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+        connection.commit()
+
+# ------------------------------------------------------------------------------
+# Test Class for the Startup Migrations
+# ------------------------------------------------------------------------------
+class TestMigrations:
+    def test_migrations_match_models(self, engine, lock_path):
+        """Test that the migration history builds exactly the schema the models describe."""
+        assert prepare_database(engine, mode="upgrade", lock_path=lock_path) == head_revision(alembic_config())
+        with engine.connect() as connection:
+            assert compare_metadata(MigrationContext.configure(connection, opts={"include_name": include_name}), Base.metadata) == []
+
+    def test_foreign_key_actions_match_models(self, engine, lock_path):
+        """Test that every foreign key has the ON DELETE action of its model, which compare_metadata skips on SQLite."""
+        prepare_database(engine, mode="upgrade", lock_path=lock_path)
+        inspector = inspect(engine)
+        for table in Base.metadata.sorted_tables:
+            reflected = {
+                (tuple(fk["constrained_columns"]), (fk["options"].get("ondelete") or "").upper())
+                for fk in inspector.get_foreign_keys(table.name)
+            }
+            expected = {((fk.parent.name,), (fk.ondelete or "").upper()) for fk in table.foreign_keys}
+            assert reflected == expected, table.name
+
+    def test_skip_mode(self, engine, lock_path):
+        """Test that skip mode leaves the database untouched."""
+        assert prepare_database(engine, mode="skip", lock_path=lock_path) is None
+        assert inspect(engine).get_table_names() == []
+
+    def test_verify_mode_rejects_old_schema(self, engine, lock_path):
+        """Test that verify mode refuses to start on a database behind the head revision."""
+        upgrade_to(engine, BASELINE_REVISION)
+        with pytest.raises(SchemaOutOfDateError):
+            prepare_database(engine, mode="verify", lock_path=lock_path)
+
+        prepare_database(engine, mode="upgrade", lock_path=lock_path)
+        assert prepare_database(engine, mode="verify", lock_path=lock_path) == head_revision(alembic_config())
+
+    def test_adopts_unversioned_database(self, engine, lock_path):
+        """Test that a database built by the old create_all startup is stamped and upgraded."""
+        upgrade_to(engine, BASELINE_REVISION)
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
+
+        assert prepare_database(engine, mode="upgrade", lock_path=lock_path) == head_revision(alembic_config())
+        indexes = {index["name"] for index in inspect(engine).get_indexes("votes")}
+        assert "ix_votes_user_id_candidate_id" in indexes
+
+    def test_index_migration_removes_duplicates(self, engine, lock_path):
+        """Test that duplicate whitelist rows are collapsed before the unique index is built."""
+        upgrade_to(engine, BASELINE_REVISION)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, username, email, password, type) VALUES (1, 'a', 'a@example.com', 'x', 'user')"))
+            connection.execute(text("INSERT INTO voting_sessions (id, title, creator_id) VALUES (1, 'Poll', 1)"))
+            connection.execute(text("INSERT INTO whitelists (id, user_id, session_id) VALUES (1, 1, 1), (2, 1, 1)"))
+
+        prepare_database(engine, mode="upgrade", lock_path=lock_path)
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT id FROM whitelists")).scalars().all() == [1]
+
+    def test_search_migration_indexes_existing_sessions(self, engine, lock_path):
+        """Test that sessions created before the search index existed are found, and later renames are picked up."""
+        upgrade_to(engine, BASELINE_REVISION)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, username, email, password, type) VALUES (1, 'a', 'a@example.com', 'x', 'user')"))
+            connection.execute(text("INSERT INTO voting_sessions (id, title, description, creator_id) VALUES (1, 'Budget', 'Yearly spending', 1)"))
+
+        prepare_database(engine, mode="upgrade", lock_path=lock_path)
+        search = text("SELECT rowid FROM voting_sessions_search WHERE voting_sessions_search MATCH :q")
+        with engine.begin() as connection:
+            assert connection.execute(search, {"q": "spending"}).scalars().all() == [1]
+            connection.execute(text("UPDATE voting_sessions SET description = 'Office plants' WHERE id = 1"))
+            assert connection.execute(search, {"q": "spending"}).scalars().all() == []
+            assert connection.execute(search, {"q": "plants"}).scalars().all() == [1]
+
+    def test_upgrade_keeps_children_with_foreign_keys_enforced(self, db_url, engine, lock_path):
+        """Test that rebuilding tables during an upgrade does not cascade deletes into child rows."""
+        upgrade_to(engine, BASELINE_REVISION)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, username, email, password, type) VALUES (1, 'a', 'a@example.com', 'x', 'user')"))
+            connection.execute(text("INSERT INTO voting_sessions (id, title, creator_id) VALUES (1, 'Poll', 1)"))
+            connection.execute(text("INSERT INTO questions (id, session_id, type, title) VALUES (1, 1, 'multiple_choice', 'Question')"))
+            connection.execute(text("INSERT INTO candidates (id, question_id, name) VALUES (1, 1, 'Candidate')"))
+            connection.execute(text("INSERT INTO votes (id, user_id, candidate_id) VALUES (1, 1, 1)"))
+
+        app_engine = create_db_engine(db_url, pool_name="migration_test")
+        prepare_database(app_engine, mode="upgrade", lock_path=lock_path)
+        with app_engine.connect() as connection:
+            assert connection.execute(text("SELECT session_id FROM votes")).scalars().all() == [1]
+            assert connection.execute(text("PRAGMA foreign_keys")).scalar() == 1
+        app_engine.dispose()
+
+    def test_concurrent_workers_migrate_once(self, db_url, lock_path):
+        """Test that workers starting together all end up on the head revision without errors."""
+        results, errors = [], []
+
+        def worker():
+            engine = create_engine(db_url, connect_args={"timeout": 30})
+            try:
+                results.append(prepare_database(engine, mode="upgrade", lock_path=lock_path))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                engine.dispose()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert results == [head_revision(alembic_config())] * 4
+
+    # ----------------------
+    # Startup Time
+    # ----------------------
+    def test_startup_time_budget(self, engine, lock_path):
+        """Test that starting against a migrated database stays within the budget."""
+        prepare_database(engine, mode="upgrade", lock_path=lock_path)
+
+        start = time.perf_counter()
+        prepare_database(engine, mode="upgrade", lock_path=lock_path)
+        assert time.perf_counter() - start < STARTUP_BUDGET_SECONDS
+
+    def test_cold_start_time_budget(self, engine, db_url, lock_path):
+        """Test that a new worker imports the app and runs its startup within the budget."""
+        prepare_database(engine, mode="upgrade", lock_path=lock_path)
+        script = (
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "from fastapi.testclient import TestClient\n"
+            "from app.main import app\n"
+            "imported = time.perf_counter()\n"
+            "with TestClient(app):\n"
+            "    pass\n"
+            "print(imported - start, time.perf_counter() - imported)\n"
+        )
+        env = dict(os.environ, DATABASE_URL=db_url, DB_STARTUP_MODE="verify", DB_MIGRATION_LOCK=lock_path)
+        output = subprocess.run(
+            [sys.executable, "-c", script], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        import_seconds, startup_seconds = map(float, output.split()[-2:])
+        assert startup_seconds < STARTUP_BUDGET_SECONDS
+        assert import_seconds + startup_seconds < COLD_START_BUDGET_SECONDS
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services.purger import PURGE_PLANS, Purger
+from app.services.soft_delete import INCLUDE_DELETED, soft_delete_user, soft_delete_voting_session
+from app.models.candidate import Candidate
+from app.models.purge_job import PurgeJob
+from app.models.question import Question
+from app.models.user import User
+from app.models.vote import Vote
+from app.models.voting_session import VotingSession
+from app.models.whitelist import Whitelist
+
+VOTES_PER_SESSION = 25
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/purger.db", pool_name="purger_test")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+#Two users, each with a session of one question, one candidate and VOTES_PER_SESSION votes
+@pytest.fixture
+def seeded(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x", "type": "user"}
+            for i in range(1, VOTES_PER_SESSION + 1)
+        ])
+        conn.execute(insert(VotingSession.__table__), [
+            {"id": 1, "title": "Deleted", "creator_id": 1}, {"id": 2, "title": "Kept", "creator_id": 2}
+        ])
+        conn.execute(insert(Question.__table__), [
+            {"id": 1, "session_id": 1, "title": "Q", "type": "multiple_choice"},
+            {"id": 2, "session_id": 2, "title": "Q", "type": "multiple_choice"},
+        ])
+        conn.execute(insert(Candidate.__table__), [{"id": 1, "question_id": 1, "name": "A"}, {"id": 2, "question_id": 2, "name": "B"}])
+        conn.execute(insert(Whitelist.__table__), [{"user_id": 1, "session_id": 1}, {"user_id": 2, "session_id": 2}])
+        conn.execute(insert(Vote.__table__), [
+            {"user_id": user_id, "candidate_id": candidate_id, "question_id": candidate_id, "session_id": candidate_id}
+            for candidate_id in (1, 2) for user_id in range(1, VOTES_PER_SESSION + 1)
+        ])
+
+def count(factory, model, **filters):
+    with factory() as db:
+        return db.query(model).execution_options(**{INCLUDE_DELETED: True}).filter_by(**filters).count()
+
+# ------------------------------------------------------------------------------
+# Test Class for the Soft Delete and the Purger
+# ------------------------------------------------------------------------------
+class TestPurger:
+    def test_soft_deleted_rows_are_hidden(self, factory, seeded):
+        """Test that a deleted session disappears from ORM queries but stays readable with include_deleted."""
+        with factory() as db:
+            soft_delete_voting_session(db, db.get(VotingSession, 1))
+            db.commit()
+
+        with factory() as db:
+            assert [s.id for s in db.query(VotingSession).all()] == [2]
+            assert db.get(VotingSession, 1) is None
+            assert db.execute(select(VotingSession.id)).scalars().all() == [2]
+            #Lazy loads from a visible parent are filtered too
+            assert [s.id for s in db.get(User, 1).voting_sessions] == []
+            assert count(factory, VotingSession) == 2
+
+    def test_purge_deletes_in_chunks(self, engine, factory, seeded):
+        """Test that no purge transaction deletes more than chunk_size rows and other sessions are untouched."""
+        with factory() as db:
+            soft_delete_voting_session(db, db.get(VotingSession, 1))
+            db.commit()
+
+        deleted_per_statement = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("DELETE"):
+                deleted_per_statement.append(cursor.rowcount)
+        event.listen(engine, "after_cursor_execute", record)
+
+        purger = Purger(factory, chunk_size=10)
+        chunks = 0
+        while purger.purge_chunk():
+            chunks += 1
+
+        assert max(deleted_per_statement) <= 10
+        #Three chunks of votes, then one statement per remaining table in the plan
+        assert chunks == 3 + len(PURGE_PLANS["voting_session"]) - 1
+        assert count(factory, Vote, session_id=1) == 0
+        assert count(factory, Question, session_id=1) == 0
+        assert count(factory, VotingSession, id=1) == 0
+        assert count(factory, Vote, session_id=2) == VOTES_PER_SESSION
+        assert count(factory, Whitelist, session_id=2) == 1
+
+        with factory() as db:
+            job = db.query(PurgeJob).one()
+            assert job.status == "done"
+            assert job.rows_deleted == VOTES_PER_SESSION + 4
+
+    def test_user_sessions_are_purged_before_the_user(self, factory, seeded):
+        """Test that deleting a user hides and queues their sessions ahead of the user row."""
+        with factory() as db:
+            soft_delete_user(db, db.get(User, 1))
+            db.commit()
+
+        with factory() as db:
+            assert db.get(VotingSession, 1) is None
+            assert [(job.entity, job.entity_id) for job in db.query(PurgeJob).order_by(PurgeJob.id)] == [("voting_session", 1), ("user", 1)]
+
+        Purger(factory, chunk_size=10).drain()
+        assert count(factory, User, id=1) == 0
+        assert count(factory, VotingSession, id=1) == 0
+        #The user's vote in the other session goes with them
+        assert count(factory, Vote, session_id=2) == VOTES_PER_SESSION - 1
+
+    def test_background_thread(self, factory, seeded):
+        """Test that the started purger works through queued jobs and pauses between chunks."""
+        with factory() as db:
+            soft_delete_voting_session(db, db.get(VotingSession, 1))
+            db.commit()
+
+        purger = Purger(factory, chunk_size=10, pause=0.01, interval=0.01).start()
+        try:
+            deadline = time.monotonic() + 5
+            while count(factory, PurgeJob, status="done") == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            purger.stop()
+        assert count(factory, VotingSession, id=1) == 0
@@ -0,0 +1,138 @@
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.orm import Session
+
+from app.services.database import Base
+from app.services import queries, search
+from app.models.answer import Answer
+from app.models.candidate import Candidate
+from app.models.feedback import Feedback
+from app.models.group_whitelist import GroupWhitelist
+from app.models.session_settings import SessionSettings
+from app.models.user import User
+from app.models.user_group import GroupMembership
+from app.models.vote import Vote
+from app.models.voting_session import VotingSession
+from app.models.whitelist import Whitelist
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+# Every statement below is run through EXPLAIN QUERY PLAN against the model
+# schema. A plan step reading a whole table ("SCAN votes") means an index is
+# missing, index scans ("SCAN votes USING INDEX ...") are fine.
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+#The statement searching a creator's sessions created in 2024 builds for the page after a cursor
+def creator_sessions_page(descending):
+    statement = select(VotingSession).where(
+        VotingSession.creator_id == 1,
+        VotingSession.time_created >= datetime(2024, 1, 1), VotingSession.time_created < datetime(2025, 1, 1)
+    )
+    return search.keyset_page(statement, VotingSession.time_created, descending, (datetime(2024, 6, 1), 5), 50)
+
+#The statement the search routes build for a query, on the FTS5 index
+def session_search(*terms):
+    match = search.session_match("sqlite", list(terms))
+    return select(VotingSession.id, match.snippet).join(match.target, match.onclause).where(match.condition).order_by(match.rank)
+
+HOT_QUERIES = {
+    "existing vote": queries.existing_vote(1, 1),
+    "votes by user": select(Vote).where(Vote.user_id == 1),
+    "votes by candidate": select(Vote).where(Vote.candidate_id == 1),
+    "candidate location": queries.candidate_location(1),
+    "vote eligibility": queries.vote_eligibility(1, 1, 1, 1),
+    "session state": queries.session_state(1),
+    "ballot candidates": queries.ballot_candidates(1, [1, 2]),
+    "ballot votes": queries.ballot_votes(1, 1, 1),
+    "guarded vote insert": queries.insert_vote("sqlite", 1, 1, 1, 1, question_limit=1, session_limit=5),
+    "votes for session": queries.votes_for_session(1),
+    "vote counts for session": queries.vote_counts_for_session(1),
+    "session has questions": queries.session_has_questions(1),
+    "session has candidates": queries.session_has_candidates(1),
+    "candidates for session": queries.candidates_for_session(1),
+    "frozen results": queries.results_for_session(1),
+    "pending close times": select(VotingSession.close_at, VotingSession.id).where(VotingSession.close_at.is_not(None), VotingSession.closed_at.is_(None)),
+    "candidates by question": select(Candidate).where(Candidate.question_id == 1),
+    "answers by question": select(Answer).where(Answer.question_id == 1),
+    "settings by session": select(SessionSettings).where(SessionSettings.session_id == 1),
+    "setting by name": select(SessionSettings).where(SessionSettings.session_id == 1, SessionSettings.setting_name == "max_votes"),
+    "session access": queries.has_session_access(1, 1),
+    "whitelist by session": select(Whitelist).where(Whitelist.session_id == 1),
+    "whitelist by user": select(Whitelist).where(Whitelist.user_id == 1),
+    "group whitelist by session": select(GroupWhitelist).where(GroupWhitelist.session_id == 1),
+    "group whitelist by group": select(GroupWhitelist).where(GroupWhitelist.group_id == 1),
+    "members by group": select(GroupMembership).where(GroupMembership.group_id == 1),
+    "membership check": select(GroupMembership).where(GroupMembership.group_id == 1, GroupMembership.user_id == 1),
+    "groups of user": select(GroupMembership).where(GroupMembership.user_id == 1),
+    "feedback by user": select(Feedback).where(Feedback.user_id == 1),
+    "sessions by creator": select(VotingSession).where(VotingSession.creator_id == 1),
+    "user by name": select(User).where(User.username == "alice"),
+    "user by email": select(User).where(User.email == "alice@example.com"),
+    "session search": session_search("budget", "vote"),
+    "creator sessions by date": creator_sessions_page(False),
+}
+
+@pytest.fixture(scope="module")
+def plan_engine():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+def query_plan(engine, statement) -> list[str]:
+    sql = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        return [row[3] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+# ------------------------------------------------------------------------------
+# Test Class for the Query Plans
+# ------------------------------------------------------------------------------
+class TestQueryPlans:
+    @pytest.mark.parametrize("name", HOT_QUERIES)
+    def test_hot_query_uses_index(self, plan_engine, name):
+        """Test that no hot query falls back to a full table scan."""
+        plan = query_plan(plan_engine, HOT_QUERIES[name])
+        full_scans = [step for step in plan if FULL_SCAN.match(step)]
+        assert not full_scans, f"{name} scans a whole table: {plan}"
+
+    def test_session_tally_reads_only_the_index(self, plan_engine):
+        """Test that counting a session's votes never touches the votes table itself."""
+        plan = query_plan(plan_engine, queries.vote_counts_for_session(1))
+        assert any("COVERING INDEX ix_votes_session_id_question_id_candidate_id" in step for step in plan), plan
+
+    def test_session_tally_reads_only_the_index_through_the_orm(self, plan_engine):
+        """Test that the soft delete criteria added to ORM statements do not take the tally out of its index."""
+        statements = []
+        listener = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+        event.listen(plan_engine, "before_cursor_execute", listener)
+        try:
+            with Session(plan_engine) as db:
+                db.execute(queries.vote_counts_for_session(1)).all()
+        finally:
+            event.remove(plan_engine, "before_cursor_execute", listener)
+        statement, parameters = statements[-1]
+        with plan_engine.connect() as connection:
+            plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        assert plan == ["SEARCH votes USING COVERING INDEX ix_votes_session_id_question_id_candidate_id (session_id=?)"], plan
+
+    def test_full_scan_is_detected(self, plan_engine):
+        """Test that the check fails on a query that cannot use an index."""
+        plan = query_plan(plan_engine, select(Vote).where(Vote.user_input == "x"))
+        assert any(FULL_SCAN.match(step) for step in plan)
+
+    def test_session_search_reads_the_fts_index(self, plan_engine):
+        """Test that a search finds its sessions through the FTS5 index and looks them up by id."""
+        plan = query_plan(plan_engine, session_search("budget"))
+        assert any(step.startswith("SCAN voting_sessions_search VIRTUAL TABLE") for step in plan), plan
+        assert any(step.startswith("SEARCH voting_sessions USING") for step in plan), plan
+
+    @pytest.mark.parametrize("descending", [False, True])
+    def test_creator_search_pages_from_the_index(self, plan_engine, descending):
+        """Test that a creator's sessions in a date range come from the composite index, already in page order."""
+        plan = query_plan(plan_engine, creator_sessions_page(descending))
+        assert plan == ["SEARCH voting_sessions USING INDEX ix_voting_sessions_creator_id_time_created (creator_id=? AND time_created>? AND time_created<?)"]
@@ -0,0 +1,192 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import RateLimitMiddleware, is_known_api_key
+from app.models.api_key import APIKey
+from app.services.rate_limiter import (
+    InMemoryBackend, SharedBackend, RateLimiter, RateLimitRule, parse_rules
+)
+from app.services.shared_store import SharedStoreServer, SharedStoreClient
+
+# ------------------------------------------------------------------------------
+# Helper Functions
+# ------------------------------------------------------------------------------
+
+class FakeClock:
+    """
+    Manually advanced clock so refill behaviour can be tested without sleeping.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+#API keys the test apps accept as verified
+KNOWN_KEYS = {"integration", "other"}
+
+def create_test_app(limiter):
+    """
+    Creates a small app with a votes route and an unlimited route behind the middleware.
+    """
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, is_known_key=KNOWN_KEYS.__contains__)
+
+    @app.post("/api/votes/")
+    def vote():
+        return {"detail": "ok"}
+
+    @app.get("/")
+    def home():
+        return {"detail": "ok"}
+
+    return app
+
+@pytest.fixture
+def shared_store():
+    server = SharedStoreServer(port=0)
+    server.start_in_thread()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+# ------------------------------------------------------------------------------
+# Test Class for the Rate Limiter
+# ------------------------------------------------------------------------------
+class TestRateLimiter:
+    def test_parse_rules(self):
+        """Test that the configuration format is parsed into rules."""
+        rules = parse_rules("votes:/api/votes:20:40, api:/api/:50:100")
+        assert rules == [
+            RateLimitRule("votes", "/api/votes", 20.0, 40.0),
+            RateLimitRule("api", "/api/", 50.0, 100.0),
+        ]
+
+    def test_longest_prefix_wins(self):
+        """Test that a request is matched to its most specific route group."""
+        limiter = RateLimiter(parse_rules("api:/api/:50:100,votes:/api/votes:20:40"), InMemoryBackend())
+        assert limiter.match("/api/votes/session/1/results").name == "votes"
+        assert limiter.match("/api/users/").name == "api"
+        assert limiter.match("/docs") is None
+
+    def test_bucket_allows_burst_then_denies(self):
+        """Test that a full bucket allows its capacity and then reports a retry delay."""
+        backend = InMemoryBackend(clock=FakeClock())
+        decisions = [backend.take("user:1", rate=2, capacity=3) for _ in range(4)]
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert decisions[-1].retry_after == pytest.approx(0.5)
+
+    def test_bucket_refills_over_time(self):
+        """Test that tokens come back at the configured rate and never exceed capacity."""
+        clock = FakeClock()
+        backend = InMemoryBackend(clock=clock)
+        for _ in range(3):
+            backend.take("user:1", rate=2, capacity=3)
+        assert not backend.take("user:1", rate=2, capacity=3).allowed
+
+        clock.now += 0.5
+        assert backend.take("user:1", rate=2, capacity=3).allowed
+
+        clock.now += 100
+        assert backend.take("user:1", rate=2, capacity=3).remaining == pytest.approx(2)
+
+    def test_keys_are_independent(self):
+        """Test that one client emptying its bucket does not affect another."""
+        backend = InMemoryBackend(clock=FakeClock())
+        backend.take("user:1", rate=1, capacity=1)
+        assert not backend.take("user:1", rate=1, capacity=1).allowed
+        assert backend.take("user:2", rate=1, capacity=1).allowed
+
+    def test_idle_buckets_are_pruned(self):
+        """Test that buckets which refilled completely are dropped once a shard is full."""
+        clock = FakeClock()
+        backend = InMemoryBackend(shards=1, max_keys_per_shard=2, clock=clock)
+        backend.take("a", rate=1, capacity=1)
+        backend.take("b", rate=1, capacity=1)
+        clock.now += 5
+        backend.take("c", rate=1, capacity=1)
+        assert set(backend._shards[0].buckets) == {"c"}
+
+    def test_busy_shards_evict_the_least_recently_used_bucket(self):
+        """Test that a shard full of active buckets drops the least recently used one instead of growing."""
+        clock = FakeClock()
+        backend = InMemoryBackend(shards=1, max_keys_per_shard=2, clock=clock)
+        backend.take("a", rate=1, capacity=10)
+        backend.take("b", rate=1, capacity=10)
+        backend.take("a", rate=1, capacity=10)
+        for i in range(5):
+            clock.now += 0.1
+            backend.take(f"ip:{i}", rate=1, capacity=10)
+        assert len(backend._shards[0].buckets) == 2
+        assert list(backend._shards[0].buckets) == ["ip:3", "ip:4"]
+
+    # ----------------------
+    # Middleware
+    # ----------------------
+    def test_middleware_returns_retry_after(self):
+        """Test that an exhausted client gets 429 with a Retry-After header."""
+        limiter = RateLimiter(parse_rules("votes:/api/votes:0.5:2"), InMemoryBackend())
+        client = TestClient(create_test_app(limiter))
+        headers = {"X-API-KEY": "integration"}
+
+        assert client.post("/api/votes/", headers=headers).status_code == 200
+        assert client.post("/api/votes/", headers=headers).status_code == 200
+        response = client.post("/api/votes/", headers=headers)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "2"
+
+        #Another key and unlimited routes are unaffected
+        assert client.post("/api/votes/", headers={"X-API-KEY": "other"}).status_code == 200
+        assert client.get("/", headers=headers).status_code == 200
+
+    def test_middleware_ignores_unverified_identifiers(self):
+        """Test that rotating X-User-Id, ?user_id or an unknown API key does not escape the client's address bucket."""
+        limiter = RateLimiter(parse_rules("votes:/api/votes:0.1:2"), InMemoryBackend())
+        client = TestClient(create_test_app(limiter))
+
+        assert client.post("/api/votes/", headers={"X-User-Id": "1"}).status_code == 200
+        assert client.post("/api/votes/?user_id=2").status_code == 200
+        assert client.post("/api/votes/", headers={"X-User-Id": "3"}).status_code == 429
+        assert client.post("/api/votes/", headers={"X-API-KEY": "made-up"}).status_code == 429
+        #A known key has its own bucket
+        assert client.post("/api/votes/", headers={"X-API-KEY": "integration"}).status_code == 200
+
+    def test_known_api_keys_are_looked_up_once(self, db_session, monkeypatch):
+        """Test that API keys are checked against api_keys and the answer is cached."""
+        monkeypatch.setattr("app.middleware.SessionLocal", lambda: db_session)
+        monkeypatch.setattr(db_session, "close", lambda: None)
+        db_session.add(APIKey(key="secret", app_name="integration"))
+        db_session.commit()
+
+        assert is_known_api_key("secret") and not is_known_api_key("guess")
+        db_session.query(APIKey).delete()
+        db_session.commit()
+        assert is_known_api_key("secret")
+
+    # ----------------------
+    # Shared Backend
+    # ----------------------
+    def test_shared_backend_is_shared_between_clients(self, shared_store):
+        """Test that two workers talking to the same store share one bucket."""
+        worker_a = SharedBackend(SharedStoreClient(shared_store.url))
+        worker_b = SharedBackend(SharedStoreClient(shared_store.url))
+
+        assert worker_a.take("key:abc", rate=0.1, capacity=2).allowed
+        assert worker_b.take("key:abc", rate=0.1, capacity=2).allowed
+        decision = worker_a.take("key:abc", rate=0.1, capacity=2)
+        assert not decision.allowed
+        assert decision.retry_after > 0
+
+    def test_shared_backend_through_middleware(self, shared_store):
+        """Test that the middleware works with the blocking shared backend."""
+        limiter = RateLimiter(parse_rules("votes:/api/votes:0.1:1"), SharedBackend(SharedStoreClient(shared_store.url)))
+        client = TestClient(create_test_app(limiter))
+
+        assert client.post("/api/votes/").status_code == 200
+        assert client.post("/api/votes/").status_code == 429
+
+    def test_shared_backend_fails_open(self):
+        """Test that an unreachable store lets requests through."""
+        backend = SharedBackend(SharedStoreClient("tcp://127.0.0.1:1", timeout=0.1))
+        assert backend.take("key:abc", rate=1, capacity=1).allowed
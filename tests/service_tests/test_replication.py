@@ -0,0 +1,190 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.services.database as database
+from app.main import app
+from app.services.database import Base, create_db_engine, create_async_db_engine
+from app.services.metrics import registry
+from app.services.replication import (
+    CONSISTENCY_HEADER, ReplicaRouter, SQLiteReplicator, track_write_positions, primary_position
+)
+from app.models.candidate import Candidate
+from app.models.question import Question
+from app.models.user import User
+from app.models.voting_session import VotingSession
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+# A SQLite primary and replica file, kept in step by SQLiteReplicator.sync()
+# only when a test asks for it so the replica can be made to lag on purpose.
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def replicated(tmp_path):
+    primary_url = f"sqlite:///{tmp_path}/primary.db"
+    replica_url = f"sqlite:///{tmp_path}/replica.db"
+    primary_engine = create_db_engine(primary_url, pool_name="replication_test")
+    replica_engine = create_db_engine(replica_url, pool_name="replication_test_replica", read_only=True)
+    Base.metadata.create_all(bind=primary_engine)
+
+    primary_factory = sessionmaker(autocommit=False, autoflush=False, bind=primary_engine)
+    replica_factory = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    track_write_positions(primary_factory)
+    replicator = SQLiteReplicator(primary_url, replica_url)
+    replicator.sync()
+
+    yield primary_factory, replica_factory, replicator
+
+    primary_engine.dispose()
+    replica_engine.dispose()
+
+#Async sessions on the same primary file, tracked through their sync_session_class like configure_replica does
+@pytest.fixture
+def replicated_async(replicated, tmp_path, monkeypatch):
+    async_engine = create_async_db_engine(f"sqlite+aiosqlite:///{tmp_path}/primary.db", pool_name="replication_test_async")
+    async_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, sync_session_class=type("TrackedSession", (Session,), {}))
+    track_write_positions(async_factory.kw["sync_session_class"])
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_factory)
+    yield async_factory
+    async_engine.sync_engine.dispose()
+
+@pytest.fixture
+def replicated_client(replicated, monkeypatch):
+    primary_factory, replica_factory, replicator = replicated
+    monkeypatch.setattr(database, "SessionLocal", primary_factory)
+    monkeypatch.setattr(database, "replica_router", ReplicaRouter(primary_factory, replica_factory, position_ttl=0))
+    with TestClient(app) as client:
+        yield client, replicator
+
+def usernames(response):
+    return [user["username"] for user in response.json()]
+
+# ------------------------------------------------------------------------------
+# Test Class for Read Replica Routing
+# ------------------------------------------------------------------------------
+class TestReplication:
+    def test_commits_advance_write_position(self, replicated):
+        """Test that only commits with writes move the primary's position."""
+        primary_factory, _, _ = replicated
+        with primary_factory() as db:
+            db.add(User(username="first", email="first@example.com", password="secret", type="user"))
+            db.commit()
+            assert primary_position(db.connection()) == 1
+            db.commit()
+
+            db.query(User).filter(User.username == "first").update({"username": "renamed"})
+            db.commit()
+            assert primary_position(db.connection()) == 2
+
+    def test_rollback_keeps_write_position(self, replicated):
+        """Test that a rolled back transaction does not move the position."""
+        primary_factory, _, _ = replicated
+        with primary_factory() as db:
+            db.add(User(username="first", email="first@example.com", password="secret", type="user"))
+            db.flush()
+            db.rollback()
+            assert primary_position(db.connection()) == 0
+
+    def test_read_your_writes(self, replicated_client):
+        """Test that a client presenting its token skips a lagging replica."""
+        client, replicator = replicated_client
+        before = registry.snapshot().get('db_read_routing_total{target="primary"}', 0)
+
+        response = client.post("/api/users/", json={"username": "alice", "email": "alice@example.com", "password": "secret"})
+        assert response.status_code == 200
+        token = response.headers[CONSISTENCY_HEADER]
+        assert token == "1"
+
+        #Without the token the stale replica answers
+        assert usernames(client.get("/api/users/")) == []
+        #With it the read goes to the primary
+        assert usernames(client.get("/api/users/", headers={CONSISTENCY_HEADER: token})) == ["alice"]
+        assert registry.snapshot()['db_read_routing_total{target="primary"}'] == before + 1
+
+        #Once the replica has caught up it serves the same client again
+        replicator.sync()
+        replica_reads = registry.snapshot()['db_read_routing_total{target="replica"}']
+        assert usernames(client.get("/api/users/", headers={CONSISTENCY_HEADER: token})) == ["alice"]
+        assert registry.snapshot()['db_read_routing_total{target="replica"}'] == replica_reads + 1
+
+    def test_read_your_async_writes(self, replicated_client, replicated, replicated_async):
+        """Test that a vote cast through an async route returns a token that keeps the next read off a lagging replica."""
+        client, replicator = replicated_client
+        primary_factory, _, _ = replicated
+        with primary_factory() as db:
+            db.add(User(id=1, username="voter", email="voter@example.com", password="secret", type="user"))
+            db.add(VotingSession(id=1, title="Poll", creator_id=1, is_published=True))
+            db.add(Question(id=1, session_id=1, title="Question", type="multiple_choice"))
+            db.add(Candidate(id=1, question_id=1, name="Candidate"))
+            db.commit()
+        replicator.sync()
+
+        response = client.post("/api/async/votes/", json={"user_id": 1, "candidate_id": 1})
+        assert response.status_code == 200
+        token = response.headers[CONSISTENCY_HEADER]
+        assert token == "2"
+
+        assert client.get("/api/votes/session/1").json() == []
+        assert [vote["id"] for vote in client.get("/api/votes/session/1", headers={CONSISTENCY_HEADER: token}).json()] == [response.json()["id"]]
+
+    def test_cached_rows_follow_your_writes(self, replicated_client, replicated):
+        """Test that rows read from a lagging replica are not cached and token reads skip the entity cache."""
+        client, replicator = replicated_client
+        primary_factory, _, _ = replicated
+        with primary_factory() as db:
+            db.add(User(id=1, username="owner", email="owner@example.com", password="secret", type="user"))
+            db.add(VotingSession(id=1, title="Before", creator_id=1))
+            db.commit()
+        replicator.sync()
+        assert client.get("/api/voting-sessions/1").json()["title"] == "Before"
+
+        response = client.put("/api/voting-sessions/1", json={"title": "After"})
+        assert response.status_code == 200
+        token = response.headers[CONSISTENCY_HEADER]
+
+        #A read without the token gets the stale row from the replica, which must not fill the cache for the next one
+        assert client.get("/api/voting-sessions/1").json()["title"] == "Before"
+        assert client.get("/api/voting-sessions/1", headers={CONSISTENCY_HEADER: token}).json()["title"] == "After"
+        replicator.sync()
+        assert client.get("/api/voting-sessions/1").json()["title"] == "After"
+
+    def test_reads_do_not_issue_tokens(self, replicated_client):
+        """Test that only responses to writes carry a consistency token."""
+        client, _ = replicated_client
+        response = client.get("/api/users/")
+        assert response.status_code == 200
+        assert CONSISTENCY_HEADER not in response.headers
+
+    def test_invalid_token_uses_replica(self, replicated):
+        """Test that malformed tokens are ignored rather than rejected."""
+        primary_factory, replica_factory, _ = replicated
+        router = ReplicaRouter(primary_factory, replica_factory)
+        assert router.use_replica("not-a-number")
+        assert router.use_replica(None)
+
+    def test_replica_position_is_cached(self, replicated):
+        """Test that the replica position is read at most once per TTL unless a token is ahead of it."""
+        primary_factory, replica_factory, replicator = replicated
+        clock = FakeClock()
+        router = ReplicaRouter(primary_factory, replica_factory, position_ttl=1.0, clock=clock)
+        assert router.replica_position() == 0
+
+        with primary_factory() as db:
+            db.add(User(username="first", email="first@example.com", password="secret", type="user"))
+            db.commit()
+        replicator.sync()
+
+        assert router.replica_position() == 0
+        #A token ahead of the cached value forces a fresh read
+        assert router.use_replica("1")
+        clock.now = 2.0
+        assert router.replica_position() == 1
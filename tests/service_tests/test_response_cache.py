@@ -0,0 +1,115 @@
+from typing import List
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services.replication import CONSISTENCY_HEADER
+from app.services.response_cache import cache_response, response_cache
+from app.models.question import Question
+from app.models.user import User
+from app.models.voting_session import VotingSession
+
+class Poll(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    title: str
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/responses.db", pool_name="response_cache_test")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(User(id=1, username="owner", email="owner@example.com", password="x", type="user"))
+        db.add_all([VotingSession(id=i, title=f"Poll {i}", creator_id=1) for i in range(1, 51)])
+        db.commit()
+    yield factory
+    engine.dispose()
+
+#An app with one cached list route, calls counts how often the endpoint itself ran
+@pytest.fixture
+def app(factory):
+    app = FastAPI()
+    app.state.calls = 0
+
+    def get_db():
+        with factory() as db:
+            yield db
+
+    @app.get("/polls", response_model=List[Poll])
+    @cache_response("test_polls", models=(VotingSession,), model=List[Poll])
+    def polls(db=Depends(get_db)):
+        app.state.calls += 1
+        return db.query(VotingSession).order_by(VotingSession.id).all()
+
+    return app
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as client:
+        yield client
+
+# ------------------------------------------------------------------------------
+# Test Class for the Response Cache
+# ------------------------------------------------------------------------------
+class TestResponseCache:
+    def test_hits_return_the_stored_bytes(self, app, client):
+        """Test that a second request gets the same body and ETag without running the endpoint."""
+        first = client.get("/polls", headers={"Accept-Encoding": "identity"})
+        second = client.get("/polls", headers={"Accept-Encoding": "identity"})
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content and first.headers["etag"] == second.headers["etag"]
+        assert first.headers["content-type"] == "application/json"
+        assert first.json()[0] == {"id": 1, "title": "Poll 1"}
+        assert app.state.calls == 1
+
+    def test_commits_to_read_tables_invalidate(self, app, client, factory):
+        """Test that a commit writing to a table the route reads is visible at once, other tables and rollbacks are not."""
+        etag = client.get("/polls").headers["etag"]
+        with factory() as db:
+            db.add(Question(session_id=1, title="Q", type="multiple_choice"))
+            db.commit()
+            db.get(VotingSession, 1).title = "Rolled back"
+            db.flush()
+            db.rollback()
+        assert client.get("/polls").headers["etag"] == etag
+        assert app.state.calls == 1
+
+        with factory() as db:
+            db.get(VotingSession, 1).title = "Renamed"
+            db.commit()
+        response = client.get("/polls")
+        assert response.json()[0]["title"] == "Renamed" and response.headers["etag"] != etag
+        assert app.state.calls == 2
+
+    def test_not_modified(self, client):
+        """Test that a client presenting the current ETag gets 304 without a body."""
+        etag = client.get("/polls").headers["etag"]
+        response = client.get("/polls", headers={"If-None-Match": etag})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_gzip(self, client):
+        """Test that clients accepting gzip get the stored compressed copy under its own ETag."""
+        plain = client.get("/polls", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        compressed = client.get("/polls", headers={"Accept-Encoding": "gzip, deflate"})
+        assert compressed.headers["content-encoding"] == "gzip" and compressed.headers["vary"] == "Accept-Encoding"
+        assert compressed.headers["etag"] != plain.headers["etag"]
+        #The client decompresses the body, both requests were served by one cache entry
+        assert compressed.content == plain.content
+        assert len(response_cache.entries) == 1
+
+    def test_consistency_token_skips_the_cache(self, app, client):
+        """Test that a client that must read its own writes always gets a fresh response."""
+        client.get("/polls")
+        client.get("/polls", headers={CONSISTENCY_HEADER: "1"})
+        assert app.state.calls == 2
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.services import queries
+from app.services.database import Base
+from app.models.user import User, AdminUser
+from app.models.vote import Vote
+from app.schemas.user_schema import UserOut
+from app.schemas.vote import VoteResponse
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="voter", email="voter@example.com", password="x", type="user"))
+        db.add(User(id=2, username="gone", email="gone@example.com", password="x", type="user", deleted_at=datetime(2024, 1, 1)))
+        db.add(AdminUser(id=3, username="admin", email="admin@example.com", password="x"))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+#SQL of every statement the engine runs
+@pytest.fixture
+def statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+# ------------------------------------------------------------------------------
+# Test Class for Response Rows
+# ------------------------------------------------------------------------------
+class TestResponseRows:
+    def test_rows_hold_only_the_response_columns(self, engine, statements):
+        """Test that response rows select the schema's columns, skip deleted users and do not join administrators."""
+        with Session(engine) as db:
+            rows = db.execute(queries.response_rows(User, UserOut).order_by(User.id)).all()
+            assert rows[0]._fields == tuple(UserOut.model_fields)
+            assert [row.username for row in rows] == ["voter", "admin"]
+            assert len(db.identity_map) == 0
+        assert "administrators" not in statements[-1] and "password" not in statements[-1]
+
+    def test_rows_take_filters(self, engine):
+        """Test that response rows can be narrowed like any select."""
+        with Session(engine) as db:
+            assert db.execute(queries.response_rows(Vote, VoteResponse).where(Vote.candidate_id == 1)).all() == []
+
+    def test_user_queries_do_not_join_administrators(self, engine, statements):
+        """Test that loading users reads the users table alone and admins still load as AdminUser."""
+        with Session(engine) as db:
+            users = db.query(User).order_by(User.id).all()
+            assert "administrators" not in statements[-1]
+            assert [type(user) for user in users] == [User, AdminUser]
+            assert users[1].username == "admin"
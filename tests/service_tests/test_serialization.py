@@ -0,0 +1,55 @@
+import datetime
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services import queries
+from app.services.database import Base
+from app.services.serialization import json_serializer, output_type, type_adapter
+from app.models.user import User
+from app.schemas.user_schema import UserOut
+from app.schemas.voting_session import VotingSessionResponse
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([
+            User(id=i, username=f"user{i}", email=f"user{i}@example.com", password="x", type="user",
+                 time_created=datetime.datetime(2024, 1, i))
+            for i in range(1, 4)
+        ])
+        db.commit()
+        yield db
+    engine.dispose()
+
+# ------------------------------------------------------------------------------
+# Test Class for Serialization
+# ------------------------------------------------------------------------------
+class TestSerialization:
+    def test_output_type_trusts_stored_emails(self):
+        """Test that response models validate stored emails as plain strings and models without them are kept."""
+        item = output_type(List[UserOut]).__args__[0]
+        assert issubclass(item, UserOut) and item.model_fields["email"].annotation is str
+        assert list(item.model_fields) == list(UserOut.model_fields)
+        assert output_type(VotingSessionResponse) is VotingSessionResponse
+        assert type_adapter(List[UserOut]) is type_adapter(List[UserOut])
+
+    def test_rows_serialize_like_orm_objects(self, db):
+        """Test that SQL rows give the same bytes as FastAPI encoding the ORM objects through the response model."""
+        adapter = TypeAdapter(List[UserOut])
+        expected = adapter.dump_json(adapter.validate_python(db.query(User).order_by(User.id).all(), from_attributes=True))
+        rows = db.execute(queries.response_rows(User, UserOut).order_by(User.id)).all()
+        assert json_serializer(List[UserOut])(rows) == expected
+
+    def test_results_without_a_model(self):
+        """Test that results without a response model are encoded like FastAPI's JSONResponse would."""
+        assert json_serializer(None)({"detail": "ok", "at": datetime.datetime(2024, 1, 1)}) == b'{"detail":"ok","at":"2024-01-01T00:00:00"}'
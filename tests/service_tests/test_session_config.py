@@ -0,0 +1,66 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.session_settings import SessionConfig
+from app.services.session_config import SessionConfigCache, compile_settings, setting_error, setting_value
+
+# ------------------------------------------------------------------------------
+# Test Class for the Typed Session Settings
+# ------------------------------------------------------------------------------
+class TestSessionConfig:
+    def test_compile_parses_known_settings(self):
+        """Test that stored strings become typed values and unknown names are ignored."""
+        config = compile_settings([
+            ("max_votes", "3"), ("anonymous", "true"), ("results_visible", "false"), ("theme", "dark")
+        ])
+        assert config.max_votes == 3
+        assert config.anonymous is True
+        assert config.results_visible is False
+        assert config.max_selections is None
+
+    def test_compile_skips_invalid_stored_values(self):
+        """Test that a bad value written before validation existed falls back to the default."""
+        config = compile_settings([("max_votes", "many"), ("anonymous", "true")])
+        assert config.max_votes is None
+        assert config.anonymous is True
+
+    def test_config_is_immutable(self):
+        """Test that a cached config cannot be changed by the request using it."""
+        config = compile_settings([("max_votes", "3")])
+        with pytest.raises(ValidationError):
+            config.max_votes = 4
+
+    def test_setting_values_round_trip(self):
+        """Test that values written by the bulk upsert compile back to the same value."""
+        values = {"max_votes": 7, "max_selections": 2, "anonymous": False, "results_visible": True}
+        config = compile_settings([(name, setting_value(value)) for name, value in values.items()])
+        assert {name: getattr(config, name) for name in values} == values
+
+    def test_setting_error(self):
+        """Test that only known settings are validated."""
+        assert setting_error("max_votes", "2") is None
+        assert "max_votes" in setting_error("max_votes", "0")
+        assert setting_error("theme", "anything") is None
+
+    def test_cache_matches_version(self):
+        """Test that an entry is only returned for the version it was compiled from."""
+        cache = SessionConfigCache(max_entries=2)
+        old, new = SessionConfig(max_votes=1), SessionConfig(max_votes=2)
+        cache.put(1, 0, old)
+        assert cache.get(1, 0) is old
+        assert cache.get(1, 1) is None
+
+        cache.put(1, 1, new)
+        #A reader that compiled the old version late does not win over the new one
+        cache.put(1, 0, old)
+        assert cache.get(1, 1) is new
+
+    def test_cache_evicts_least_recently_used(self):
+        """Test that the cache stays within max_entries."""
+        cache = SessionConfigCache(max_entries=2)
+        for session_id in (1, 2):
+            cache.put(session_id, 0, SessionConfig())
+        cache.get(1, 0)
+        cache.put(3, 0, SessionConfig())
+        assert cache.get(2, 0) is None
+        assert cache.get(1, 0) is not None
@@ -0,0 +1,126 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services.session_lifecycle import SessionScheduler, close_session, voting_window_error
+from app.models.candidate import Candidate
+from app.models.question import Question
+from app.models.session_result import SessionResult
+from app.models.user import User
+from app.models.vote import Vote
+from app.models.voting_session import VotingSession
+
+NOW = datetime(2030, 1, 1, 12, 0)
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/lifecycle.db", pool_name="lifecycle_test")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+#Sessions 1 to 3 close one minute apart starting at NOW, each with one candidate and two votes
+@pytest.fixture
+def seeded(factory):
+    with factory() as db:
+        db.execute(insert(User.__table__), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x", "type": "user"} for i in (1, 2)
+        ])
+        db.execute(insert(VotingSession.__table__), [
+            {"id": i, "title": f"Session {i}", "creator_id": 1, "close_at": NOW + timedelta(minutes=i - 1)} for i in (1, 2, 3)
+        ])
+        db.execute(insert(Question.__table__), [{"id": i, "session_id": i, "title": "Q", "type": "multiple_choice"} for i in (1, 2, 3)])
+        db.execute(insert(Candidate.__table__), [{"id": i, "question_id": i, "name": "A"} for i in (1, 2, 3)])
+        db.execute(insert(Vote.__table__), [
+            {"user_id": user_id, "candidate_id": i, "question_id": i, "session_id": i} for i in (1, 2, 3) for user_id in (1, 2)
+        ])
+        db.commit()
+
+def closed_ids(factory):
+    with factory() as db:
+        return db.execute(
+            select(VotingSession.id).where(VotingSession.closed_at.is_not(None)).order_by(VotingSession.id)
+        ).scalars().all()
+
+# ------------------------------------------------------------------------------
+# Test Class for the Session Lifecycle
+# ------------------------------------------------------------------------------
+class TestSessionLifecycle:
+    def test_voting_window(self):
+        """Test that votes are accepted from open_at until close_at."""
+        open_at, close_at = NOW, NOW + timedelta(hours=1)
+        assert voting_window_error(open_at, close_at, None, NOW - timedelta(seconds=1)) == "Voting session is not open yet"
+        assert voting_window_error(open_at, close_at, None, NOW) is None
+        assert voting_window_error(open_at, close_at, None, close_at) == "Voting session is closed"
+        assert voting_window_error(None, None, NOW, NOW) == "Voting session is closed"
+        assert voting_window_error(None, None, None, NOW) is None
+
+    def test_close_session_freezes_tally_once(self, factory, seeded):
+        """Test that only the first worker to close a session writes its results."""
+        with factory() as db:
+            assert not close_session(db, 1, NOW, grace=5)
+            assert close_session(db, 1, NOW + timedelta(seconds=5), grace=5)
+            assert not close_session(db, 1, NOW + timedelta(seconds=6), grace=5)
+            results = db.query(SessionResult.session_id, SessionResult.candidate_id, SessionResult.votes).all()
+        assert [tuple(row) for row in results] == [(1, 1, 2)]
+
+    def test_run_due_closes_in_deadline_order(self, factory, seeded):
+        """Test that the heap releases sessions as their deadlines pass."""
+        clock = [NOW - timedelta(minutes=1)]
+        scheduler = SessionScheduler(factory, grace=0, clock=lambda: clock[0])
+        scheduler.load()
+        assert scheduler.run_due() == 0
+        assert scheduler.next_due_in() == 60
+
+        clock[0] = NOW + timedelta(minutes=1)
+        assert scheduler.run_due() == 2
+        assert closed_ids(factory) == [1, 2]
+
+    def test_moved_deadline_is_not_closed_early(self, factory, seeded):
+        """Test that an outdated heap entry is skipped when the close time was pushed back."""
+        scheduler = SessionScheduler(factory, grace=0, clock=lambda: NOW)
+        scheduler.load()
+        with factory() as db:
+            db.get(VotingSession, 1).close_at = NOW + timedelta(hours=1)
+            db.commit()
+        scheduler.schedule(1, NOW + timedelta(hours=1))
+
+        assert scheduler.run_due() == 0
+        assert closed_ids(factory) == []
+
+    def test_reload_after_restart(self, factory, seeded):
+        """Test that a new scheduler finds the deadlines still pending in the database."""
+        first = SessionScheduler(factory, grace=0, clock=lambda: NOW)
+        first.load()
+        first.run_due()
+
+        restarted = SessionScheduler(factory, grace=0, clock=lambda: NOW + timedelta(hours=1))
+        restarted.load()
+        assert restarted.run_due() == 2
+        assert closed_ids(factory) == [1, 2, 3]
+
+    def test_background_thread(self, factory, seeded):
+        """Test that the started scheduler closes due sessions and picks up new deadlines."""
+        scheduler = SessionScheduler(factory, grace=0, reload_interval=60, clock=lambda: NOW + timedelta(minutes=1))
+        scheduler.start()
+        try:
+            deadline = time.monotonic() + 5
+            while closed_ids(factory) != [1, 2] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            with factory() as db:
+                db.get(VotingSession, 3).close_at = NOW
+                db.commit()
+            scheduler.schedule(3, NOW)
+            while closed_ids(factory) != [1, 2, 3] and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            scheduler.stop()
+        assert closed_ids(factory) == [1, 2, 3]
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.services.metrics import registry
+from app.services.replication import CONSISTENCY_HEADER
+from app.services.single_flight import SingleFlight, coalesce
+
+class Count(BaseModel):
+    candidate_id: int
+    votes: int
+
+def requests(route: str, role: str) -> int:
+    return registry.counter("single_flight_requests_total", route=route, role=role).value
+
+#Blocks the first computation until the other callers have joined it
+def wait_for_followers(route: str, followers: int, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while requests(route, "follower") < followers and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+# ------------------------------------------------------------------------------
+# Test Class for Single Flight
+# ------------------------------------------------------------------------------
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_computation(self):
+        """Test that threads asking for the same key while it is computed get its bytes without computing again."""
+        flight = SingleFlight("test_sync_share")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            wait_for_followers("test_sync_share", 7)
+            return b"[1]"
+
+        with ThreadPoolExecutor(8) as pool:
+            bodies = list(pool.map(lambda _: flight.do(("results", 1), compute), range(8)))
+        assert bodies == [b"[1]"] * 8 and len(calls) == 1
+        assert (requests("test_sync_share", "leader"), requests("test_sync_share", "follower")) == (1, 7)
+        assert registry.gauge("single_flight_coalesced_ratio", route="test_sync_share").value == 7 / 8
+
+        #Nothing is kept once the computation ends
+        flight.do(("results", 1), compute)
+        assert len(calls) == 2
+
+    def test_errors_reach_every_caller(self):
+        """Test that an exception raised by the computation is raised to the requests that waited for it."""
+        flight = SingleFlight("test_sync_error")
+
+        def compute():
+            wait_for_followers("test_sync_error", 2)
+            raise HTTPException(status_code=404, detail="No questions found for this session")
+
+        def call(_):
+            with pytest.raises(HTTPException) as error:
+                flight.do("key", compute)
+            return error.value.status_code
+
+        with ThreadPoolExecutor(3) as pool:
+            assert list(pool.map(call, range(3))) == [404] * 3
+
+    def test_different_keys_do_not_wait_for_each_other(self):
+        """Test that a slow computation only holds back callers of its own key."""
+        flight = SingleFlight("test_sync_keys")
+        release = threading.Event()
+        with ThreadPoolExecutor(2) as pool:
+            slow = pool.submit(flight.do, 1, lambda: release.wait(5) and b"slow")
+            assert flight.do(2, lambda: b"fast") == b"fast"
+            release.set()
+            assert slow.result() == b"slow"
+
+    def test_async_calls_share_one_computation(self):
+        """Test that coroutines on the event loop share one computation per key."""
+        flight = SingleFlight("test_async_share")
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return b"[2]"
+
+        async def main():
+            return await asyncio.gather(*(flight.do_async("key", compute) for _ in range(10)))
+
+        assert asyncio.run(main()) == [b"[2]"] * 10 and len(calls) == 1
+
+    def test_cancelled_async_leader_hands_over(self):
+        """Test that requests waiting on a cancelled leader compute the result themselves."""
+        flight = SingleFlight("test_async_cancel")
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return b"ok"
+
+        async def main():
+            leader = asyncio.create_task(flight.do_async("key", compute))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(flight.do_async("key", compute)) for _ in range(3)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await asyncio.gather(*followers)
+
+        assert asyncio.run(main()) == [b"ok"] * 3 and len(calls) == 2
+
+    def test_coalesce_serializes_through_the_model(self):
+        """Test that decorated endpoints return the serialized body, validated through model when given."""
+        @coalesce("test_decorator_sync", "session_id", model=List[Count])
+        def tally(session_id: int, db):
+            return [{"candidate_id": session_id, "votes": 3, "extra": "dropped"}]
+
+        @coalesce("test_decorator_async", "session_id")
+        async def results(session_id: int, db):
+            return [{"candidate_id": session_id}]
+
+        assert json.loads(tally(session_id=5, db=None).body) == [{"candidate_id": 5, "votes": 3}]
+        assert json.loads(asyncio.run(results(session_id=5, db=None)).body) == [{"candidate_id": 5}]
+
+    def test_coalesce_skips_requests_with_a_consistency_token(self):
+        """Test that a request carrying a consistency token computes its own result instead of joining a running one."""
+        release = threading.Event()
+        calls = []
+
+        @coalesce("test_decorator_token", "session_id")
+        def results(session_id: int, db):
+            calls.append(db)
+            if db == "replica":
+                release.wait(5)
+            return [{"read_from": db}]
+
+        class FakeRequest:
+            def __init__(self, headers):
+                self.headers = headers
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            leader = pool.submit(results, request=FakeRequest({}), session_id=1, db="replica")
+            while not calls:
+                time.sleep(0.001)
+            own = results(request=FakeRequest({CONSISTENCY_HEADER: "7"}), session_id=1, db="primary")
+            assert json.loads(own.body) == [{"read_from": "primary"}]
+            release.set()
+            assert json.loads(leader.result().body) == [{"read_from": "replica"}]
+        assert requests("test_decorator_token", "follower") == 0
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services.user_index import UserIndex, trigrams
+from app.models.user import User
+
+USERS = ["jonathan.smith", "jon.doe", "johanna.schmidt", "maria.kowalska", "mario.rossi", "anna.nowak"]
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/users.db", pool_name="user_index_test")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": i, "username": name, "email": f"{name.replace('.', '')}@example.com", "password": "x", "type": "user"}
+            for i, name in enumerate(USERS, start=1)
+        ])
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+#An index that only refreshes when the test moves the clock
+@pytest.fixture
+def clock():
+    return [0.0]
+
+@pytest.fixture
+def index(clock):
+    return UserIndex(refresh_interval=60, clock=lambda: clock[0])
+
+def names(index, db, q, limit=3):
+    return [USERS[user_id - 1] if user_id <= len(USERS) else user_id for user_id in index.search(db, q, limit)]
+
+# ------------------------------------------------------------------------------
+# Test Class for the User Index
+# ------------------------------------------------------------------------------
+class TestUserIndex:
+    def test_trigrams(self):
+        """Test that words are lowercased and padded at the start, so short prefixes still produce a trigram."""
+        assert trigrams("Jon") == {"\x00jo", "jon"}
+        assert trigrams("jo") == {"\x00jo"}
+        assert trigrams("j") == set()
+        assert trigrams("a b") == set()
+
+    @pytest.mark.parametrize("q, best", [
+        ("jon", "jon.doe"),
+        ("jonatan", "jonathan.smith"),
+        ("schmit", "johanna.schmidt"),
+        ("kowalsky", "maria.kowalska"),
+        ("MARIO", "mario.rossi"),
+        ("rossimario", "mario.rossi"),
+    ])
+    def test_fuzzy_matches(self, index, db, q, best):
+        """Test that prefixes, typos and other letter cases find the user, closest first."""
+        assert names(index, db, q)[0] == best
+
+    def test_unrelated_query_finds_nobody(self, index, db):
+        """Test that users sharing too few trigrams with the query are not returned."""
+        assert names(index, db, "zzyzx") == []
+
+    def test_add_and_remove(self, index, db):
+        """Test that users added and removed by this worker show up and disappear at once."""
+        assert 7 not in names(index, db, "jonas")
+        index.add(7, "jonas.berg", "jonas@example.com")
+        assert names(index, db, "jonas")[0] == 7
+        index.remove(1, "jonathan.smith", "jonathansmith@example.com")
+        assert "jonathan.smith" not in names(index, db, "jonathan", limit=10)
+        assert index.size()["users"] == 6
+
+    def test_catches_up_with_other_workers(self, index, db, engine, clock):
+        """Test that users inserted elsewhere are indexed once the index is refresh_interval seconds old."""
+        names(index, db, "jon")
+        with engine.begin() as conn:
+            conn.execute(insert(User.__table__), [{"id": 7, "username": "jonas.berg", "email": "jb@example.com", "password": "x", "type": "user"}])
+        assert 7 not in names(index, db, "jonas.berg")
+        clock[0] = 60
+        assert names(index, db, "jonas.berg")[0] == 7
+
+    def test_local_add_does_not_skip_other_workers(self, index, db, engine, clock):
+        """Test that a user added by this worker does not hide users with lower ids created by other workers."""
+        names(index, db, "jon")
+        with engine.begin() as conn:
+            conn.execute(insert(User.__table__), [{"id": 7, "username": "jonas.berg", "email": "jb@example.com", "password": "x", "type": "user"}])
+        index.add(8, "marta.lind", "marta@example.com")
+        assert names(index, db, "marta")[0] == 8
+        clock[0] = 60
+        assert names(index, db, "jonas.berg")[0] == 7
+        assert index.loaded_through == 7
+
+    def test_lookups_do_not_wait_for_a_refresh(self, index, db, clock):
+        """Test that a loaded index answers while another thread reads new users from the database."""
+        names(index, db, "jon")
+        clock[0] = 60
+        with index._refresh_lock:
+            assert names(index, db, "kowalska") == ["maria.kowalska"]
+
+    def test_scan_budget_bounds_the_lookup(self, db, clock):
+        """Test that a tiny budget still answers from the rarest trigram instead of failing."""
+        index = UserIndex(refresh_interval=60, max_scanned=1, clock=lambda: clock[0])
+        assert names(index, db, "kowalska") == ["maria.kowalska"]
+
+    def test_preload(self, engine):
+        """Test that the background preload fills the index."""
+        index = UserIndex()
+        index.preload(sessionmaker(bind=engine)).join()
+        assert index.loaded and index.size()["users"] == len(USERS)
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.services.database import Base, create_db_engine
+from app.services import queries
+from app.models.candidate import Candidate
+from app.models.question import Question
+from app.models.user import User
+from app.models.vote import Vote
+from app.models.voting_session import VotingSession
+
+THREADS = 16
+
+# ------------------------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------------------------
+
+#One user, a multiple choice question with candidates 1 to THREADS and a true/false question with candidates 101 and 102
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/votes.db", pool_name="vote_constraints_test", pool_size=THREADS)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{"id": 1, "username": "voter", "email": "voter@example.com", "password": "x", "type": "user"}])
+        conn.execute(insert(VotingSession.__table__), [{"id": 1, "title": "Poll", "creator_id": 1, "is_published": True}])
+        conn.execute(insert(Question.__table__), [
+            {"id": 1, "session_id": 1, "title": "Many", "type": "multiple_choice"},
+            {"id": 2, "session_id": 1, "title": "One", "type": "true_false"},
+        ])
+        conn.execute(insert(Candidate.__table__), [{"id": i, "question_id": 1, "name": f"C{i}"} for i in range(1, THREADS + 1)])
+        conn.execute(insert(Candidate.__table__), [{"id": i, "question_id": 2, "name": f"C{i}"} for i in (101, 102)])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+#Run every vote from its own thread and connection, all released at once, the way cast_vote writes them. Returns how
+#many were written. SQLite runs one write transaction at a time and needs no lock, see test_voter_lock for PostgreSQL
+def hammer(factory, votes):
+    barrier = threading.Barrier(len(votes))
+    written = []
+
+    def cast(candidate_id, question_id, single_choice, question_limit):
+        with factory() as db:
+            statement = queries.insert_vote(
+                "sqlite", 1, candidate_id, question_id, 1,
+                single_choice=single_choice, question_limit=question_limit
+            )
+            barrier.wait()
+            if db.execute(statement).first() is not None:
+                written.append(candidate_id)
+            db.commit()
+
+    threads = [threading.Thread(target=cast, args=vote) for vote in votes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(written)
+
+def vote_count(factory, **filters):
+    with factory() as db:
+        return db.execute(select(func.count()).select_from(Vote).filter_by(**filters)).scalar()
+
+# ------------------------------------------------------------------------------
+# Test Class for the Vote Constraints
+# ------------------------------------------------------------------------------
+class TestVoteConstraints:
+    def test_concurrent_duplicates(self, factory):
+        """Test that only one of many simultaneous votes for the same candidate is written."""
+        assert hammer(factory, [(1, 1, False, None)] * THREADS) == 1
+        assert vote_count(factory, candidate_id=1) == 1
+
+    def test_concurrent_single_choice(self, factory):
+        """Test that simultaneous votes for both answers of a true/false question leave one vote."""
+        votes = [(101 + i % 2, 2, True, None) for i in range(THREADS)]
+        assert hammer(factory, votes) == 1
+        assert vote_count(factory, question_id=2) == 1
+
+    def test_concurrent_selection_limit(self, factory):
+        """Test that simultaneous votes for different candidates stop at max_selections."""
+        votes = [(i, 1, False, 3) for i in range(1, THREADS + 1)]
+        assert hammer(factory, votes) == 3
+        assert vote_count(factory, question_id=1) == 3
+
+    def test_voter_lock(self):
+        """Test that PostgreSQL transactions take a lock per user and session before counting votes against the limits."""
+        sql = str(queries.lock_voter("postgresql", 7, 3).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        assert sql == "SELECT pg_advisory_xact_lock(7, 3) AS pg_advisory_xact_lock_1"
+
+    def test_indexes_reject_plain_inserts(self, factory):
+        """Test that the database refuses duplicates written without ON CONFLICT, single_choice comes from the question."""
+        with factory() as db:
+            db.add_all([Vote(user_id=1, candidate_id=1), Vote(user_id=1, candidate_id=2), Vote(user_id=1, candidate_id=101)])
+            db.commit()
+            assert db.get(Vote, 3).single_choice
+            for candidate_id in (1, 102):
+                db.add(Vote(user_id=1, candidate_id=candidate_id))
+                with pytest.raises(IntegrityError):
+                    db.commit()
+                db.rollback()